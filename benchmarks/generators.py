@@ -0,0 +1,74 @@
+import random
+
+FIELD_TYPES = ("keyword", "text", "long", "float", "date", "boolean")
+
+SAMPLE_VALUES = {
+    "keyword": lambda rng: '"value-%s"' % rng.randint(0, 999),
+    "text": lambda rng: '"word%s"' % rng.randint(0, 999),
+    "long": lambda rng: str(rng.randint(0, 10 ** 6)),
+    "float": lambda rng: "%.2f" % rng.uniform(0, 1000),
+    "date": lambda rng: '"2020-%02d-%02d"' % (rng.randint(1, 12), rng.randint(1, 28)),
+    "boolean": lambda rng: rng.choice(("True", "False")),
+}
+
+OPERATORS = {
+    "keyword": ("=", "!=", "~", "startswith", "endswith"),
+    "text": ("=", "!=", "~"),
+    "long": ("=", ">", ">=", "<", "<="),
+    "float": (">", "<"),
+    "date": ("=", ">", "<"),
+    "boolean": ("=", "!="),
+}
+
+
+def generate_mappings(field_count=1000, depth=2, object_width=10, seed=0):
+    """
+        mappings with field_count leaf fields nested in object fields up to depth levels,
+        text fields have a keyword subfield like dynamic mappings of elasticsearch
+    :return: (mappings, [(field name, type)] of leaf fields)
+    """
+    rng = random.Random(seed)
+    mappings = {"properties": {}}
+    fields = []
+    for number in range(field_count):
+        field_type = FIELD_TYPES[number % len(FIELD_TYPES)]
+        path = ["object_%s" % rng.randrange(object_width) for _ in range(rng.randint(0, depth))]
+        properties = mappings["properties"]
+        for part in path:
+            properties = properties.setdefault(part, {"properties": {}})["properties"]
+        name = "%s_%s" % (field_type, number)
+        properties[name] = {"type": field_type}
+        if field_type == "text":
+            properties[name]["fields"] = {"keyword": {"type": "keyword", "ignore_above": 256}}
+        fields.append((".".join(path + [name]), field_type))
+    return mappings, fields
+
+
+def generate_comparison(fields, rng):
+    name, field_type = rng.choice(fields)
+    operator = rng.choice(OPERATORS[field_type])
+    if operator in ("~", "startswith", "endswith"):
+        return '%s %s "va"' % (name, operator)
+    return "%s %s %s" % (name, operator, SAMPLE_VALUES[field_type](rng))
+
+
+def generate_wide_search(fields, clauses=100, seed=0):
+    """
+        flat search of many comparisons joined with and/or, like searches built by query builder UIs
+    """
+    rng = random.Random(seed)
+    search = generate_comparison(fields, rng)
+    for _ in range(clauses - 1):
+        search += " %s %s" % (rng.choice(("and", "or")), generate_comparison(fields, rng))
+    return search
+
+
+def generate_deep_search(fields, depth=50, seed=0):
+    """
+        search with depth levels of nested parentheses
+    """
+    rng = random.Random(seed)
+    search = generate_comparison(fields, rng)
+    for _ in range(depth - 1):
+        search = "%s %s (%s)" % (generate_comparison(fields, rng), rng.choice(("and", "or")), search)
+    return search
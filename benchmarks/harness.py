@@ -0,0 +1,143 @@
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from elastic_dql import __version__
+
+
+class Benchmark(object):
+    """
+        a named callable, setup runs once before measuring and returns the callable to measure
+    """
+
+    def __init__(self, name, setup, iterations=1000, group=None):
+        self.name = name
+        self.setup = setup
+        self.iterations = iterations
+        self.group = group or name.split(".")[0]
+
+
+def percentile(sorted_values, percent):
+    # nearest rank
+    index = max(int(round(percent / 100.0 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def measure_time(func, iterations, warm_up=None):
+    for _ in range(warm_up if warm_up is not None else max(iterations // 10, 1)):
+        func()
+    timings = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(iterations):
+            started_at = time.perf_counter_ns()
+            func()
+            timings.append(time.perf_counter_ns() - started_at)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return timings
+
+
+def measure_allocations(func, iterations):
+    """
+        tracemalloc slows code down a lot, so allocations are measured in a separate pass
+    :return: (peak bytes of one call, bytes which are still allocated after a call)
+    """
+    iterations = max(min(iterations, 100), 1)
+    tracemalloc.start()
+    try:
+        peak_sizes = []
+        started_size = tracemalloc.get_traced_memory()[0]
+        for _ in range(iterations):
+            tracemalloc.reset_peak()
+            call_started_size = tracemalloc.get_traced_memory()[0]
+            func()
+            peak_sizes.append(tracemalloc.get_traced_memory()[1] - call_started_size)
+        retained_size = tracemalloc.get_traced_memory()[0] - started_size
+    finally:
+        tracemalloc.stop()
+    return max(peak_sizes), retained_size // iterations
+
+
+def run_benchmark(benchmark, iterations=None, allocations=True):
+    func = benchmark.setup()
+    iterations = iterations or benchmark.iterations
+    timings = sorted(measure_time(func, iterations))
+    total = sum(timings)
+    result = {
+        "name": benchmark.name,
+        "group": benchmark.group,
+        "iterations": iterations,
+        "ops_per_sec": iterations / (total / 1e9) if total else None,
+        "mean_us": total / iterations / 1e3,
+        "min_us": timings[0] / 1e3,
+        "p50_us": percentile(timings, 50) / 1e3,
+        "p90_us": percentile(timings, 90) / 1e3,
+        "p99_us": percentile(timings, 99) / 1e3,
+        "max_us": timings[-1] / 1e3,
+    }
+    if allocations:
+        result["peak_alloc_bytes"], result["retained_alloc_bytes"] = measure_allocations(func, iterations)
+    return result
+
+
+def get_environment():
+    return {
+        "elastic_dql_version": __version__,
+        "python_version": sys.version.split()[0],
+        "python_implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "created_at": time.time(),
+    }
+
+
+def save_results(path, results):
+    with open(path, "w") as results_file:
+        json.dump({"environment": get_environment(), "results": results}, results_file, indent=2)
+
+
+def load_results(path):
+    with open(path) as results_file:
+        return json.load(results_file)["results"]
+
+
+def compare_results(baseline, results, threshold=10.0):
+    """
+        changes of results against a baseline run
+    :param threshold: percents, slower p50 or lower throughput beyond it is a regression
+    :return: [(name, p50 change %, ops/sec change %, regressed)]
+    """
+    baseline_by_name = {result["name"]: result for result in baseline}
+    changes = []
+    for result in results:
+        baseline_result = baseline_by_name.get(result["name"])
+        if baseline_result is None:
+            continue
+        p50_change = (result["p50_us"] / baseline_result["p50_us"] - 1) * 100 if baseline_result["p50_us"] else 0.0
+        ops_change = (result["ops_per_sec"] / baseline_result["ops_per_sec"] - 1) * 100 \
+            if baseline_result["ops_per_sec"] else 0.0
+        changes.append((result["name"], p50_change, ops_change, p50_change > threshold or -ops_change > threshold))
+    return changes
+
+
+def format_results(results):
+    lines = ["%-36s %12s %10s %10s %10s %10s %12s" % (
+        "benchmark", "ops/sec", "p50 us", "p90 us", "p99 us", "max us", "peak KiB")]
+    for result in results:
+        peak = result.get("peak_alloc_bytes")
+        lines.append("%-36s %12.1f %10.1f %10.1f %10.1f %10.1f %12s" % (
+            result["name"], result["ops_per_sec"] or 0, result["p50_us"], result["p90_us"], result["p99_us"],
+            result["max_us"], "%.1f" % (peak / 1024.0) if peak is not None else "-"))
+    return "\n".join(lines)
+
+
+def format_comparison(changes):
+    lines = ["%-36s %12s %12s" % ("benchmark", "p50 change", "ops change")]
+    for name, p50_change, ops_change, regressed in changes:
+        lines.append("%-36s %+11.1f%% %+11.1f%%%s" % (name, p50_change, ops_change, "  REGRESSION" if regressed else ""))
+    return "\n".join(lines)
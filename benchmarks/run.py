@@ -0,0 +1,165 @@
+"""
+    offline benchmarks of query generation, schema compilation and suggestions, elasticsearch is replaced with a stub.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --filter parse --filter build --compare results.json
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+
+import django
+from django.conf import settings
+
+from .generators import generate_deep_search, generate_mappings, generate_wide_search
+from .harness import (Benchmark, compare_results, format_comparison, format_results, load_results, run_benchmark,
+                      save_results)
+from .stub import BenchmarkSchemaFactory, StubElasticsearch
+
+INDEX = "bench"
+
+
+def configure_django():
+    if not settings.configured:
+        settings.configure(ELASTIC_DQL={
+            "schema_factory": "benchmarks.stub.BenchmarkSchemaFactory",
+            "default_index": INDEX,
+            "mappings_ttl": None,
+        })
+        django.setup()
+
+
+def get_benchmarks(field_count=10000, clauses=100, depth=50):
+    from django.test import RequestFactory
+
+    from elastic_dql.field import FieldMapper
+    from elastic_dql.optimizer import optimize_query
+    from elastic_dql.parser import parse, warm_up_parser
+    from elastic_dql.query import build_query, generate_query, get_query
+    from elastic_dql.schema import ElasticDjangoQlSchema, field_registries, get_schema_instance
+    from elastic_dql.serializers import serialize_mappings
+    from elastic_dql.views import SuggestionsAPIView
+
+    mappings, fields = generate_mappings(field_count=1000)
+    large_mappings, _ = generate_mappings(field_count=field_count)
+    suggestion_values = ["value-%s" % number for number in range(1000)]
+    BenchmarkSchemaFactory.client = StubElasticsearch(mappings, suggestion_values)
+    warm_up_parser()
+    schema_instance = get_schema_instance(INDEX)
+    wide_search = generate_wide_search(fields, clauses=clauses)
+    deep_search = generate_deep_search(fields, depth=depth)
+
+    def build(search):
+        def setup():
+            ast = parse(search)
+            return lambda: build_query(ast, schema_instance)
+        return setup
+
+    def optimize(search):
+        def setup():
+            query, inverted = build_query(parse(search), schema_instance)
+            return lambda: optimize_query(query, schema_instance)
+        return setup
+
+    def compile_schema():
+        client = StubElasticsearch(large_mappings)
+
+        def func():
+            # shared registries of same mappings would turn this into a lookup
+            field_registries.clear()
+            ElasticDjangoQlSchema(client, INDEX).get_mappings()
+        return func
+
+    def load_compiled_snapshot():
+        snapshot_directory = tempfile.mkdtemp()
+        path = os.path.join(snapshot_directory, "bench.edql")
+        client = StubElasticsearch(large_mappings)
+        ElasticDjangoQlSchema(client, INDEX).save_compiled_snapshot(path)
+
+        def func():
+            field_registries.clear()
+            ElasticDjangoQlSchema(client, INDEX).load_compiled_snapshot(path)
+        return func
+
+    def serialize_large_mappings():
+        large_fields = ElasticDjangoQlSchema(StubElasticsearch(large_mappings), INDEX).get_mappings()
+        return lambda: json.dumps(serialize_mappings(large_fields))
+
+    def suggestions_view(cached):
+        view = SuggestionsAPIView.as_view()
+        request_factory = RequestFactory()
+        field_name = next(name for name, field_type in fields if field_type == "keyword")
+        counter = itertools.count()
+
+        def func():
+            # a new search on every call misses the suggestions cache
+            search = "value" if cached else "value-%s" % next(counter)
+            view(request_factory.get("/suggestions/", {"search": search, "index": INDEX}), field=field_name)
+        return func
+
+    return [
+        Benchmark("parse.wide", lambda: lambda: parse(wide_search), iterations=500),
+        Benchmark("parse.deep", lambda: lambda: parse(deep_search), iterations=500),
+        Benchmark("build.wide", build(wide_search), iterations=500),
+        Benchmark("build.deep", build(deep_search), iterations=500),
+        Benchmark("optimize.wide", optimize(wide_search), iterations=500),
+        Benchmark("optimize.deep", optimize(deep_search), iterations=500),
+        Benchmark("generate.wide", lambda: lambda: generate_query(wide_search, schema_instance), iterations=300),
+        Benchmark("generate.cached", lambda: lambda: get_query(INDEX, wide_search), iterations=2000),
+        Benchmark("schema.field_mapper", lambda: lambda: FieldMapper().get_properties(large_mappings),
+                  iterations=20),
+        Benchmark("schema.compile", compile_schema, iterations=20),
+        Benchmark("schema.load_compiled_snapshot", load_compiled_snapshot, iterations=20),
+        Benchmark("serialize.mappings", serialize_large_mappings, iterations=50),
+        Benchmark("serialize.query", lambda: lambda: json.dumps(generate_query(wide_search, schema_instance)),
+                  iterations=300),
+        Benchmark("suggestions.view", lambda: suggestions_view(cached=False), iterations=1000),
+        Benchmark("suggestions.view_cached", lambda: suggestions_view(cached=True), iterations=2000),
+    ]
+
+
+def get_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="offline benchmarks of elastic_dql")
+    parser.add_argument("--filter", action="append", default=[],
+                        help="run benchmarks whose name contains this, can be repeated")
+    parser.add_argument("--iterations", type=int, help="iterations of every benchmark instead of their defaults")
+    parser.add_argument("--fields", type=int, default=10000, help="number of fields of large mappings")
+    parser.add_argument("--clauses", type=int, default=100, help="number of comparisons of wide searches")
+    parser.add_argument("--depth", type=int, default=50, help="nesting depth of deep searches")
+    parser.add_argument("--no-allocations", action="store_true", help="skip measuring allocations")
+    parser.add_argument("--output", help="save results to this json file")
+    parser.add_argument("--compare", help="compare results with a json file of a previous run")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="percents of slowdown which counts as a regression in comparison")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    arguments = get_arguments(argv)
+    configure_django()
+    benchmarks = get_benchmarks(field_count=arguments.fields, clauses=arguments.clauses, depth=arguments.depth)
+    if arguments.filter:
+        benchmarks = [benchmark for benchmark in benchmarks
+                      if any(pattern in benchmark.name for pattern in arguments.filter)]
+    results = []
+    for benchmark in benchmarks:
+        results.append(run_benchmark(benchmark, iterations=arguments.iterations,
+                                     allocations=not arguments.no_allocations))
+        print(format_results(results[-1:]).splitlines()[-1], file=sys.stderr)
+    print(format_results(results))
+    if arguments.output:
+        save_results(arguments.output, results)
+    if arguments.compare:
+        changes = compare_results(load_results(arguments.compare), results, threshold=arguments.threshold)
+        print()
+        print(format_comparison(changes))
+        if any(regressed for _, _, _, regressed in changes):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+from elastic_dql.schema import SchemaFactory
+
+
+class StubIndicesClient(object):
+    def __init__(self, mappings):
+        self.mappings = mappings
+
+    def get_mapping(self, index, **kwargs):
+        return {name: {"mappings": self.mappings} for name in index.split(",")}
+
+
+class StubElasticsearch(object):
+    """
+        answers requests of elastic_dql with fixed responses, so benchmarks don't need an elasticsearch cluster
+    """
+
+    def __init__(self, mappings, suggestion_values=()):
+        self.indices = StubIndicesClient(mappings)
+        self.suggestion_values = list(suggestion_values)
+
+    def search(self, index, size=0, query=None, aggregations=None, **kwargs):
+        page_size = aggregations["values"]["composite"]["size"] if aggregations else 10
+        buckets = [{"key": {"value": value}, "doc_count": 1} for value in self.suggestion_values[:page_size]]
+        response = {"hits": {"hits": []}, "aggregations": {"values": {"buckets": buckets}}}
+        if len(buckets) == page_size:
+            response["aggregations"]["values"]["after_key"] = buckets[-1]["key"]
+        return response
+
+    def terms_enum(self, index, field, string=None, size=10, **kwargs):
+        return {"terms": self.suggestion_values[:size], "complete": len(self.suggestion_values) <= size}
+
+
+class BenchmarkSchemaFactory(SchemaFactory):
+    """
+        schema factory of benchmarks, all indices are served by one stub client
+    """
+    client = None
+
+    def _create_elastic_connection(self):
+        return self.client
@@ -0,0 +1,133 @@
+from .exceptions import ExecutionError, InvalidParameter, SchemaError
+from .field import DateField, FloatField, LongField
+from .instrumentation import stage
+from .query import get_query
+from .schema import get_schema_instance
+from .serializers import serialize_aggregations_response
+from .sorting import get_sort_field
+
+AGGREGATION_TYPES = ("terms", "histogram", "date_histogram", "stats")
+CALENDAR_INTERVALS = ("minute", "hour", "day", "week", "month", "quarter", "year",
+                      "1m", "1h", "1d", "1w", "1M", "1q", "1y")
+DEFAULT_TERMS_SIZE = 10
+DEFAULT_CALENDAR_INTERVAL = "month"
+
+
+def parse_aggregation_spec(spec):
+    """
+    :param spec: "type:field[:param]" e.g. "terms:status:20", "histogram:age:10", "date_histogram:created:week",
+        "stats:price", or a dict of type, field, param and an optional name
+    :return: dict of name, type, field and param
+    """
+    if isinstance(spec, str):
+        parts = spec.split(":")
+        if len(parts) not in (2, 3):
+            raise InvalidParameter("invalid aggregation: %s, it must be type:field[:param]" % spec)
+        spec = {"type": parts[0], "field": parts[1], "param": parts[2] if len(parts) == 3 else None}
+    if spec.get("type") not in AGGREGATION_TYPES:
+        raise InvalidParameter("aggregation type must be one of %s" % ", ".join(AGGREGATION_TYPES))
+    if not spec.get("field"):
+        raise InvalidParameter("field of aggregation is not specified")
+    return {"name": spec.get("name") or "%s_%s" % (spec["type"], spec["field"]), "type": spec["type"],
+            "field": spec["field"], "param": spec.get("param")}
+
+
+class AggregationBuilder(object):
+    """
+        compiles facets, histograms and stats of schema fields to aggregations of one search request, so a page
+        with many facets sends one request instead of one per facet
+    """
+
+    def __init__(self, schema_instance):
+        self.schema_instance = schema_instance
+
+    def build(self, specs):
+        """
+        :param specs: aggregation specs, see parse_aggregation_spec
+        :return: {name: aggregation}
+        """
+        aggregations = {}
+        for spec in map(parse_aggregation_spec, specs):
+            if spec["name"] in aggregations:
+                raise InvalidParameter("duplicate aggregation: %s" % spec["name"])
+            aggregations[spec["name"]] = getattr(self, "build_%s" % spec["type"])(spec["field"], spec["param"])
+        return aggregations
+
+    def build_terms(self, field_name, size=None):
+        # terms of text fields are counted on their keyword subfield, same as sorting
+        field = get_sort_field(self.schema_instance, field_name)
+        return {"terms": {"field": field.name, "size": self.get_number(size, DEFAULT_TERMS_SIZE, int)}}
+
+    def build_histogram(self, field_name, interval=None):
+        field = self.get_field(field_name, (LongField, FloatField), "numeric")
+        if interval is None:
+            raise InvalidParameter("interval of histogram on %s is not specified" % field_name)
+        return {"histogram": {"field": field.name, "interval": self.get_number(interval, None, float)}}
+
+    def build_date_histogram(self, field_name, interval=None):
+        field = self.get_field(field_name, (DateField,), "date")
+        interval = interval or DEFAULT_CALENDAR_INTERVAL
+        interval_type = "calendar_interval" if interval in CALENDAR_INTERVALS else "fixed_interval"
+        return {"date_histogram": {"field": field.name, interval_type: interval}}
+
+    def build_stats(self, field_name, param=None):
+        field = self.get_field(field_name, (LongField, FloatField, DateField), "numeric or date")
+        return {"stats": {"field": field.name}}
+
+    def get_field(self, field_name, field_classes, description):
+        field = get_sort_field(self.schema_instance, field_name)
+        if not isinstance(field, field_classes):
+            raise SchemaError("field %s is not a %s field" % (field_name, description))
+        return field
+
+    @staticmethod
+    def get_number(value, default, number_type):
+        if value is None:
+            return default
+        try:
+            number = number_type(value)
+        except (TypeError, ValueError):
+            raise InvalidParameter("invalid aggregation parameter: %s" % value)
+        if number <= 0:
+            raise InvalidParameter("aggregation parameter must be positive: %s" % value)
+        return int(number) if number_type is float and number == int(number) else number
+
+
+def build_aggregations(schema_instance, specs):
+    return AggregationBuilder(schema_instance).build(specs)
+
+
+def get_aggregations_query(index, search, specs, size=0, track_total_hits=None):
+    """
+        one search request of a DQL search and all aggregations of specs, e.g.
+        get_aggregations_query(index, 'age > 10', ["terms:status", "histogram:age:10", "stats:price"])
+    :param size: number of hits, 0 (default) only counts matches and runs aggregations
+    :param track_total_hits: see get_query, e.g. True for exact total of more than 10000 matches
+    """
+    schema_instance = get_schema_instance(index)
+    if search:
+        query = get_query(index, search, track_total_hits=track_total_hits)
+    else:
+        query = {"query": {"match_all": {}}}
+        if track_total_hits is not None:
+            query["track_total_hits"] = track_total_hits
+    if size == 0:
+        # hits are not returned, so their sort doesn't matter
+        query.pop("sort", None)
+    query["size"] = size
+    query["aggs"] = build_aggregations(schema_instance, specs)
+    return query
+
+
+def execute_aggregations(index, search, specs, size=0, track_total_hits=None):
+    """
+    :return: {"total": number of matches, "aggregations": {name: buckets or stats}, "hits": hits}
+    """
+    schema_instance = get_schema_instance(index)
+    query = get_aggregations_query(index, search, specs, size=size, track_total_hits=track_total_hits)
+    try:
+        with stage("client.search", {"index": index}):
+            result = schema_instance.client.search(index=index, **query)
+    except Exception as exception:
+        raise ExecutionError(str(exception))
+    return serialize_aggregations_response(result)
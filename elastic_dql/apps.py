@@ -0,0 +1,27 @@
+import logging
+
+from django.apps import AppConfig
+
+logger = logging.getLogger(__name__)
+
+
+class ElasticDqlAppConfig(AppConfig):
+    name = "elastic_dql"
+
+    def ready(self):
+        from .config import get_dql_config
+        from .exceptions import SchemaError
+        from .instrumentation import configure_instrumentation
+        from .parser import warm_up_parser
+        from .schema import warm_up_schemas
+
+        dql_config = get_dql_config()
+        configure_instrumentation(dql_config.instrumentation_sinks)
+        if not dql_config.warm_up_on_startup:
+            return
+        warm_up_parser()
+        try:
+            warm_up_schemas(snapshot_path=dql_config.mappings_snapshot)
+        except SchemaError as exception:
+            # schemas are loaded on their first request instead
+            logger.warning("warming up schemas failed: %s", exception)
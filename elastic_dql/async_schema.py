@@ -0,0 +1,160 @@
+import asyncio
+import time
+from functools import lru_cache
+
+from django.utils.module_loading import import_string
+
+from .config import get_dql_config
+from .connections import get_async_connection
+from .exceptions import SchemaError
+from .instrumentation import stage
+from .serializers import decode_cursor
+from .schema import SchemaFactory, ElasticDjangoQlSchema, logger
+from .suggestions import DEFAULT_SUGGESTIONS_SIZE
+
+
+class AsyncSchemaFactoryMixin(object):
+    """
+        creates schema instances with an AsyncElasticsearch client, other options are of the factory it is mixed with
+    """
+
+    def _create_elastic_connection(self):
+        dql_config = get_dql_config()
+        elastic_connection = get_async_connection(dql_config.elastic_connection_params)
+        return elastic_connection
+
+
+class AsyncSchemaFactory(AsyncSchemaFactoryMixin, SchemaFactory):
+    """
+        SchemaFactory of AsyncElasticDjangoQlSchema, index limits are the same as SchemaFactory
+    """
+
+
+@lru_cache(maxsize=None)
+def get_async_schema_factory_class(schema_factory_cls):
+    """
+        async factory of a (customized) sync factory, so both have the same index and field limits.
+        classes are cached, so there is one singleton instance per factory
+    """
+    if schema_factory_cls is SchemaFactory:
+        return AsyncSchemaFactory
+    return type("Async%s" % schema_factory_cls.__name__, (AsyncSchemaFactoryMixin, schema_factory_cls), {})
+
+
+class AsyncElasticDjangoQlSchema(ElasticDjangoQlSchema):
+    """
+        ElasticDjangoQlSchema on top of AsyncElasticsearch.
+        resolve_name is not a coroutine, so mappings must be loaded with ``await ensure_mappings()`` before it
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(AsyncElasticDjangoQlSchema, self).__init__(*args, **kwargs)
+        self._async_refresh_locks = {}
+        self._refresh_task = None
+
+    async def get_mappings(self):
+        await self.ensure_mappings()
+        return self.valid_properties
+
+    async def refresh_mappings(self):
+        try:
+            with stage("get_mapping", {"index": self.index}):
+                result = await self.client.indices.get_mapping(index=self.index)
+        except Exception as e:
+            raise SchemaError(str(e))
+        return self.load_mappings(self._get_index_mappings(result))
+
+    async def ensure_mappings(self):
+        refresh_lock = self._get_async_refresh_lock()
+        if self._mappings_loaded_at is None:
+            async with refresh_lock:
+                if self._mappings_loaded_at is None:
+                    await self.refresh_mappings()
+        elif self._mappings_expired() and not refresh_lock.locked():
+            if self.background_refresh:
+                # a task of a closed loop never finishes
+                if self._refresh_task is None or self._refresh_task.done() or \
+                        self._refresh_task.get_loop().is_closed():
+                    self._refresh_task = asyncio.ensure_future(self._refresh_expired_mappings())
+            else:
+                await self._refresh_expired_mappings()
+
+    async def suggestions(self, field_name, search=None, size=None, after=None):
+        await self.ensure_mappings()
+        field = self._get_suggestion_field(field_name)
+        strategy = self.get_suggestion_strategy(field, search)
+        size = size or DEFAULT_SUGGESTIONS_SIZE
+        after = decode_cursor(after)
+        cached_result = self._get_cached_suggestions(field, search, strategy, size, after)
+        if cached_result is not None:
+            return cached_result
+        method, params = strategy.get_request(field, search, size, after=after)
+        try:
+            with stage("client.%s" % method, {"index": self.index, "field": field.name}):
+                result = await getattr(self.client, method)(index=self.index, **params)
+        except Exception as exception:
+            raise SchemaError(str(exception))
+        return self._get_suggestions_page(field, search, strategy, size, after, result)
+
+    def _ensure_mappings(self):
+        if self._mappings_loaded_at is None:
+            raise SchemaError("mappings of %s are not loaded, await ensure_mappings() first" % self.index)
+
+    def _get_async_refresh_lock(self):
+        """
+            asyncio locks are bound to one event loop and schema instances outlive loops (e.g. async views under WSGI
+            run in a new loop per request), so there is a lock per running loop
+        """
+        loop = asyncio.get_running_loop()
+        lock = self._async_refresh_locks.get(loop)
+        if lock is None:
+            self._async_refresh_locks = {other_loop: other_lock
+                                         for other_loop, other_lock in self._async_refresh_locks.items()
+                                         if not other_loop.is_closed()}
+            lock = self._async_refresh_locks.setdefault(loop, asyncio.Lock())
+        return lock
+
+    async def _refresh_expired_mappings(self):
+        async with self._get_async_refresh_lock():
+            if not self._mappings_expired():
+                return
+            try:
+                await self.refresh_mappings()
+            except SchemaError as exception:
+                logger.warning("refreshing mappings of %s failed: %s", self.index, exception)
+                # don't retry on every request while elasticsearch is unavailable
+                self._mappings_loaded_at = time.monotonic()
+
+
+class AsyncSchemaHandler:
+    schema_factory = None
+    schema_cls = None
+    initiated = False
+
+    @staticmethod
+    def initiate():
+        dql_config = get_dql_config()
+        if not AsyncSchemaHandler.initiated:
+            if dql_config.async_schema_factory_path:
+                schema_factory_cls = import_string(dql_config.async_schema_factory_path)
+            else:
+                schema_factory_cls = get_async_schema_factory_class(import_string(dql_config.schema_factory_path))
+            AsyncSchemaHandler.schema_factory = schema_factory_cls.get_instance()
+            AsyncSchemaHandler.schema_cls = import_string(dql_config.async_default_schema_path)
+            AsyncSchemaHandler.initiated = True
+        return AsyncSchemaHandler.schema_factory, AsyncSchemaHandler.schema_cls
+
+
+def get_async_schema_instance(index):
+    schema_factory, schema_cls = AsyncSchemaHandler().initiate()
+    schema_instance = schema_factory.get_schema_instance(schema_cls, index)
+    return schema_instance
+
+
+async def aget_async_schema_instance(index):
+    """
+        get schema instance of index with loaded mappings
+    """
+    schema_instance = get_async_schema_instance(index)
+    await schema_instance.ensure_mappings()
+    return schema_instance
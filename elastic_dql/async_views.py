@@ -0,0 +1,48 @@
+import json
+
+from django.http import HttpResponse
+
+from .async_schema import aget_async_schema_instance
+from .exceptions import IndexNotSpecified, SchemaError, InvalidParameter
+from .instrumentation import stage
+from .serializers import serialize_mappings
+from .views import BaseAPIView
+
+
+class AsyncMappingsAPIView(BaseAPIView):
+    http_method_names = ['get']
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            index = self._get_index(request)
+            schema_instance = await aget_async_schema_instance(index)
+            mappings = await schema_instance.get_mappings()
+        except (SchemaError, IndexNotSpecified) as exception:
+            return self._error(str(exception))
+        with stage("serialize", {"response": "mappings"}):
+            content = json.dumps(serialize_mappings(mappings), indent=2)
+        return HttpResponse(
+            content=content,
+            content_type='application/json; charset=utf-8',
+        )
+
+
+class AsyncSuggestionsAPIView(BaseAPIView):
+    http_method_names = ['get']
+
+    async def get(self, request, field, *args, **kwargs):
+        try:
+            index = self._get_index(request)
+            schema_instance = await aget_async_schema_instance(index)
+            search = request.GET.get("search")
+            size = self._get_size(request)
+            after = request.GET.get("after")
+            suggestions = await schema_instance.suggestions(field, search=search, size=size, after=after)
+        except (SchemaError, IndexNotSpecified, InvalidParameter) as exception:
+            return self._error(message=str(exception))
+        with stage("serialize", {"response": "suggestions"}):
+            content = json.dumps(suggestions, indent=2)
+        return HttpResponse(
+            content=content,
+            content_type='application/json; charset=utf-8',
+        )
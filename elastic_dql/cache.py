@@ -0,0 +1,230 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.utils.module_loading import import_string
+
+from .config import get_dql_config
+
+
+class LRUCache(object):
+    """
+        thread safe bounded cache, least recently used entries are evicted first
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def __len__(self):
+        return len(self._data)
+
+
+class QueryCacheHandler:
+    query_cache = None
+    initiated = False
+
+    @staticmethod
+    def initiate():
+        if not QueryCacheHandler.initiated:
+            dql_config = get_dql_config()
+            if dql_config.query_cache_size:
+                QueryCacheHandler.query_cache = LRUCache(dql_config.query_cache_size)
+            QueryCacheHandler.initiated = True
+        return QueryCacheHandler.query_cache
+
+
+def get_query_cache():
+    """
+    :return: LRUCache of generated queries or None if query cache is disabled
+    """
+    return QueryCacheHandler.initiate()
+
+
+def contains(value, search):
+    return search in str(value)
+
+
+class AbstractSuggestionCache(object):
+    """
+        cache of suggestion values per index, field and search.
+        if values of a shorter prefix of search are complete (not limited by elasticsearch), values of search are
+        filtered from them instead of asking elasticsearch again.
+    """
+
+    def __init__(self, ttl=60, **options):
+        self.ttl = ttl
+
+    def get(self, index, field_name, search, matches=contains):
+        """
+        :return: (values, complete) or None if they are not cached
+        """
+        search = search or ""
+        keys = [self.get_key(index, field_name, search[:length]) for length in range(len(search), -1, -1)]
+        entries = self.get_many(keys)
+        entry = entries.get(keys[0])
+        if entry is not None:
+            return entry
+        if matches is None:
+            return None
+        for key in keys[1:]:
+            entry = entries.get(key)
+            if entry is not None and entry[1]:
+                return [value for value in entry[0] if matches(value["key"], search)], True
+        return None
+
+    def set(self, index, field_name, search, values, complete):
+        """
+        :param values: first page of values
+        :param complete: values contain all values of search
+        """
+        self.set_value(self.get_key(index, field_name, search or ""), (values, complete))
+
+    def get_key(self, index, field_name, search):
+        return index, field_name, search
+
+    def get_many(self, keys):
+        raise NotImplementedError
+
+    def set_value(self, key, value):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class LocMemSuggestionCache(AbstractSuggestionCache):
+    """
+        in memory cache of each process, least recently used values are evicted after max_size
+    """
+
+    def __init__(self, ttl=60, max_size=1024, **options):
+        super(LocMemSuggestionCache, self).__init__(ttl=ttl, **options)
+        self.cache = LRUCache(max_size)
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        entries = {}
+        for key in keys:
+            value = self.cache.get(key)
+            if value is not None and value[0] > now:
+                entries[key] = copy_entry(value[1])
+        return entries
+
+    def set_value(self, key, value):
+        self.cache.set(key, (time.monotonic() + self.ttl, copy_entry(value)))
+
+    def clear(self):
+        self.cache.clear()
+
+
+def copy_entry(entry):
+    # callers get their own values, changing them doesn't change cached values
+    values, complete = entry
+    return [dict(value) for value in values], complete
+
+
+class DjangoSuggestionCache(AbstractSuggestionCache):
+    """
+        suggestion cache on top of django cache framework, it can be shared between processes.
+        the cache alias can be shared with other apps, so clear() doesn't clear it: entries are stored with a cache
+        version which is changed by clear() and old entries expire after ttl
+    """
+    key_prefix = "elastic_dql:suggestions:"
+    version_key = "elastic_dql:suggestions-version"
+
+    def __init__(self, ttl=60, alias="default", **options):
+        super(DjangoSuggestionCache, self).__init__(ttl=ttl, **options)
+        self.alias = alias
+
+    @property
+    def cache(self):
+        from django.core.cache import caches
+        return caches[self.alias]
+
+    def get_key(self, index, field_name, search):
+        key = "\x00".join((index, field_name, search))
+        return self.key_prefix + hashlib.sha1(key.encode()).hexdigest()
+
+    def get_many(self, keys):
+        return self.cache.get_many(keys, version=self.get_version())
+
+    def set_value(self, key, value):
+        self.cache.set(key, value, timeout=self.ttl, version=self.get_version())
+
+    def get_version(self):
+        version = self.cache.get(self.version_key)
+        if version is None:
+            # starting from current time, an evicted version key doesn't bring back entries of cleared versions
+            self.cache.add(self.version_key, time.time_ns(), timeout=None)
+            version = self.cache.get(self.version_key)
+        return version
+
+    def clear(self):
+        self.get_version()
+        try:
+            self.cache.incr(self.version_key)
+        except ValueError:
+            # version key is evicted after get_version
+            self.get_version()
+
+
+class SuggestionCacheHandler:
+    suggestion_cache = None
+    initiated = False
+
+    @staticmethod
+    def initiate():
+        if not SuggestionCacheHandler.initiated:
+            dql_config = get_dql_config()
+            if dql_config.suggestions_cache:
+                options = dict(dql_config.suggestions_cache)
+                suggestion_cache_cls = import_string(options.pop("backend"))
+                SuggestionCacheHandler.suggestion_cache = suggestion_cache_cls(**options)
+            SuggestionCacheHandler.initiated = True
+        return SuggestionCacheHandler.suggestion_cache
+
+
+def get_suggestion_cache():
+    """
+    :return: suggestion cache or None if it is disabled
+    """
+    return SuggestionCacheHandler.initiate()
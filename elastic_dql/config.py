@@ -7,9 +7,28 @@ class ElasticDqlConfig:
     __instance = None
     schema_factory_path = None
     default_schema_path = None
+    async_schema_factory_path = None
+    async_default_schema_path = None
     default_index = None
     accept_index_param = None
     elastic_connection_params = None
+    mappings_ttl = None
+    mappings_background_refresh = None
+    query_cache_size = None
+    suggestions_cache = None
+    suggestion_strategies = None
+    suggestions_size = None
+    suggestions_max_size = None
+    expensive_queries = None
+    warm_up_on_startup = None
+    warm_up_indices = None
+    mappings_snapshot = None
+    compiled_schemas_dir = None
+    instrumentation_sinks = None
+    execution_page_size = None
+    execution_max_page_size = None
+    execution_keep_alive = None
+    execution_max_slices = None
 
     def __init__(self, django_settings, default_settings):
         self.django_settings = django_settings
@@ -20,11 +39,37 @@ class ElasticDqlConfig:
         settings = self.defaults if not self.django_settings else self.django_settings
         self.schema_factory_path = settings.get("schema_factory", self.defaults.get("schema_factory"))
         self.default_schema_path = settings.get("default_schema", self.defaults.get("default_schema"))
+        self.async_schema_factory_path = settings.get("async_schema_factory",
+                                                      self.defaults.get("async_schema_factory"))
+        self.async_default_schema_path = settings.get("async_default_schema",
+                                                      self.defaults.get("async_default_schema"))
         self.default_index = settings.get("default_index", self.defaults.get("default_index"))
         self.accept_index_param = settings.get("accept_index_param", self.defaults.get("accept_index_param"))
         if not (self.accept_index_param or self.default_index):
             raise ConfigError("if accept_index_param is false default_index must be specified")
         self.elastic_connection_params = settings.get("connection", self.defaults.get("connection"))
+        self.mappings_ttl = settings.get("mappings_ttl", self.defaults.get("mappings_ttl"))
+        self.mappings_background_refresh = settings.get("mappings_background_refresh",
+                                                        self.defaults.get("mappings_background_refresh"))
+        self.query_cache_size = settings.get("query_cache_size", self.defaults.get("query_cache_size"))
+        self.suggestions_cache = settings.get("suggestions_cache", self.defaults.get("suggestions_cache"))
+        self.suggestion_strategies = settings.get("suggestion_strategies",
+                                                  self.defaults.get("suggestion_strategies"))
+        self.suggestions_size = settings.get("suggestions_size", self.defaults.get("suggestions_size"))
+        self.suggestions_max_size = settings.get("suggestions_max_size", self.defaults.get("suggestions_max_size"))
+        self.expensive_queries = settings.get("expensive_queries", self.defaults.get("expensive_queries"))
+        self.warm_up_on_startup = settings.get("warm_up_on_startup", self.defaults.get("warm_up_on_startup"))
+        self.warm_up_indices = settings.get("warm_up_indices", self.defaults.get("warm_up_indices"))
+        self.mappings_snapshot = settings.get("mappings_snapshot", self.defaults.get("mappings_snapshot"))
+        self.compiled_schemas_dir = settings.get("compiled_schemas_dir", self.defaults.get("compiled_schemas_dir"))
+        self.instrumentation_sinks = settings.get("instrumentation_sinks", self.defaults.get("instrumentation_sinks"))
+        self.execution_page_size = settings.get("execution_page_size", self.defaults.get("execution_page_size"))
+        self.execution_max_page_size = settings.get("execution_max_page_size",
+                                                    self.defaults.get("execution_max_page_size"))
+        self.execution_keep_alive = settings.get("execution_keep_alive", self.defaults.get("execution_keep_alive"))
+        self.execution_max_slices = settings.get("execution_max_slices", self.defaults.get("execution_max_slices"))
+        if self.expensive_queries not in ("allow", "warn", "deny"):
+            raise ConfigError("expensive_queries must be one of allow, warn or deny")
 
     @staticmethod
     def get_config_instance(django_settings, default_settings):
@@ -36,11 +81,39 @@ class ElasticDqlConfig:
 DEFAULTS = {
     "schema_factory": "elastic_dql.schema.SchemaFactory",
     "default_schema": "elastic_dql.schema.ElasticDjangoQlSchema",
+    "async_schema_factory": None,  # None means schema_factory with an async client
+    "async_default_schema": "elastic_dql.async_schema.AsyncElasticDjangoQlSchema",
     "default_index": None,
     "accept_index_param": True,  # if false default_index should be specified
     "connection": {
         "hosts": ["http://localhost"],
-    }
+    },
+    "mappings_ttl": 300,  # seconds, None means mappings are fetched once
+    "mappings_background_refresh": False,
+    "query_cache_size": 1024,  # number of cached generated queries, 0 disables the cache
+    "suggestions_cache": {  # None disables the cache
+        "backend": "elastic_dql.cache.LocMemSuggestionCache",
+        "ttl": 60,
+        "max_size": 1024,
+    },
+    # first available strategy is used for suggestions, from the cheapest one
+    "suggestion_strategies": ["completion", "search_as_you_type", "terms"],
+    "suggestions_size": 10,  # default page size of suggestions api
+    "suggestions_max_size": 100,
+    # leading wildcard queries which can't use a cheaper field are allowed, logged (warn) or rejected (deny)
+    "expensive_queries": "allow",
+    # load schemas of warm_up_indices, default_index and include_indices in AppConfig.ready
+    "warm_up_on_startup": False,
+    "warm_up_indices": [],
+    "mappings_snapshot": None,  # path of a snapshot file to load mappings from instead of elasticsearch
+    # directory of compiled schema snapshots shared by worker processes, None disables them
+    "compiled_schemas_dir": None,
+    # stage timings and cache counters are sent to these sinks, e.g. ["elastic_dql.instrumentation.LoggingSink"]
+    "instrumentation_sinks": [],
+    "execution_page_size": 1000,  # hits per search request of search api
+    "execution_max_page_size": 10000,
+    "execution_keep_alive": "1m",  # keep alive of point in time between pages
+    "execution_max_slices": 8,  # max concurrent slices of a search api request
 }
 
 
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import threading
+
+from elasticsearch import Elasticsearch, AsyncElasticsearch
+
+
+class ConnectionRegistry(object):
+    """
+        keeps one shared client per connection config.
+        elasticsearch clients are thread safe and pool their http connections, so
+        creating a new client per request only throws the pool away.
+    """
+
+    def __init__(self, client_cls):
+        self.client_cls = client_cls
+        self._connections = {}
+        self._lock = threading.Lock()
+
+    def get_connection(self, connection_params):
+        key = self._get_key(connection_params)
+        connection = self._connections.get(key)
+        if connection is None:
+            with self._lock:
+                connection = self._connections.get(key)
+                if connection is None:
+                    connection = self.client_cls(**connection_params)
+                    self._connections[key] = connection
+        return connection
+
+    def clear(self):
+        for connection in self._pop_connections():
+            connection.close()
+
+    def _pop_connections(self):
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections = {}
+        return connections
+
+    @staticmethod
+    def _get_key(connection_params):
+        return json.dumps(connection_params, sort_keys=True, default=repr)
+
+
+class AsyncConnectionRegistry(ConnectionRegistry):
+    """
+        async clients must be created and closed in the event loop which uses them, so clients are kept per running
+        event loop. async views under WSGI run in a new loop per request (async_to_sync), clients of closed loops are
+        dropped without closing them, their loop can't run close() anymore.
+    """
+
+    def get_connection(self, connection_params):
+        with self._lock:
+            self._connections = {key: connection for key, connection in self._connections.items()
+                                 if not key[0].is_closed()}
+        return super(AsyncConnectionRegistry, self).get_connection(connection_params)
+
+    async def clear(self):
+        loop = asyncio.get_running_loop()
+        for key, connection in self._pop_connections():
+            if key[0] is loop:
+                await connection.close()
+
+    def _pop_connections(self):
+        with self._lock:
+            connections = list(self._connections.items())
+            self._connections = {}
+        return connections
+
+    def _get_key(self, connection_params):
+        return asyncio.get_running_loop(), super(AsyncConnectionRegistry, self)._get_key(connection_params)
+
+
+class AsyncConnection(object):
+    """
+        AsyncElasticsearch of the running event loop. schema instances outlive event loops, so they keep this instead
+        of a client and every request uses the client of its own loop
+    """
+
+    def __init__(self, registry, connection_params):
+        self.registry = registry
+        self.connection_params = connection_params
+
+    def __getattr__(self, name):
+        return getattr(self.registry.get_connection(self.connection_params), name)
+
+
+connections = ConnectionRegistry(Elasticsearch)
+async_connections = AsyncConnectionRegistry(AsyncElasticsearch)
+
+
+def get_connection(connection_params):
+    return connections.get_connection(connection_params)
+
+
+def get_async_connection(connection_params):
+    """
+        AsyncElasticsearch needs aiohttp, install it with ``pip install elasticsearch[async]``
+    :return: AsyncConnection, it uses a client of the running event loop
+    """
+    return AsyncConnection(async_connections, connection_params)
@@ -19,3 +19,15 @@ class ConfigError(ElasticDjangoQLError):
 
 class IndexNotSpecified(ElasticDjangoQLError):
     pass
+
+
+class TemplateError(ElasticDjangoQLError):
+    pass
+
+
+class InvalidParameter(ElasticDjangoQLError):
+    pass
+
+
+class ExecutionError(ElasticDjangoQLError):
+    pass
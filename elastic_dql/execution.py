@@ -0,0 +1,274 @@
+import json
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import get_dql_config
+from .exceptions import ExecutionError
+from .instrumentation import stage
+from .query import add_projection, get_query
+from .schema import get_schema_instance
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_KEEP_ALIVE = "1m"
+MATCH_ALL_QUERY = {"query": {"match_all": {}}}
+
+
+class PointInTimeSearch(object):
+    """
+        pages through all hits of a query with a point in time and search_after.
+        point in time keeps one view of the index while paging and every page costs the same however deep it is,
+        unlike from/size paging. point in time is closed when iteration ends or is stopped.
+
+        with PointInTimeSearch(client, index, {"query": ...}, _source=["name"]) as search:
+            for hit in search:
+                ...
+    """
+    # _shard_doc is the cheapest unique sort of a point in time, it is the tiebreaker of other sorts
+    tiebreaker_sort = {"_shard_doc": "asc"}
+
+    def __init__(self, client, index, query, page_size=DEFAULT_PAGE_SIZE, keep_alive=DEFAULT_KEEP_ALIVE, sort=None,
+                 max_hits=None, pit_id=None, **params):
+        """
+        :param query: generated query, e.g. result of get_query. its sort and size (order by and limit) are used
+            as sort and max_hits
+        :param max_hits: stop after this number of hits, None means all hits
+        :param pit_id: point in time opened by caller, e.g. shared between slices. it is not closed by this search
+        :param params: other parameters of search requests, e.g. source
+        """
+        self.client = client
+        self.index = index
+        self.request = dict(query, **params)
+        query_sort = self.request.pop("sort", None)
+        limit = self.request.pop("size", None)
+        self.page_size = page_size
+        self.keep_alive = keep_alive
+        self.sort = list(sort or query_sort or ())
+        if self.tiebreaker_sort not in self.sort:
+            self.sort.append(self.tiebreaker_sort)
+        self.max_hits = max_hits if max_hits is not None else limit
+        self.pit_id = pit_id
+        self.owns_pit = pit_id is None
+
+    def open(self):
+        if self.pit_id is None:
+            try:
+                with stage("client.open_point_in_time", {"index": self.index}):
+                    result = self.client.open_point_in_time(index=self.index, keep_alive=self.keep_alive)
+            except Exception as exception:
+                raise ExecutionError(str(exception))
+            self.pit_id = result["id"]
+        return self
+
+    def close(self):
+        if self.pit_id is None or not self.owns_pit:
+            return
+        pit_id, self.pit_id = self.pit_id, None
+        try:
+            self.client.close_point_in_time(id=pit_id)
+        except Exception as exception:
+            # point in time expires after keep_alive anyway
+            logger.warning("closing point in time of %s failed: %s", self.index, exception)
+
+    def pages(self):
+        """
+        :return: iterator of hit lists, one list per search request
+        """
+        self.open()
+        try:
+            search_after = None
+            remaining = self.max_hits
+            while remaining is None or remaining > 0:
+                size = self.page_size if remaining is None else min(self.page_size, remaining)
+                hits = self._search(size, search_after)
+                if hits:
+                    yield hits
+                if len(hits) < size:
+                    break
+                if remaining is not None:
+                    remaining -= len(hits)
+                search_after = hits[-1]["sort"]
+        finally:
+            self.close()
+
+    def hits(self):
+        for page in self.pages():
+            yield from page
+
+    def __iter__(self):
+        return self.hits()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _search(self, size, search_after):
+        request = dict(self.request, size=size, sort=self.sort, track_total_hits=False,
+                       pit={"id": self.pit_id, "keep_alive": self.keep_alive})
+        if search_after is not None:
+            request["search_after"] = search_after
+        try:
+            with stage("client.search", {"index": self.index}):
+                result = self.client.search(**request)
+        except Exception as exception:
+            raise ExecutionError(str(exception))
+        # id of point in time can change between requests
+        self.pit_id = result.get("pit_id", self.pit_id)
+        return result["hits"]["hits"]
+
+
+class SlicedSearch(object):
+    """
+        splits a search into slices which are fetched concurrently by a thread pool, so an export uses all shards
+        instead of one stream at a time. slices share one point in time and their pages are merged into one
+        iterator through a bounded queue: when consumer is slow, slices wait instead of buffering the export.
+        order of hits between slices is not kept.
+    """
+    # a queue item which tells a slice is finished
+    slice_done = object()
+
+    def __init__(self, client, index, query, slices=2, page_size=DEFAULT_PAGE_SIZE, keep_alive=DEFAULT_KEEP_ALIVE,
+                 max_pending_pages=None, **params):
+        """
+        :param slices: number of slices and threads
+        :param max_pending_pages: pages fetched ahead of consumer, twice the slices by default
+        """
+        self.client = client
+        self.index = index
+        self.query = query
+        self.slices = slices
+        self.page_size = page_size
+        self.keep_alive = keep_alive
+        self.max_pending_pages = max_pending_pages or slices * 2
+        self.params = params
+        self.point_in_time = PointInTimeSearch(client, index, query, keep_alive=keep_alive)
+
+    def open(self):
+        self.point_in_time.open()
+        return self
+
+    def close(self):
+        self.point_in_time.close()
+
+    def get_slice_search(self, slice_id):
+        return PointInTimeSearch(self.client, self.index, self.query, page_size=self.page_size,
+                                 keep_alive=self.keep_alive, pit_id=self.point_in_time.pit_id,
+                                 slice={"id": slice_id, "max": self.slices}, **self.params)
+
+    def pages(self):
+        if self.slices < 2:
+            # elasticsearch needs at least two slices
+            yield from PointInTimeSearch(self.client, self.index, self.query, page_size=self.page_size,
+                                         keep_alive=self.keep_alive, **self.params).pages()
+            return
+        self.open()
+        pages = queue.Queue(maxsize=self.max_pending_pages)
+        stopped = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=self.slices, thread_name_prefix="elastic-dql-slice")
+        try:
+            for slice_id in range(self.slices):
+                executor.submit(self._fetch_slice, slice_id, pages, stopped)
+            finished_slices = 0
+            while finished_slices < self.slices:
+                item = pages.get()
+                if item is self.slice_done:
+                    finished_slices += 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            stopped.set()
+            executor.shutdown(wait=True)
+            self.close()
+
+    def hits(self):
+        for page in self.pages():
+            yield from page
+
+    def __iter__(self):
+        return self.hits()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _fetch_slice(self, slice_id, pages, stopped):
+        try:
+            for page in self.get_slice_search(slice_id).pages():
+                if not self._put(pages, page, stopped):
+                    return
+        except Exception as exception:
+            self._put(pages, exception, stopped)
+        self._put(pages, self.slice_done, stopped)
+
+    @staticmethod
+    def _put(pages, item, stopped):
+        # blocks while queue is full, until consumer takes a page or stops
+        while not stopped.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+
+def execute_query(index, search, page_size=None, source=None, max_hits=None, slices=None, fields=None,
+                  exclude_fields=None, projection="source"):
+    """
+        run a DQL search on index, query is generated right away so invalid searches fail before any request
+    :param search: DQL string, empty search matches all documents
+    :param source: raw _source parameter, e.g. False, it overrides _source of fields
+    :param slices: fetch hits with this number of concurrent slices, hits are not in order and max_hits is not used.
+        searches with order by or limit are not sliced
+    :param fields: return only these fields of hits, they are validated with schema (see FieldProjection)
+    :return: PointInTimeSearch or SlicedSearch, iterate it for hits or its pages()
+    """
+    dql_config = get_dql_config()
+    schema_instance = get_schema_instance(index)
+    query = get_query(index, search) if search else dict(MATCH_ALL_QUERY)
+    query = add_projection(query, schema_instance, fields, exclude_fields, projection)
+    params = {"_source": source} if source is not None else {}
+    page_size = page_size or dql_config.execution_page_size
+    # hits of slices are not in order and each slice would have its own limit
+    if slices and slices > 1 and "sort" not in query and "size" not in query:
+        return SlicedSearch(schema_instance.client, index, query, slices=slices, page_size=page_size,
+                            keep_alive=dql_config.execution_keep_alive, **params)
+    return PointInTimeSearch(schema_instance.client, index, query, page_size=page_size,
+                             keep_alive=dql_config.execution_keep_alive, max_hits=max_hits, **params)
+
+
+def iter_ndjson(pages):
+    """
+        newline delimited json of hits, one chunk per page. a failure after the first chunk can't change status
+        code of response anymore, so it is written as the last line
+    """
+    try:
+        for hits in pages:
+            with stage("serialize", {"response": "hits"}):
+                yield "".join(json.dumps(hit) + "\n" for hit in hits)
+    except ExecutionError as exception:
+        yield json.dumps({"error": str(exception)}) + "\n"
+
+
+def write_ndjson(pages, output):
+    """
+        write hits to a text file as newline delimited json, e.g. write_ndjson(search.pages(), export_file)
+    :return: number of written hits
+    """
+    hits_count = 0
+    for hits in pages:
+        with stage("serialize", {"response": "hits"}):
+            output.write("".join(json.dumps(hit) + "\n" for hit in hits))
+        hits_count += len(hits)
+    return hits_count
@@ -1,44 +1,100 @@
+import logging
+import sys
+import types
+import warnings
 from datetime import datetime
 
+from django.utils.module_loading import import_string
 from djangoql.compat import text_type
 
-from .exceptions import FieldError
-from .query_generator import QueryBuilderFactory
+from .exceptions import FieldError, SchemaError
+from .query_generator import query_builder_registry, register_query_builder, term_operator_class_mapping, \
+    ContainsQuery, NotContainsQuery, EndsWithQuery, NotEndsWithQuery
 from .utils import dot_join
 
+logger = logging.getLogger(__name__)
+
+EXPENSIVE_QUERIES_ALLOW = "allow"
+EXPENSIVE_QUERIES_WARN = "warn"
+EXPENSIVE_QUERIES_DENY = "deny"
+EXPENSIVE_QUERIES_POLICIES = (EXPENSIVE_QUERIES_ALLOW, EXPENSIVE_QUERIES_WARN, EXPENSIVE_QUERIES_DENY)
+
 
 class ElasticDjangoQlField(object):
-    name = None
-    nullable = False
-    field_type = None
-    elastic_field_type = ""
+    # thousands of fields are kept per mapping, slots keep them small. subclasses should define __slots__ too
+    __slots__ = ("name", "nullable", "field_type", "elastic_field_type", "parent", "mapping", "subfields",
+                 "query_builders", "expensive_queries")
+    # python type of values, field_type argument overrides it
+    default_field_type = None
     value_types = []
     valid_operators = (
         '=', '>', '>=', '<', '<=', '~', 'in', 'startswith', 'endswith', '!=', '!~', 'not in', 'not startswith',
         'not endswith')
     value_types_description = ''
+    # wildcard queries on field don't scan its terms
+    fast_wildcard = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # subclasses written before slots set python type of values as field_type class attribute, it hides the slot
+        # (self.field_type is None or read only), so it is moved to default_field_type
+        if "field_type" in cls.__dict__ and not isinstance(cls.__dict__["field_type"], types.MemberDescriptorType):
+            warnings.warn("%s.field_type is deprecated, use default_field_type" % cls.__name__, DeprecationWarning,
+                          stacklevel=2)
+            cls.default_field_type = cls.__dict__["field_type"]
+            delattr(cls, "field_type")
 
-    def __init__(self, name, nullable=False, field_type=None, elastic_field_type=None):
+    def __init__(self, name, nullable=False, field_type=None, elastic_field_type=None, parent=None, mapping=None):
         self.name = name
         self.nullable = nullable
+        self.field_type = field_type if field_type is not None else self.default_field_type
         self.elastic_field_type = elastic_field_type
-        if field_type is not None:
-            self.field_type = field_type
+        self.parent = parent
+        # field mapping options, e.g. analyzer or index_prefixes
+        self.mapping = mapping if mapping else {}
+        self.subfields = ()
+        self.query_builders = None
+        # what to do with queries which scan whole terms of field: allow, warn or deny
+        self.expensive_queries = EXPENSIVE_QUERIES_ALLOW
 
     def get_lookup_name(self):
         return self.name
 
     def get_lookup(self, path, operator, value):
         # field_name = '.'.join(path + [self.get_lookup_name()])
-        field_name = self.get_lookup_name()
         if operator not in self.valid_operators:
             raise FieldError("operator %s is not valid for this type" % operator)
         formatted_value = self.format_value(value)
-        query_builder_factory = QueryBuilderFactory()
-        query_builder = query_builder_factory.get_query_builder(operator)
-        query, invert = query_builder.generate(field_name, formatted_value)
+        query_builder = self.get_query_builder(operator).resolve(self, formatted_value)
+        if query_builder.is_expensive(self):
+            self.check_expensive_query(operator)
+        query, invert = query_builder.generate(query_builder.get_field_name(self), formatted_value)
         return query, invert
 
+    def check_expensive_query(self, operator):
+        if self.expensive_queries == EXPENSIVE_QUERIES_DENY:
+            raise FieldError("operator %s on field %s needs a full scan of its terms, "
+                             "map it as wildcard or use an ngram query builder" % (operator, self.name))
+        if self.expensive_queries == EXPENSIVE_QUERIES_WARN:
+            logger.warning("operator %s on field %s needs a full scan of its terms", operator, self.name)
+
+    def get_query_builder(self, operator):
+        if self.query_builders is None:
+            self.resolve_query_builders()
+        return self.query_builders[operator]
+
+    def resolve_query_builders(self, overrides=None):
+        """
+            pick query builders of valid operators from registry once, so lookups don't create builders
+        :param overrides: {operator: builder} of this field, e.g. index specific builders
+        """
+        query_builders = {}
+        for operator in self.valid_operators:
+            query_builders[operator] = query_builder_registry.get_query_builder(self, operator)
+        if overrides:
+            query_builders.update(overrides)
+        self.query_builders = query_builders
+
     def format_value(self, value):
         """
         override this method to clean value or change type, ...
@@ -81,26 +137,30 @@ class ElasticDjangoQlField(object):
 
 
 class LongField(ElasticDjangoQlField):
+    __slots__ = ()
     value_types = [int, float]
-    field_type = int
+    default_field_type = int
     value_types_description = "numeric fields"
 
 
 class FloatField(ElasticDjangoQlField):
+    __slots__ = ()
     value_types = [int, float]
-    field_type = float
+    default_field_type = float
     value_types_description = "numeric fields"
 
 
 class TextType(ElasticDjangoQlField):
+    __slots__ = ()
     value_types = [text_type]
-    field_type = text_type
+    default_field_type = text_type
     value_types_description = "strings"
 
 
 class DateField(ElasticDjangoQlField):
+    __slots__ = ()
     value_types = [text_type]
-    field_type = text_type
+    default_field_type = text_type
     value_types_description = 'dates in "YYYY-MM-DD" format'
 
     def validate(self, value):
@@ -114,63 +174,96 @@ class DateField(ElasticDjangoQlField):
 
 
 class BoolField(ElasticDjangoQlField):
+    __slots__ = ()
     value_types = [bool]
-    field_type = bool
+    default_field_type = bool
     value_types_description = "booleans"
 
 
 class KeywordField(ElasticDjangoQlField):
+    __slots__ = ()
     value_types = [text_type]
-    field_type = text_type
+    default_field_type = text_type
 
-    def __init__(self, name, parent, *args, **kwargs):
-        super(KeywordField, self).__init__(name, *args, **kwargs)
-        self.parent = parent
+    def __init__(self, name, parent=None, *args, **kwargs):
+        super(KeywordField, self).__init__(name, *args, parent=parent, **kwargs)
 
     def can_suggest_values(self):
         return True
 
 
+class WildcardField(KeywordField):
+    """
+        wildcard field indexes ngrams of values, so ~ and endswith don't scan all terms
+    """
+    __slots__ = ()
+    fast_wildcard = True
+
+
+class SearchAsYouTypeField(TextType):
+    __slots__ = ()
+
+
+class CompletionField(ElasticDjangoQlField):
+    """
+        completion fields can only be used for suggestions
+    """
+    __slots__ = ()
+    value_types = [text_type]
+    default_field_type = text_type
+    valid_operators = ()
+
+
 class FieldMapper(object):
     type_mapping = {
         "date": DateField,
         "keyword": KeywordField,
+        "wildcard": WildcardField,
         "boolean": BoolField,
         "long": LongField,
         "text": TextType,
         "float": FloatField,
-        "unsigned_long": LongField
+        "unsigned_long": LongField,
+        "search_as_you_type": SearchAsYouTypeField,
+        "completion": CompletionField,
     }
 
     def get_fields(self, fields_dict: dict, parent: ElasticDjangoQlField):
         fields = []
         for field_name, data in fields_dict.items():
             field_cls = self._get_field_cls(data["type"])
-            field_name = dot_join(parent.name, field_name)
-            field = field_cls(field_name, parent=parent, elastic_field_type=data["type"])
+            field_name = sys.intern(dot_join(parent.name, field_name))
+            field = field_cls(field_name, parent=parent, elastic_field_type=data["type"], mapping=data)
             fields.append(field)
         return fields
 
     def get_properties(self, mappings, base_name=None):
+        """
+            fields of mappings in mapping order, mappings are walked with a stack so deep objects don't recurse
+        """
         result = []
-        if not mappings:
-            return result
-        properties = mappings.get("properties")
-        if properties:
-            for property_name, property_data in properties.items():
-                prefix = dot_join(base_name, property_name) if base_name else property_name
-                props = self.get_properties(property_data, base_name=prefix)
-                result.extend(props)
-            return result
-        field_type = mappings.get("type")
-        if field_type:
-            field_cls = self._get_field_cls(field_type)
-            field = field_cls(base_name, elastic_field_type=field_type)
-            result.append(field)
-            fields_property = mappings.get("fields")
-            if fields_property:
-                fields = self.get_fields(fields_property, field)
-                result.extend(fields)
+        stack = [(base_name, mappings)]
+        while stack:
+            name, mapping = stack.pop()
+            if not mapping:
+                continue
+            properties = mapping.get("properties")
+            if properties:
+                children = [(dot_join(name, property_name) if name else property_name, property_data)
+                            for property_name, property_data in properties.items()]
+                children.reverse()
+                stack.extend(children)
+                continue
+            field_type = mapping.get("type")
+            if field_type:
+                field_cls = self._get_field_cls(field_type)
+                field = field_cls(sys.intern(name), elastic_field_type=field_type, mapping=mapping)
+                result.append(field)
+                fields_property = mapping.get("fields")
+                if fields_property:
+                    fields = self.get_fields(fields_property, field)
+                    field.subfields = tuple(fields)
+                    result.extend(fields)
         return result
 
     def _get_field_cls(self, property_type):
@@ -178,3 +271,85 @@ class FieldMapper(object):
         if not field_cls:
             raise FieldError("invalid field type: %s" % property_type)
         return field_cls
+
+
+class FieldRegistry(object):
+    """
+        fields of a mapping by name. registries are shared by schemas whose mappings and field options are the same,
+        e.g. daily indices of a pattern
+    """
+    __slots__ = ("fields", "fields_dict", "query_builders", "__weakref__")
+
+    def __init__(self, fields, query_builders=None):
+        self.fields = fields
+        self.fields_dict = {field.name: field for field in fields}
+        # keeps field query builder overrides alive while registry is shared by their id
+        self.query_builders = query_builders
+
+    def get(self, field_name):
+        return self.fields_dict.get(field_name)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def to_records(self):
+        """
+            compact form of fields which only has builtin types, so it can be marshaled
+        :return: (field class paths, (class index, name, elastic type, parent index or -1, nullable, mapping) records)
+        """
+        field_classes = []
+        class_indices = {}
+        field_indices = {}
+        records = []
+        for field in self.fields:
+            field_cls = type(field)
+            if field_cls not in class_indices:
+                class_indices[field_cls] = len(field_classes)
+                field_classes.append("%s.%s" % (field_cls.__module__, field_cls.__qualname__))
+            parent_index = field_indices.get(id(field.parent), -1) if field.parent is not None else -1
+            field_indices[id(field)] = len(records)
+            # subfields and properties are fields of their own
+            mapping = {key: value for key, value in field.mapping.items() if key not in ("fields", "properties")}
+            records.append((class_indices[field_cls], field.name, field.elastic_field_type, parent_index,
+                            field.nullable, mapping))
+        return field_classes, records
+
+    @classmethod
+    def from_records(cls, field_classes, records, query_builders=None):
+        field_classes = [cls.import_field_class(field_class_path) for field_class_path in field_classes]
+        fields = []
+        subfields = {}
+        for class_index, name, elastic_field_type, parent_index, nullable, mapping in records:
+            parent = fields[parent_index] if parent_index >= 0 else None
+            field = field_classes[class_index](sys.intern(name), nullable=nullable,
+                                               elastic_field_type=elastic_field_type, parent=parent, mapping=mapping)
+            if parent is not None:
+                subfields.setdefault(parent_index, []).append(field)
+            fields.append(field)
+        for parent_index, parent_subfields in subfields.items():
+            fields[parent_index].subfields = tuple(parent_subfields)
+        return cls(fields, query_builders=query_builders)
+
+    @staticmethod
+    def import_field_class(field_class_path):
+        """
+            class paths are read from snapshot files, so only field classes are imported
+        """
+        try:
+            field_cls = import_string(field_class_path)
+        except ImportError as exception:
+            raise SchemaError("invalid field class %s: %s" % (field_class_path, exception))
+        if not (isinstance(field_cls, type) and issubclass(field_cls, ElasticDjangoQlField)):
+            raise SchemaError("%s is not a field class" % field_class_path)
+        return field_cls
+
+
+for term_operator, term_builder_cls in term_operator_class_mapping.items():
+    term_builder = term_builder_cls()
+    for exact_field_cls in (KeywordField, LongField, FloatField, BoolField, DateField):
+        register_query_builder(exact_field_cls, term_operator, term_builder)
+
+# wildcard queries are the cheapest option on wildcard fields
+for wildcard_operator, wildcard_builder in (("~", ContainsQuery()), ("!~", NotContainsQuery()),
+                                            ("endswith", EndsWithQuery()), ("not endswith", NotEndsWithQuery())):
+    register_query_builder(WildcardField, wildcard_operator, wildcard_builder)
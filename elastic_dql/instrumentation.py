@@ -0,0 +1,212 @@
+import contextlib
+import logging
+import time
+
+from django.utils.module_loading import import_string
+
+from .exceptions import ConfigError
+
+logger = logging.getLogger(__name__)
+
+# returned by stage() while there is no sink, entering it costs nearly nothing
+NULL_STAGE = contextlib.nullcontext()
+
+
+class Sink(object):
+    """
+        receives stage timings and counters of instrumentation.
+        stage_started can return a state which is passed to stage_finished of the same stage, e.g. a span
+    """
+
+    def stage_started(self, name, tags):
+        return None
+
+    def stage_finished(self, name, duration, tags, state, error=None):
+        """
+        :param duration: seconds
+        :param error: exception raised in stage or None
+        """
+
+    def count(self, name, value, tags):
+        pass
+
+
+class LoggingSink(Sink):
+    def __init__(self, logger_name=__name__, level=logging.DEBUG):
+        self.logger = logging.getLogger(logger_name)
+        self.level = logging.getLevelName(level) if isinstance(level, str) else level
+
+    def stage_finished(self, name, duration, tags, state, error=None):
+        self.logger.log(self.level, "%s took %.3f ms%s%s", name, duration * 1000, " %s" % tags if tags else "",
+                        " (failed: %r)" % error if error is not None else "")
+
+    def count(self, name, value, tags):
+        self.logger.log(self.level, "%s +%s%s", name, value, " %s" % tags if tags else "")
+
+
+class CallbackSink(Sink):
+    """
+        calls callback(kind, name, value, tags), kind is "stage" with duration as value or "count"
+    """
+
+    def __init__(self, callback):
+        self.callback = import_string(callback) if isinstance(callback, str) else callback
+
+    def stage_finished(self, name, duration, tags, state, error=None):
+        self.callback("stage", name, duration, tags)
+
+    def count(self, name, value, tags):
+        self.callback("count", name, value, tags)
+
+
+class PrometheusSink(Sink):
+    """
+        stage durations as a histogram and counters as a counter labeled with their names,
+        needs prometheus_client (``pip install elastic-dql[prometheus]``)
+    """
+
+    def __init__(self, prefix="elastic_dql", registry=None, buckets=None):
+        try:
+            import prometheus_client
+        except ImportError:
+            raise ConfigError("PrometheusSink needs prometheus_client")
+        registry = registry if registry is not None else prometheus_client.REGISTRY
+        histogram_options = {"buckets": buckets} if buckets else {}
+        self.durations = prometheus_client.Histogram(
+            "%s_stage_duration_seconds" % prefix, "duration of elastic_dql stages", ["stage"], registry=registry,
+            **histogram_options)
+        self.errors = prometheus_client.Counter(
+            "%s_stage_errors" % prefix, "failed elastic_dql stages", ["stage"], registry=registry)
+        self.counters = prometheus_client.Counter(
+            "%s_events" % prefix, "elastic_dql events, e.g. cache hits and misses", ["event"], registry=registry)
+
+    def stage_finished(self, name, duration, tags, state, error=None):
+        self.durations.labels(name).observe(duration)
+        if error is not None:
+            self.errors.labels(name).inc()
+
+    def count(self, name, value, tags):
+        self.counters.labels(name).inc(value)
+
+
+class OpenTelemetrySink(Sink):
+    """
+        stages as spans, nested stages are child spans of their outer stage.
+        counters are added to the current span as events. needs opentelemetry-api
+        (``pip install elastic-dql[opentelemetry]``)
+    """
+
+    def __init__(self, tracer=None, tracer_name="elastic_dql"):
+        try:
+            from opentelemetry import context, trace
+        except ImportError:
+            raise ConfigError("OpenTelemetrySink needs opentelemetry-api")
+        self.context = context
+        self.trace = trace
+        self.tracer = tracer if tracer is not None else trace.get_tracer(tracer_name)
+
+    def stage_started(self, name, tags):
+        span = self.tracer.start_span(name, attributes=tags)
+        token = self.context.attach(self.trace.set_span_in_context(span))
+        return span, token
+
+    def stage_finished(self, name, duration, tags, state, error=None):
+        span, token = state
+        self.context.detach(token)
+        if error is not None:
+            span.record_exception(error)
+            span.set_status(self.trace.Status(self.trace.StatusCode.ERROR))
+        span.end()
+
+    def count(self, name, value, tags):
+        attributes = dict(tags) if tags else {}
+        attributes["value"] = value
+        self.trace.get_current_span().add_event(name, attributes=attributes)
+
+
+class Stage(object):
+    __slots__ = ("sinks", "name", "tags", "states", "started_at")
+
+    def __init__(self, sinks, name, tags):
+        self.sinks = sinks
+        self.name = name
+        self.tags = tags
+        self.states = None
+        self.started_at = None
+
+    def __enter__(self):
+        self.states = [call_sink(sink.stage_started, self.name, self.tags) for sink in self.sinks]
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration = time.perf_counter() - self.started_at
+        for sink, state in zip(self.sinks, self.states):
+            call_sink(sink.stage_finished, self.name, duration, self.tags, state, exc_value)
+        return False
+
+
+def call_sink(method, *args):
+    # a broken sink must not break queries
+    try:
+        return method(*args)
+    except Exception:
+        logger.exception("instrumentation sink %r failed", method)
+        return None
+
+
+class Instrumentation(object):
+    """
+        per stage timings and counters of hot paths, sent to sinks. while there is no sink stage() and count()
+        return right away
+    """
+
+    def __init__(self, sinks=()):
+        self.sinks = tuple(sinks)
+
+    @property
+    def enabled(self):
+        return bool(self.sinks)
+
+    def add_sink(self, sink):
+        self.sinks = self.sinks + (sink,)
+
+    def remove_sink(self, sink):
+        self.sinks = tuple(added_sink for added_sink in self.sinks if added_sink is not sink)
+
+    def set_sinks(self, sinks):
+        self.sinks = tuple(sinks)
+
+    def stage(self, name, tags=None):
+        """
+            context manager which times its block, ``with stage("parse"): ...``
+        """
+        sinks = self.sinks
+        if not sinks:
+            return NULL_STAGE
+        return Stage(sinks, name, tags)
+
+    def count(self, name, value=1, tags=None):
+        for sink in self.sinks:
+            call_sink(sink.count, name, value, tags)
+
+
+instrumentation = Instrumentation()
+stage = instrumentation.stage
+count = instrumentation.count
+
+
+def create_sink(sink_settings):
+    """
+    :param sink_settings: import path of a sink class or {"backend": import path, **options}
+    """
+    options = {"backend": sink_settings} if isinstance(sink_settings, str) else dict(sink_settings)
+    try:
+        sink_cls = import_string(options.pop("backend"))
+    except (KeyError, ImportError) as exception:
+        raise ConfigError("invalid instrumentation sink %s: %s" % (sink_settings, exception))
+    return sink_cls(**options)
+
+
+def configure_instrumentation(sinks_settings):
+    instrumentation.set_sinks(create_sink(sink_settings) for sink_settings in sinks_settings or ())
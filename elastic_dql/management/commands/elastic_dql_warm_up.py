@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from elastic_dql.exceptions import SchemaError
+from elastic_dql.schema import warm_up_schemas
+from elastic_dql.snapshot import save_mappings_snapshot
+
+
+class Command(BaseCommand):
+    help = "Fetch mappings of configured indices with one request and optionally save them in a snapshot file " \
+           "which can be loaded on startup without asking elasticsearch."
+
+    def add_arguments(self, parser):
+        parser.add_argument("indices", nargs="*", help="indices besides warm_up_indices, default_index and "
+                                                       "include_indices settings")
+        parser.add_argument("--save-snapshot", dest="snapshot_path", help="path of snapshot file")
+
+    def handle(self, *args, **options):
+        try:
+            index_results = warm_up_schemas(indices=options["indices"])
+        except SchemaError as exception:
+            raise CommandError(str(exception))
+        for index, index_result in index_results.items():
+            self.stdout.write("%s: %d indices" % (index, len(index_result)))
+        if options["snapshot_path"]:
+            save_mappings_snapshot(options["snapshot_path"], index_results)
+            self.stdout.write("snapshot is saved in %s" % options["snapshot_path"])
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import logging
+
+from .cache import LRUCache
+from .utils import copy_query
+
+logger = logging.getLogger(__name__)
+
+# merged mappings by versions of their distinct backing mappings
+merged_mappings_cache = LRUCache(128)
+
+
+def get_mapping_version(mappings):
+    serialized_mappings = json.dumps(mappings, sort_keys=True, default=str)
+    return hashlib.sha1(serialized_mappings.encode()).hexdigest()
+
+
+def get_field_type(data):
+    return data.get("type", "object" if "properties" in data else None)
+
+
+def merge_mappings(mappings_list):
+    """
+        merge mappings of indices into one mapping, fields which have different types in indices are removed
+    :param mappings_list: list of index mappings, options of first mapping are kept for same fields
+    :return: (merged mappings, {field name: [types]} of conflicts)
+    """
+    merged_mappings = copy_query(mappings_list[0])
+    conflicts = {}
+    for mappings in mappings_list[1:]:
+        _merge_properties(merged_mappings.setdefault("properties", {}), mappings.get("properties", {}), "",
+                          conflicts)
+    return merged_mappings, {name: sorted(types) for name, types in conflicts.items()}
+
+
+def _merge_properties(target, source, prefix, conflicts):
+    for name, source_data in source.items():
+        path = prefix + name
+        if path in conflicts:
+            conflicts[path].add(get_field_type(source_data))
+            continue
+        target_data = target.get(name)
+        if target_data is None:
+            target[name] = copy_query(source_data)
+            continue
+        target_type, source_type = get_field_type(target_data), get_field_type(source_data)
+        if target_type != source_type:
+            conflicts[path] = {target_type, source_type}
+            del target[name]
+            continue
+        if "properties" in source_data:
+            _merge_properties(target_data.setdefault("properties", {}), source_data["properties"], path + ".",
+                              conflicts)
+        if "fields" in source_data:
+            _merge_properties(target_data.setdefault("fields", {}), source_data["fields"], path + ".", conflicts)
+
+
+def get_merged_mappings(result):
+    """
+        mappings of a get_mapping result of an index, alias, data stream or pattern.
+        backing indices usually have the same mappings, so distinct mappings are merged once and cached
+    :param result: get_mapping response, {index name: {"mappings": ...}}
+    :return: (mappings, conflicts)
+    """
+    distinct_mappings = {}
+    for index_name in sorted(result):
+        mappings = result[index_name].get("mappings", {})
+        distinct_mappings.setdefault(get_mapping_version(mappings), mappings)
+    if len(distinct_mappings) == 1:
+        return next(iter(distinct_mappings.values())), {}
+    cache_key = tuple(sorted(distinct_mappings))
+    merged_result = merged_mappings_cache.get(cache_key)
+    if merged_result is None:
+        merged_result = merge_mappings([distinct_mappings[version] for version in cache_key])
+        if merged_result[1]:
+            logger.warning("fields with conflicting types are removed: %s", ", ".join(
+                "%s (%s)" % (name, "/".join(map(str, types))) for name, types in merged_result[1].items()))
+        merged_mappings_cache.set(cache_key, merged_result)
+    return merged_result
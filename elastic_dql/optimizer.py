@@ -0,0 +1,221 @@
+import json
+
+from .exceptions import SchemaError
+from .field import KeywordField
+
+BOOL_CLAUSES = ("filter", "must_not", "should")
+LOWER_BOUNDS = ("gt", "gte")
+UPPER_BOUNDS = ("lt", "lte")
+
+
+def get_clause_key(clause):
+    return json.dumps(clause, sort_keys=True, default=str)
+
+
+def dedupe_clauses(clauses):
+    """
+        removes duplicate leaf clauses, nested bools are kept so their subtrees are not serialized again on every level
+    """
+    keys = set()
+    result = []
+    for clause in clauses:
+        if "bool" in clause:
+            result.append(clause)
+            continue
+        key = get_clause_key(clause)
+        if key not in keys:
+            keys.add(key)
+            result.append(clause)
+    return result
+
+
+def is_simple_bool(query):
+    """
+        bool with only filter, must_not and should clauses where at least one should clause must match
+    """
+    if not (isinstance(query, dict) and len(query) == 1 and isinstance(query.get("bool"), dict)):
+        return False
+    bool_query = query["bool"]
+    for key in bool_query:
+        if key not in BOOL_CLAUSES and key != "minimum_should_match":
+            return False
+    if bool_query.get("should"):
+        return bool_query.get("minimum_should_match") == 1
+    return "minimum_should_match" not in bool_query
+
+
+def is_and_bool(query):
+    return is_simple_bool(query) and not query["bool"].get("should")
+
+
+def is_or_bool(query):
+    return is_simple_bool(query) and not query["bool"].get("filter") and not query["bool"].get("must_not")
+
+
+class QueryOptimizer(object):
+    """
+        simplifies bool tree of a generated query without changing its matches.
+        generated queries are always run in filter context, so scores don't have to be kept:
+
+        - and/or chains are flattened into one bool
+        - bools with one clause are replaced with the clause
+        - disjoint range bounds of a single valued field (see SchemaFactory.index_single_valued_fields) are merged
+          into one range, ranges of other fields are kept: age > 10 and age < 20 matches age [5, 25] but one range
+          of them doesn't
+        - term queries of a field in or are merged into one terms query, match queries of keyword fields without
+          a normalizer too
+        - duplicate leaf clauses are removed
+    """
+
+    def __init__(self, schema_instance=None):
+        self.schema_instance = schema_instance
+
+    def optimize(self, query):
+        if not is_simple_bool(query):
+            return query
+        bool_query = query["bool"]
+        filter_clauses, must_not_clauses, should_clauses = [], [], []
+        for clause in bool_query.get("filter", ()):
+            clause = self.optimize(clause)
+            if is_and_bool(clause):
+                filter_clauses.extend(clause["bool"].get("filter", ()))
+                must_not_clauses.extend(clause["bool"].get("must_not", ()))
+            else:
+                filter_clauses.append(clause)
+        for clause in bool_query.get("must_not", ()):
+            clause = self.optimize(clause)
+            if is_or_bool(clause):
+                # not (a or b) is not a and not b
+                must_not_clauses.extend(clause["bool"]["should"])
+            else:
+                must_not_clauses.append(clause)
+        for clause in bool_query.get("should", ()):
+            clause = self.optimize(clause)
+            if is_or_bool(clause):
+                should_clauses.extend(clause["bool"]["should"])
+            else:
+                should_clauses.append(clause)
+        filter_clauses = self.merge_ranges(dedupe_clauses(filter_clauses))
+        # not a and not b is not (a or b), so terms are merged same as should clauses
+        must_not_clauses = self.merge_terms(dedupe_clauses(must_not_clauses))
+        should_clauses = self.merge_terms(dedupe_clauses(should_clauses))
+        return self.build_bool(filter_clauses, must_not_clauses, should_clauses)
+
+    @staticmethod
+    def build_bool(filter_clauses, must_not_clauses, should_clauses):
+        if should_clauses and (filter_clauses or must_not_clauses):
+            if len(should_clauses) == 1:
+                filter_clauses = filter_clauses + should_clauses
+            else:
+                filter_clauses = filter_clauses + [
+                    {"bool": {"minimum_should_match": 1, "should": should_clauses}}]
+            should_clauses = []
+        if len(filter_clauses) == 1 and not must_not_clauses:
+            return filter_clauses[0]
+        if len(should_clauses) == 1:
+            return should_clauses[0]
+        bool_query = {}
+        if should_clauses:
+            bool_query["minimum_should_match"] = 1
+            bool_query["should"] = should_clauses
+        if filter_clauses:
+            bool_query["filter"] = filter_clauses
+        if must_not_clauses:
+            bool_query["must_not"] = must_not_clauses
+        return {"bool": bool_query}
+
+    def merge_ranges(self, clauses):
+        result = []
+        ranges = {}
+        for clause in clauses:
+            field_name, bounds = self.get_range(clause)
+            if field_name is None or not self.is_single_valued(field_name):
+                result.append(clause)
+                continue
+            merged_range = ranges.get(field_name)
+            if merged_range is not None and self.can_merge_bounds(merged_range, bounds):
+                merged_range.update(bounds)
+                continue
+            merged_range = dict(bounds)
+            ranges[field_name] = merged_range
+            result.append({"range": {field_name: merged_range}})
+        return result
+
+    def is_single_valued(self, field_name):
+        if self.schema_instance is None:
+            return False
+        return field_name in self.schema_instance.single_valued_fields
+
+    @staticmethod
+    def get_range(clause):
+        range_query = clause.get("range") if len(clause) == 1 else None
+        if not isinstance(range_query, dict) or len(range_query) != 1:
+            return None, None
+        field_name, bounds = next(iter(range_query.items()))
+        if not isinstance(bounds, dict) or not bounds or \
+                any(key not in LOWER_BOUNDS and key not in UPPER_BOUNDS for key in bounds):
+            return None, None
+        return field_name, bounds
+
+    @staticmethod
+    def can_merge_bounds(first, second):
+        for side in (LOWER_BOUNDS, UPPER_BOUNDS):
+            if any(key in first for key in side) and any(key in second for key in side):
+                return False
+        return True
+
+    def merge_terms(self, clauses):
+        result = []
+        terms = {}
+        for clause in clauses:
+            field_name, values = self.get_term_values(clause)
+            if field_name is None:
+                result.append(clause)
+                continue
+            if field_name in terms:
+                terms[field_name].extend(value for value in values if value not in terms[field_name])
+                continue
+            terms[field_name] = list(values)
+            result.append(field_name)
+        return [self.build_terms(clause, terms[clause]) if isinstance(clause, str) else clause for clause in result]
+
+    @staticmethod
+    def build_terms(field_name, values):
+        if len(values) == 1:
+            return {"term": {field_name: values[0]}}
+        return {"terms": {field_name: values}}
+
+    def get_term_values(self, clause):
+        if len(clause) != 1:
+            return None, None
+        query_type, query = next(iter(clause.items()))
+        if not isinstance(query, dict) or len(query) != 1:
+            return None, None
+        field_name, value = next(iter(query.items()))
+        if query_type == "term":
+            if isinstance(value, dict):
+                if list(value) != ["value"]:
+                    return None, None
+                value = value["value"]
+            return field_name, [value]
+        if query_type == "terms":
+            return (field_name, value) if isinstance(value, list) else (None, None)
+        if query_type in ("match", "match_phrase") and isinstance(value, str) and self.is_exact_field(field_name):
+            return field_name, [value]
+        return None, None
+
+    def is_exact_field(self, field_name):
+        """
+            match queries on keyword fields are the same as term queries, unless a normalizer changes the value
+        """
+        if self.schema_instance is None:
+            return False
+        try:
+            field = self.schema_instance.resolve_name(field_name)
+        except SchemaError:
+            return False
+        return isinstance(field, KeywordField) and "normalizer" not in field.mapping
+
+
+def optimize_query(query, schema_instance=None):
+    return QueryOptimizer(schema_instance).optimize(query)
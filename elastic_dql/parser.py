@@ -0,0 +1,64 @@
+import copy
+import threading
+
+from djangoql.lexer import DjangoQLLexer
+from djangoql.parser import DjangoQLParser
+
+from .instrumentation import stage
+
+
+class ParserProvider(object):
+    """
+        building DjangoQLParser generates the ply parsing tables, which costs much more than parsing a query.
+        tables are built once per process and each thread gets a light copy of the parser which shares them,
+        ply parsers and lexers keep parse state on themselves so they can not be shared between threads.
+    """
+
+    def __init__(self, parser_cls=DjangoQLParser, lexer_cls=DjangoQLLexer):
+        self.parser_cls = parser_cls
+        self.lexer_cls = lexer_cls
+        self._base_parser = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def warm_up(self):
+        """
+            build parsing tables ahead of the first query, e.g. at startup
+        """
+        self.get_parser()
+
+    def get_parser(self):
+        parser = getattr(self._local, "parser", None)
+        if parser is None:
+            parser = self._copy_parser(self._get_base_parser())
+            self._local.parser = parser
+        return parser
+
+    def parse(self, search):
+        parser = self.get_parser()
+        with stage("parse"):
+            return parser.parse(search)
+
+    def _get_base_parser(self):
+        if self._base_parser is None:
+            with self._lock:
+                if self._base_parser is None:
+                    self._base_parser = self.parser_cls()
+        return self._base_parser
+
+    def _copy_parser(self, base_parser):
+        parser = copy.copy(base_parser)
+        parser.yacc = copy.copy(base_parser.yacc)
+        parser.default_lexer = self.lexer_cls()
+        return parser
+
+
+parser_provider = ParserProvider()
+
+
+def parse(search):
+    return parser_provider.parse(search)
+
+
+def warm_up_parser():
+    parser_provider.warm_up()
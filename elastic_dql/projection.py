@@ -0,0 +1,111 @@
+from .exceptions import SchemaError
+from .field import CompletionField, TextType
+
+PROJECTION_MODES = ("source", "docvalues", "stored", "auto")
+
+
+def has_doc_values(field):
+    if isinstance(field, (TextType, CompletionField)):
+        return False
+    return field.mapping.get("doc_values", True) is not False
+
+
+def is_stored(field):
+    return field.mapping.get("store") is True
+
+
+class FieldProjection(object):
+    """
+        compiles fields which a client needs to search parameters which return only them, so hits don't carry whole
+        documents:
+
+        - source: ``_source`` includes and excludes, subfields (e.g. name.keyword) are read from their parent field
+        - docvalues: ``docvalue_fields`` without ``_source``, only fields with doc values (not text fields)
+        - stored: ``stored_fields`` without ``_source``, only fields with ``"store": true`` in mappings
+        - auto: docvalues if all fields have doc values, otherwise source
+    """
+
+    def __init__(self, schema_instance):
+        self.schema_instance = schema_instance
+
+    def build(self, fields=None, exclude=None, mode="source"):
+        """
+        :param fields: field names, object names are allowed in source mode, e.g. "user" for "user.*"
+        :param exclude: field names which are removed from _source, only in source mode
+        :return: search parameters, e.g. {"_source": {"includes": ["name"]}}
+        """
+        if mode not in PROJECTION_MODES:
+            raise SchemaError("projection must be one of %s" % ", ".join(PROJECTION_MODES))
+        fields = list(fields or ())
+        exclude = list(exclude or ())
+        if mode == "auto":
+            mode = "docvalues" if fields and not exclude and all(
+                has_doc_values(field) for field in self.resolve_fields(fields)) else "source"
+        if mode == "source":
+            return self.build_source(fields, exclude)
+        if exclude:
+            raise SchemaError("excluded fields can only be used with source projection")
+        if mode == "docvalues":
+            return self.build_docvalues(fields)
+        return self.build_stored(fields)
+
+    def build_source(self, fields, exclude):
+        source = {}
+        if fields:
+            source["includes"] = self.get_source_paths(fields)
+        if exclude:
+            source["excludes"] = self.get_source_paths(exclude, excluded=True)
+        return {"_source": source} if source else {}
+
+    def build_docvalues(self, fields):
+        resolved_fields = self.resolve_fields(fields)
+        for field in resolved_fields:
+            if not has_doc_values(field):
+                raise SchemaError("field %s has no doc values" % field.name)
+        return {"_source": False, "docvalue_fields": [field.name for field in resolved_fields]}
+
+    def build_stored(self, fields):
+        resolved_fields = self.resolve_fields(fields)
+        for field in resolved_fields:
+            if not is_stored(field):
+                raise SchemaError("field %s is not stored" % field.name)
+        return {"_source": False, "stored_fields": [field.name for field in resolved_fields]}
+
+    def resolve_fields(self, field_names):
+        fields = []
+        for field_name in field_names:
+            field = self.schema_instance.resolve_name(field_name)
+            if field not in fields:
+                fields.append(field)
+        return fields
+
+    def get_source_paths(self, field_names, excluded=False):
+        paths = []
+        for field_name in field_names:
+            path = self.get_source_path(field_name, excluded=excluded)
+            if path not in paths:
+                paths.append(path)
+        return paths
+
+    def get_source_path(self, field_name, excluded=False):
+        try:
+            field = self.schema_instance.resolve_name(field_name)
+        except SchemaError:
+            if self.is_object(field_name):
+                return field_name
+            raise
+        if field.parent is not None and excluded:
+            raise SchemaError("subfield %s is not in _source, it can't be excluded" % field_name)
+        # values of subfields are indexed from their parent field, they are not in _source
+        while field.parent is not None:
+            field = field.parent
+        return field.name
+
+    def is_object(self, field_name):
+        prefix = field_name + "."
+        # mappings are loaded by resolve_name already, async schemas can't load them here
+        return any(field.name.startswith(prefix) for field in self.schema_instance.valid_properties)
+
+
+def build_projection(schema_instance, fields=None, exclude=None, mode="source"):
+    return FieldProjection(schema_instance).build(fields=fields, exclude=exclude, mode=mode)
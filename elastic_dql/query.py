@@ -1,12 +1,23 @@
 from collections import defaultdict
 
 from djangoql.ast import Logical
-from djangoql.parser import DjangoQLParser
+from djangoql.exceptions import DjangoQLError
 
+from .async_schema import aget_async_schema_instance
+from .cache import get_query_cache
+from .instrumentation import count, stage
+from .optimizer import is_and_bool, optimize_query
+from .parser import parse
+from .projection import build_projection
 from .schema import get_schema_instance
+from .sorting import build_sort, split_search
+from .utils import copy_query
 
 
 def finalize_query(query, inverted):
+    if is_and_bool(query):
+        # a bool of filter and must_not clauses doesn't score, so it doesn't need another filter wrapper
+        return {"query": query}
     base_query = {"query": {
         "bool": {
             "filter": [query]
@@ -16,18 +27,10 @@ def finalize_query(query, inverted):
 
 
 def build_query(expr, schema_instance):
-    base_query = {
-        "bool": {}
-    }
     if isinstance(expr.operator, Logical):
         left, left_invert = build_query(expr.left, schema_instance)
         right, right_invert = build_query(expr.right, schema_instance)
-        if expr.operator.operator == 'or':
-            base_query["bool"]["minimum_should_match"] = 1
-            base_query["bool"]["should"] = [left, right]
-        else:
-            base_query["bool"]["filter"] = [left, right]
-        return base_query, False
+        return build_logical_query(expr.operator.operator, left, right), False
 
     field = schema_instance.resolve_name(expr.left)
 
@@ -43,19 +46,147 @@ def build_query(expr, schema_instance):
         operator=expr.operator.operator,
         value=expr.right.value,
     )
+    return build_lookup_query(query, inverted), inverted
+
+
+def build_logical_query(operator, left, right):
+    base_query = {
+        "bool": {}
+    }
+    if operator == 'or':
+        base_query["bool"]["minimum_should_match"] = 1
+        base_query["bool"]["should"] = [left, right]
+    else:
+        base_query["bool"]["filter"] = [left, right]
+    return base_query
+
+
+def build_lookup_query(query, inverted):
+    base_query = {
+        "bool": {}
+    }
     if inverted:
         base_query["bool"]["must_not"] = [query]
     else:
         # base_query["bool"]["minimum_should_match"] = 1
         # base_query["bool"]["should"] = [query]
         base_query["bool"]["filter"] = [query]
-    return base_query, inverted
+    return base_query
+
+
+def get_query(index, search, fields=None, exclude_fields=None, projection="source", track_total_hits=None):
+    """
+    :param search: DQL search, it can end with ``order by`` and ``limit`` clauses
+    :param fields: return only these fields of hits, see FieldProjection for projection modes
+    :param exclude_fields: remove these fields from _source
+    :param projection: source, docvalues, stored or auto
+    :param track_total_hits: False, True or a number of hits to count, None keeps elasticsearch default
+    """
+    with stage("get_query", {"index": index}):
+        schema_instance = get_schema_instance(index)
+        query_cache = get_query_cache()
+        if query_cache is None:
+            query = generate_query(search, schema_instance)
+        else:
+            query = get_cached_query(index, search, schema_instance, query_cache)
+        if track_total_hits is not None:
+            query["track_total_hits"] = track_total_hits
+        return add_projection(query, schema_instance, fields, exclude_fields, projection)
+
+
+async def aget_query(index, search, fields=None, exclude_fields=None, projection="source", track_total_hits=None):
+    """
+        get_query for async code, mappings are fetched with AsyncElasticsearch
+    """
+    with stage("get_query", {"index": index}):
+        schema_instance = await aget_async_schema_instance(index)
+        query_cache = get_query_cache()
+        if query_cache is None:
+            query = generate_query(search, schema_instance)
+        else:
+            query = get_cached_query(index, search, schema_instance, query_cache)
+        if track_total_hits is not None:
+            query["track_total_hits"] = track_total_hits
+        return add_projection(query, schema_instance, fields, exclude_fields, projection)
+
+
+def add_projection(query, schema_instance, fields=None, exclude_fields=None, projection="source"):
+    if fields or exclude_fields:
+        query.update(build_projection(schema_instance, fields=fields, exclude=exclude_fields, mode=projection))
+    return query
+
+
+def get_cached_query(index, search, schema_instance, query_cache, mapping_version=None):
+    if mapping_version is None:
+        mapping_version = schema_instance.get_mapping_version()
+    cache_key = (index, search, mapping_version)
+    query = query_cache.get(cache_key)
+    if query is None:
+        count("query_cache.miss")
+        query = generate_query(search, schema_instance)
+        query_cache.set(cache_key, query)
+    else:
+        count("query_cache.hit")
+    # cached query must not be changed by callers
+    return copy_query(query)
+
+
+class QueryResult(object):
+    def __init__(self, search, query=None, error=None):
+        self.search = search
+        self.query = query
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
 
 
-def get_query(index, search):
-    ast = DjangoQLParser().parse(search)
+def get_queries(index, searches):
+    """
+        generate queries of many searches at once, schema is resolved once and duplicate searches are generated once
+    :param index:
+    :param searches: list of DQL strings
+    :return: list of QueryResult in order of searches, failed searches have error instead of query
+    """
     schema_instance = get_schema_instance(index)
-    schema_instance.validate(ast)
-    query, inverted = build_query(ast, schema_instance)
-    query = finalize_query(query, inverted)
+    query_cache = get_query_cache()
+    mapping_version = schema_instance.get_mapping_version()
+    generated_queries = {}
+    results = []
+    for search in searches:
+        if search not in generated_queries:
+            try:
+                if query_cache is None:
+                    generated_queries[search] = generate_query(search, schema_instance), None
+                else:
+                    generated_queries[search] = get_cached_query(index, search, schema_instance, query_cache,
+                                                                 mapping_version=mapping_version), None
+            # format_value of fields raises ValueError or TypeError for values they can't convert, e.g. None
+            except (DjangoQLError, ValueError, TypeError) as exception:
+                generated_queries[search] = None, exception
+            query, error = generated_queries[search]
+        else:
+            query, error = generated_queries[search]
+            query = copy_query(query)
+        results.append(QueryResult(search, query=query, error=error))
+    return results
+
+
+def generate_query(search, schema_instance):
+    search, sort_fields, limit = split_search(search)
+    if not search and (sort_fields or limit is not None):
+        query = {"query": {"match_all": {}}}
+    else:
+        ast = parse(search)
+        schema_instance.validate(ast)
+        with stage("build_query"):
+            query, inverted = build_query(ast, schema_instance)
+        with stage("optimize_query"):
+            query = optimize_query(query, schema_instance)
+        query = finalize_query(query, inverted)
+    if sort_fields:
+        query["sort"] = build_sort(schema_instance, sort_fields, tiebreaker=schema_instance.sort_tiebreaker)
+    if limit is not None:
+        query["size"] = limit
     return query
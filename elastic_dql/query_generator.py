@@ -1,9 +1,27 @@
 class AbstractQuery(object):
     invert = False
+    # query scans whole terms dictionary of the field, e.g. a leading wildcard
+    expensive = False
 
     def generate(self, field_name, value):
         raise NotImplementedError
 
+    def get_field_name(self, field):
+        """
+            name of the field which is queried, builders can query a subfield of field
+        """
+        return field.get_lookup_name()
+
+    def resolve(self, field, value):
+        """
+            builder which generates query of value, a builder can fall back to another one for some values
+        """
+        return self
+
+    def is_expensive(self, field):
+        # wildcard fields index ngrams of values, so wildcard queries on them don't scan terms
+        return self.expensive and not field.fast_wildcard
+
 
 class EqualsQuery(AbstractQuery):
     invert = False
@@ -27,6 +45,21 @@ class NotEqualsQuery(AbstractQuery):
                }, self.invert
 
 
+class TermQuery(AbstractQuery):
+    invert = False
+
+    def generate(self, field_name, value):
+        return {
+                   "term": {
+                       field_name: value
+                   }
+               }, self.invert
+
+
+class NotTermQuery(TermQuery):
+    invert = True
+
+
 class GtQuery(AbstractQuery):
     invert = False
 
@@ -81,6 +114,7 @@ class LteQuery(AbstractQuery):
 
 class ContainsQuery(AbstractQuery):
     invert = False
+    expensive = True
 
     def generate(self, field_name, value):
         return {
@@ -94,6 +128,7 @@ class ContainsQuery(AbstractQuery):
 
 class NotContainsQuery(AbstractQuery):
     invert = True
+    expensive = True
 
     def generate(self, field_name, value):
         return {
@@ -123,6 +158,22 @@ class NotInQuery(AbstractQuery):
         return query, self.invert
 
 
+class TermsQuery(AbstractQuery):
+    invert = False
+
+    def generate(self, field_name, value):
+        # duplicate values are dropped, order is kept so generated queries are stable
+        return {
+                   "terms": {
+                       field_name: list(dict.fromkeys(value))
+                   }
+               }, self.invert
+
+
+class NotTermsQuery(TermsQuery):
+    invert = True
+
+
 class StartsWithQuery(AbstractQuery):
     invert = False
 
@@ -136,8 +187,72 @@ class StartsWithQuery(AbstractQuery):
                }, self.invert
 
 
+class MatchPhrasePrefixQuery(AbstractQuery):
+    """
+        analyzed prefix search on text fields, only the last term is expanded
+    """
+    invert = False
+
+    def generate(self, field_name, value):
+        return {
+                   "match_phrase_prefix": {
+                       field_name: value
+                   }
+               }, self.invert
+
+
+class NotMatchPhrasePrefixQuery(MatchPhrasePrefixQuery):
+    invert = True
+
+
+class NgramContainsQuery(AbstractQuery):
+    """
+        ~ as a match on a related ngram analyzed text field, e.g. title.ngram of title.keyword.
+        ngram settings are index settings, not mappings, so min_gram and max_gram of the analyzer are given:
+
+            register_query_builder(KeywordField, "~", NgramContainsQuery(3, 10), condition=has_ngram_field)
+
+        a value of min_gram to max_gram characters is an ngram itself, so documents containing it have that ngram and
+        match finds the same documents as a wildcard query. other values (shorter ones have no ngrams), values with
+        whitespace (tokenizers split them) and upper case values (analyzers usually lowercase ngrams) fall back to
+        the wildcard query and its expensive_queries check.
+    """
+    invert = False
+    fallback = ContainsQuery()
+
+    def __init__(self, min_gram, max_gram):
+        self.min_gram = min_gram
+        self.max_gram = max_gram
+
+    def generate(self, field_name, value):
+        return {
+                   "match": {
+                       field_name: {
+                           "query": value,
+                           "operator": "and"
+                       }
+                   }
+               }, self.invert
+
+    def get_field_name(self, field):
+        return find_related_field(field, is_ngram_field).name
+
+    def resolve(self, field, value):
+        if not isinstance(value, str) or not self.min_gram <= len(value) <= self.max_gram or \
+                value != value.lower() or any(character.isspace() for character in value) or \
+                find_related_field(field, is_ngram_field) is None:
+            return self.fallback
+        return self
+
+
+class NotNgramContainsQuery(NgramContainsQuery):
+    invert = True
+    fallback = NotContainsQuery()
+
+
 class EndsWithQuery(AbstractQuery):
     invert = False
+    expensive = True
 
     def generate(self, field_name, value):
         return {
@@ -164,6 +279,7 @@ class NotStartsWithQuery(AbstractQuery):
 
 class NotEndsWithQuery(AbstractQuery):
     invert = True
+    expensive = True
 
     def generate(self, field_name, value):
         return {
@@ -175,6 +291,45 @@ class NotEndsWithQuery(AbstractQuery):
                }, self.invert
 
 
+def get_related_fields(field):
+    """
+        subfields of field and its parent, e.g. title.suggest is related to title.keyword
+    """
+    related_fields = list(field.subfields)
+    if field.parent is not None:
+        related_fields.append(field.parent)
+        related_fields.extend(subfield for subfield in field.parent.subfields if subfield is not field)
+    return related_fields
+
+
+def find_related_field(field, condition):
+    """
+        field itself or first related field which passes condition
+    """
+    if condition(field):
+        return field
+    for related_field in get_related_fields(field):
+        if condition(related_field):
+            return related_field
+    return None
+
+
+def is_ngram_field(field):
+    """
+        text field with an ngram analyzer which analyzes searches with the same analyzer, a different search
+        analyzer (e.g. standard) doesn't produce ngrams of searched values.
+        analyzer settings are not part of mappings, so analyzers are recognized by their names
+    """
+    analyzer = str(field.mapping.get("analyzer") or "").lower()
+    search_analyzer = field.mapping.get("search_analyzer")
+    return field.elastic_field_type == "text" and "ngram" in analyzer and "edge" not in analyzer and \
+        (search_analyzer is None or search_analyzer == field.mapping.get("analyzer"))
+
+
+def has_ngram_field(field):
+    return find_related_field(field, is_ngram_field) is not None
+
+
 class QueryBuilderFactory(object):
     operator_class_mapping = {'=': EqualsQuery,
                               '>': GtQuery,
@@ -195,3 +350,49 @@ class QueryBuilderFactory(object):
     def get_query_builder(self, operator):
         query_generator_cls = self.operator_class_mapping.get(operator)
         return query_generator_cls()
+
+
+# exact value fields are not analyzed, so term level queries match the same documents as full text ones
+term_operator_class_mapping = {'=': TermQuery,
+                               '!=': NotTermQuery,
+                               'in': TermsQuery,
+                               'not in': NotTermsQuery,
+                               }
+
+
+class QueryBuilderRegistry(object):
+    """
+        shared query builders per field class and operator. builders are stateless, so one instance serves all
+        fields. builder of the nearest class in field class mro is used, builders registered later win and a builder
+        with condition is only used for fields which pass it.
+    """
+
+    def __init__(self):
+        self._builders = {}
+
+    def register(self, field_cls, operator, builder, condition=None):
+        """
+        :param field_cls: field class, ``object`` registers a default for all fields
+        :param operator: DQL operator
+        :param builder: AbstractQuery instance
+        :param condition: optional callable of field, e.g. to check mapping options
+        """
+        self._builders.setdefault((field_cls, operator), []).insert(0, (condition, builder))
+
+    def get_query_builder(self, field, operator):
+        for field_cls in type(field).__mro__:
+            for condition, builder in self._builders.get((field_cls, operator), ()):
+                if condition is None or condition(field):
+                    return builder
+        return None
+
+
+query_builder_registry = QueryBuilderRegistry()
+
+
+def register_query_builder(field_cls, operator, builder, condition=None):
+    query_builder_registry.register(field_cls, operator, builder, condition=condition)
+
+
+for default_operator, default_builder_cls in QueryBuilderFactory.operator_class_mapping.items():
+    register_query_builder(object, default_operator, default_builder_cls())
@@ -1,12 +1,33 @@
+import fnmatch
+import logging
+import os
+import re
+import threading
+import time
+import weakref
+
 from django.utils.module_loading import import_string
 from djangoql.ast import Name
-from elasticsearch import Elasticsearch
 
-from elastic_dql.serializers import serialize_suggestions_values_response
+from .cache import get_suggestion_cache
+from .serializers import serialize_suggestions, decode_cursor
 from .config import get_dql_config
+from .connections import get_connection
 from .exceptions import SchemaError
-from .field import FieldMapper
-from .utils import build_field_name_from_parts
+from .field import FieldMapper, FieldRegistry
+from .instrumentation import count, stage
+from .mappings import get_mapping_version, get_merged_mappings
+from .snapshot import load_mappings_snapshot, load_compiled_snapshot, save_compiled_snapshot
+from .suggestions import choose_suggestion_strategy, DEFAULT_SUGGESTIONS_SIZE
+from .utils import build_field_name_from_parts, get_snapshot_file_name, patterns_overlap
+
+logger = logging.getLogger(__name__)
+
+# field registries by mapping version and field options, a registry lives while a schema uses it
+field_registries = weakref.WeakValueDictionary()
+field_registries_lock = threading.Lock()
+# .ds-<data stream>-<yyyy.MM.dd>-<generation>, older versions don't have the date
+backing_index_pattern = re.compile(r'^\.ds-(.+?)-(?:\d{4}\.\d{2}\.\d{2}-)?\d+$')
 
 
 class SchemaFactory(object):
@@ -14,6 +35,15 @@ class SchemaFactory(object):
     include_indices = ('*',)
     exclude_indices = ()
     index_field_limits = {}
+    # suggestion strategies of fields, e.g. {"some-index": {"some_field": ["terms_enum"]}}
+    index_suggestion_strategies = {}
+    # query builders of fields, keys are field names or field classes,
+    # e.g. {"some-index": {TextType: {"startswith": MatchPhrasePrefixQuery()}}}
+    index_query_builders = {}
+    # fields with unique values which are sorted last in order by, e.g. {"some-index": "id"}
+    index_sort_tiebreakers = {}
+    # fields which never have more than one value, their range bounds in and are merged, e.g. {"some-index": ["age"]}
+    index_single_valued_fields = {}
 
     @classmethod
     def get_instance(cls):
@@ -22,7 +52,8 @@ class SchemaFactory(object):
             it is class method because this class can be inherited
         :return:
         """
-        if not cls.instance:
+        # instance of parent class must not be returned for child classes
+        if not cls.__dict__.get("instance"):
             cls.instance = cls()
         return cls.instance
 
@@ -36,6 +67,7 @@ class SchemaFactory(object):
                 'One of include_indices or exclude_indices must be specified',
             )
         self.per_index_instance = {}
+        self._lock = threading.Lock()
 
     def get_schema_instance(self, schema_cls, index):
         if self.excluded(index):
@@ -45,31 +77,160 @@ class SchemaFactory(object):
                     self.__class__,
                 ),
             )
+        schema_instance = self.per_index_instance.get((index, schema_cls))
+        if schema_instance is not None:
+            return schema_instance
         try:
-            schema_instance = self.per_index_instance.get(index, None)
-            if not schema_instance or isinstance(schema_instance, schema_cls):
-                schema_instance = self._create_schema_instance(schema_cls, index)
+            with self._lock:
+                schema_instance = self.per_index_instance.get((index, schema_cls))
+                if schema_instance is None:
+                    schema_instance = self._create_schema_instance(schema_cls, index)
         except Exception as exception:
             raise SchemaError(str(exception))
         return schema_instance
 
+    def invalidate(self, index):
+        """
+            drop cached schema instances of index, next call rebuilds them with fresh mappings
+        :param index:
+        :return:
+        """
+        with self._lock:
+            for key in [key for key in self.per_index_instance if key[0] == index]:
+                del self.per_index_instance[key]
+
+    def clear(self):
+        with self._lock:
+            self.per_index_instance = {}
+
     def excluded(self, index):
+        """
+            index can be an index, alias, data stream, wildcard pattern or a comma separated list of them.
+            include_indices and exclude_indices can have wildcard patterns
+        """
+        return any(self._name_excluded(name) for name in self._get_target_names(index))
+
+    @staticmethod
+    def _get_target_names(index):
+        # -name removes indices from a multi target expression, it can't add any index
+        return [name for name in index.split(",") if not name.startswith("-") or name == index]
+
+    def _name_excluded(self, name):
         if self.include_indices:
-            excluded = ("*" not in self.include_indices) and (index not in self.include_indices)
+            return not any(fnmatch.fnmatchcase(name, pattern) for pattern in self.include_indices)
+        # a pattern which can match an excluded index is excluded too
+        return any(patterns_overlap(name, pattern) for pattern in self.exclude_indices)
+
+    def get_fields_limit(self, index):
+        """
+            limited fields of every index or pattern of index_field_limits which index can match, so limits can't be
+            bypassed with a pattern or a list of indices, e.g. "users*" or "users,users"
+        """
+        fields_limit = []
+        for name in self._get_target_names(index):
+            for limited_index, limited_fields in self.index_field_limits.items():
+                if patterns_overlap(name, limited_index):
+                    fields_limit.extend(field for field in limited_fields if field not in fields_limit)
+        return fields_limit
+
+    def warm_up(self, schema_cls, indices=(), snapshot_path=None):
+        """
+            create schema instances and load their mappings before the first request.
+            mappings of all indices are fetched with one get_mapping request, or read from a snapshot file without
+            asking elasticsearch (indices which are not in snapshot are loaded on their first request)
+        :param indices: indices besides warm_up_indices setting, default_index and include_indices
+        :return: {index: get_mapping result of index} of loaded indices
+        """
+        indices = self.get_warm_up_indices(indices)
+        if snapshot_path:
+            snapshot = load_mappings_snapshot(snapshot_path)
+            index_results = {index: snapshot[index] for index in indices if index in snapshot}
         else:
-            excluded = index in self.exclude_indices
-        return excluded
+            index_results = self.fetch_mappings(indices) if indices else {}
+        for index in indices:
+            if index in index_results:
+                schema_instance = self.get_schema_instance(schema_cls, index)
+                schema_instance.load_mappings(schema_instance._get_index_mappings(index_results[index]))
+        return index_results
+
+    def get_warm_up_indices(self, indices=()):
+        dql_config = get_dql_config()
+        candidates = list(indices) + list(dql_config.warm_up_indices or ())
+        if dql_config.default_index:
+            candidates.append(dql_config.default_index)
+        candidates.extend(self.include_indices)
+        warm_up_indices = []
+        for index in candidates:
+            if index and index != "*" and index not in warm_up_indices and not self.excluded(index):
+                warm_up_indices.append(index)
+        return warm_up_indices
+
+    def fetch_mappings(self, indices):
+        """
+            get mappings of indices with one request, indices behind aliases can't be told apart in its result so
+            aliases are fetched one by one
+        :return: {index: get_mapping result of index}
+        """
+        client = self._create_elastic_connection()
+        try:
+            with stage("get_mapping", {"index": ",".join(indices)}):
+                result = client.indices.get_mapping(index=",".join(indices), ignore_unavailable=True,
+                                                    allow_no_indices=True)
+        except Exception as exception:
+            raise SchemaError(str(exception))
+        index_results = {}
+        for index in indices:
+            index_result = {name: result[name] for name in result if self._is_backing_index(name, index)}
+            if not index_result:
+                try:
+                    alias_result = client.indices.get_mapping(index=index)
+                except Exception as exception:
+                    logger.warning("fetching mappings of %s failed: %s", index, exception)
+                    continue
+                index_result = {name: alias_result[name] for name in alias_result}
+            index_results[index] = index_result
+        return index_results
+
+    @staticmethod
+    def _is_backing_index(name, index):
+        """
+            name is index or a backing index of a data stream of index, data stream of a backing index is matched
+            exactly, so .ds-logs-app-* is not a backing index of logs
+        """
+        match = backing_index_pattern.match(name)
+        data_stream = match.group(1) if match else None
+        for pattern in index.split(","):
+            if fnmatch.fnmatchcase(name, pattern) or \
+                    (data_stream is not None and fnmatch.fnmatchcase(data_stream, pattern)):
+                return True
+        return False
 
     def _create_schema_instance(self, schema_cls, index):
-        fields_limit = self.index_field_limits.get(index, [])
+        fields_limit = self.get_fields_limit(index)
         client = self._create_elastic_connection()
-        schema_instance = schema_cls(client, index, fields_limit=fields_limit)
-        self.per_index_instance[index] = schema_instance
+        dql_config = get_dql_config()
+        schema_instance = schema_cls(client, index, fields_limit=fields_limit,
+                                     mappings_ttl=dql_config.mappings_ttl,
+                                     background_refresh=dql_config.mappings_background_refresh,
+                                     suggestion_strategies=self.index_suggestion_strategies.get(index),
+                                     default_suggestion_strategies=dql_config.suggestion_strategies,
+                                     query_builders=self.index_query_builders.get(index),
+                                     expensive_queries=dql_config.expensive_queries,
+                                     compiled_snapshot_path=self._get_compiled_snapshot_path(index),
+                                     sort_tiebreaker=self.index_sort_tiebreakers.get(index),
+                                     single_valued_fields=self.index_single_valued_fields.get(index))
+        self.per_index_instance[(index, schema_cls)] = schema_instance
         return schema_instance
 
+    def _get_compiled_snapshot_path(self, index):
+        dql_config = get_dql_config()
+        if not dql_config.compiled_schemas_dir:
+            return None
+        return os.path.join(dql_config.compiled_schemas_dir, get_snapshot_file_name(index))
+
     def _create_elastic_connection(self):
         dql_config = get_dql_config()
-        elastic_connection = Elasticsearch(**dql_config.elastic_connection_params)
+        elastic_connection = get_connection(dql_config.elastic_connection_params)
         return elastic_connection
 
 
@@ -78,79 +239,301 @@ class AbstractElasticDjangoQlSchema(object):
 
 
 class ElasticDjangoQlSchema(AbstractElasticDjangoQlSchema):
+    default_suggestion_strategies = ("completion", "search_as_you_type", "terms")
 
-    def __init__(self, client, index, fields_limit=None):
+    def __init__(self, client, index, fields_limit=None, mappings_ttl=None, background_refresh=False,
+                 suggestion_strategies=None, default_suggestion_strategies=None, query_builders=None,
+                 expensive_queries=None, compiled_snapshot_path=None, sort_tiebreaker=None,
+                 single_valued_fields=None):
         self.client = client
         self.index = index
         self.fields_limit = fields_limit if fields_limit else []
+        self.suggestion_strategies = suggestion_strategies if suggestion_strategies else {}
+        if default_suggestion_strategies:
+            self.default_suggestion_strategies = default_suggestion_strategies
+        self.query_builders = query_builders if query_builders else {}
+        self.expensive_queries = expensive_queries
+        # compiled fields are shared with other processes through this file
+        self.compiled_snapshot_path = compiled_snapshot_path
+        # unique field which makes order of sorted hits stable for search_after
+        self.sort_tiebreaker = sort_tiebreaker
+        # ranges of a multi valued field can't be merged, age > 10 and age < 20 matches age [5, 25]
+        self.single_valued_fields = frozenset(single_valued_fields or ())
+        self.mappings_ttl = mappings_ttl
+        self.background_refresh = background_refresh
+        self.field_registry = None
+        self.valid_properties = []
         self.valid_properties_dict = {}
+        self.mapping_version = None
+        # {field name: [types]} of fields with different types in indices of an alias or pattern
+        self.mapping_conflicts = {}
+        self._mappings_loaded_at = None
+        self._refresh_lock = threading.Lock()
 
     def get_mappings(self):
+        self._ensure_mappings()
+        return self.valid_properties
+
+    def get_mapping_version(self):
+        self._ensure_mappings()
+        return self.mapping_version
+
+    def refresh_mappings(self):
+        """
+            fetch mappings from elasticsearch, fields are rebuilt only if mapping version is changed
+        :return: valid_properties
+        """
         try:
-            result = self.client.indices.get_mapping(index=self.index)
-            mappings = result[self.index]["mappings"]
+            with stage("get_mapping", {"index": self.index}):
+                result = self.client.indices.get_mapping(index=self.index)
         except Exception as e:
             raise SchemaError(str(e))
-        valid_properties = self._cache_properties(mappings)
+        valid_properties = self.load_mappings(self._get_index_mappings(result))
+        if self.compiled_snapshot_path:
+            try:
+                self._save_compiled_snapshot(self.compiled_snapshot_path)
+            except OSError as exception:
+                logger.warning("saving compiled snapshot of %s failed: %s", self.index, exception)
         return valid_properties
 
-    def suggestions(self, field_name, search=None):
-        field = self.resolve_name(field_name)
-        if not field:
-            raise SchemaError("%s is not a valid field_name" % field_name)
-        if not field.can_suggest_values():
-            raise SchemaError("field %s hasn't type keyword" % field_name)
-        query, aggregations = self._get_suggestions_query(field.name, search)
+    def load_mappings(self, mappings):
+        mapping_version = self._get_mapping_version(mappings)
+        if mapping_version != self.mapping_version:
+            self._cache_properties(mappings, mapping_version=mapping_version)
+            self.mapping_version = mapping_version
+        self._mappings_loaded_at = time.monotonic()
+        return self.valid_properties
+
+    def save_compiled_snapshot(self, path):
+        self._ensure_mappings()
+        self._save_compiled_snapshot(path)
+
+    def load_compiled_snapshot(self, path, max_age=None):
+        """
+            load compiled fields which are saved by another process instead of fetching and compiling mappings
+        :param max_age: seconds, older snapshots are not loaded
+        :return: True if snapshot is loaded
+        """
+        options = self._get_compiled_snapshot_options()
+
+        def is_usable(header):
+            age = time.time() - header["created_at"]
+            return header["options"] == options and (max_age is None or age < max_age)
+
+        snapshot = load_compiled_snapshot(path, header_filter=is_usable)
+        if snapshot is None:
+            return False
+        header, (field_classes, records) = snapshot
+        mapping_version = header["mapping_version"]
+        if mapping_version != self.mapping_version:
+            field_registry_key = self._get_field_registry_key(mapping_version)
+            with field_registries_lock:
+                field_registry = field_registries.get(field_registry_key)
+            if field_registry is None:
+                field_registry = FieldRegistry.from_records(field_classes, records,
+                                                            query_builders=self.query_builders or None)
+                self._prepare_fields(field_registry.fields)
+                with field_registries_lock:
+                    field_registry = field_registries.setdefault(field_registry_key, field_registry)
+            self._set_field_registry(field_registry)
+            self.mapping_version = mapping_version
+        # age of snapshot counts for mappings ttl
+        self._mappings_loaded_at = time.monotonic() - max(time.time() - header["created_at"], 0)
+        return True
+
+    def suggestions(self, field_name, search=None, size=None, after=None):
+        """
+        :param size: number of values in page
+        :param after: cursor of the next page from previous response
+        :return: {"values": [...], "after": cursor of the next page or None}
+        """
+        field = self._get_suggestion_field(field_name)
+        strategy = self.get_suggestion_strategy(field, search)
+        size = size or DEFAULT_SUGGESTIONS_SIZE
+        after = decode_cursor(after)
+        cached_result = self._get_cached_suggestions(field, search, strategy, size, after)
+        if cached_result is not None:
+            return cached_result
+        method, params = strategy.get_request(field, search, size, after=after)
         try:
-            result = self.client.search(index=self.index, query=query, aggregations=aggregations)
+            with stage("client.%s" % method, {"index": self.index, "field": field.name}):
+                result = getattr(self.client, method)(index=self.index, **params)
         except Exception as exception:
             raise SchemaError(str(exception))
-        final_result = serialize_suggestions_values_response(result)
-        return final_result
+        return self._get_suggestions_page(field, search, strategy, size, after, result)
+
+    def get_suggestion_strategy(self, field, search):
+        strategy_names = self.suggestion_strategies.get(field.name, self.default_suggestion_strategies)
+        if isinstance(strategy_names, str):
+            strategy_names = [strategy_names]
+        return choose_suggestion_strategy(field, search, strategy_names)
 
     def resolve_name(self, field_name):
-        if isinstance(field_name, Name):
-            field_name = build_field_name_from_parts(field_name.parts)
-        return self._resolve_name_str(field_name)
+        with stage("resolve_name"):
+            if isinstance(field_name, Name):
+                field_name = build_field_name_from_parts(field_name.parts)
+            return self._resolve_name_str(field_name)
 
     def _resolve_name_str(self, field_name):
-        if not self.valid_properties_dict:
-            self.get_mappings()
+        self._ensure_mappings()
         field = self.valid_properties_dict.get(field_name)
         if not field:
             raise SchemaError("invalid field_name: %s" % field_name)
         return field
 
-    def _cache_properties(self, properties):
-        field_mapper = FieldMapper()
-        must_be_limited_field_name = set(self.fields_limit)
-        all_fields = field_mapper.get_properties(properties)
-        valid_properties = list(filter(lambda field: field.name not in must_be_limited_field_name, all_fields))
-        self.valid_properties_dict = {field.name: field for field in valid_properties}
-        return valid_properties
+    def _get_index_mappings(self, result):
+        """
+            mappings of index, mappings of indices behind an alias, data stream or pattern are merged
+        """
+        if not result:
+            raise SchemaError("mappings of %s not found" % self.index)
+        mappings, self.mapping_conflicts = get_merged_mappings(result)
+        return mappings
+
+    def _get_suggestion_field(self, field_name):
+        field = self.resolve_name(field_name)
+        if not field:
+            raise SchemaError("%s is not a valid field_name" % field_name)
+        if not field.can_suggest_values():
+            raise SchemaError("field %s hasn't type keyword" % field_name)
+        return field
+
+    def _get_cached_suggestions(self, field, search, strategy, size, after):
+        suggestion_cache = get_suggestion_cache()
+        # only first pages are cached
+        if suggestion_cache is None or after is not None:
+            return None
+        # values of a field differ between strategies
+        cache_field_name = "%s:%s" % (strategy.name, field.name)
+        cached_values = suggestion_cache.get(self.index, cache_field_name, search, matches=strategy.matches)
+        if cached_values is None:
+            count("suggestions_cache.miss")
+            return None
+        values, complete = cached_values
+        if len(values) > size or (not complete and len(values) == size):
+            values = values[:size]
+            next_after = values[-1]["key"] if strategy.paginated else None
+        elif complete:
+            next_after = None
+        else:
+            count("suggestions_cache.miss")
+            return None
+        count("suggestions_cache.hit")
+        return serialize_suggestions(values, next_after)
 
-    def _get_suggestions_query(self, field_name, search):
-        # TODO: seprate query building from schema
-        if search:
-            query = {
-                "wildcard": {
-                    field_name: {
-                        "value": "*" + search + "*"
-                    }
-                }
-            }
+    def _get_suggestions_page(self, field, search, strategy, size, after, result):
+        values, next_after = strategy.parse_response(result, size, search=search)
+        suggestion_cache = get_suggestion_cache()
+        if suggestion_cache is not None and after is None:
+            cache_field_name = "%s:%s" % (strategy.name, field.name)
+            suggestion_cache.set(self.index, cache_field_name, search, values, next_after is None)
+        return serialize_suggestions(values, next_after)
+
+    def _cache_properties(self, properties, mapping_version=None):
+        if mapping_version is None:
+            field_registry = self._create_field_registry(properties)
+        else:
+            field_registry_key = self._get_field_registry_key(mapping_version)
+            with field_registries_lock:
+                field_registry = field_registries.get(field_registry_key)
+            if field_registry is None:
+                count("field_registry.miss")
+                field_registry = self._create_field_registry(properties)
+                with field_registries_lock:
+                    field_registry = field_registries.setdefault(field_registry_key, field_registry)
+            else:
+                count("field_registry.hit")
+        self._set_field_registry(field_registry)
+        return field_registry.fields
+
+    def _get_field_registry_key(self, mapping_version):
+        return (mapping_version, tuple(sorted(self.fields_limit)), self.expensive_queries,
+                id(self.query_builders) if self.query_builders else None)
+
+    def _set_field_registry(self, field_registry):
+        self.field_registry = field_registry
+        self.valid_properties_dict = field_registry.fields_dict
+        self.valid_properties = field_registry.fields
+
+    def _create_field_registry(self, properties):
+        with stage("compile_mappings", {"index": self.index}):
+            field_mapper = FieldMapper()
+            must_be_limited_field_name = set(self.fields_limit)
+            all_fields = field_mapper.get_properties(properties)
+            valid_properties = [field for field in all_fields if field.name not in must_be_limited_field_name]
+            self._prepare_fields(valid_properties)
+            return FieldRegistry(valid_properties, query_builders=self.query_builders or None)
+
+    def _prepare_fields(self, fields):
+        for field in fields:
+            if self.expensive_queries is not None:
+                field.expensive_queries = self.expensive_queries
+            field.resolve_query_builders(self._get_field_query_builders(field))
+
+    def _save_compiled_snapshot(self, path):
+        save_compiled_snapshot(path, self.field_registry, self.mapping_version,
+                               options=self._get_compiled_snapshot_options())
+
+    def _get_compiled_snapshot_options(self):
+        # query builders are objects, so they are resolved again after loading a snapshot
+        return {"fields_limit": sorted(self.fields_limit)}
+
+    def _get_field_query_builders(self, field):
+        query_builders = {}
+        for key, operator_builders in self.query_builders.items():
+            if isinstance(key, type) and isinstance(field, key):
+                query_builders.update(operator_builders)
+        query_builders.update(self.query_builders.get(field.name, {}))
+        return query_builders
+
+    def _ensure_mappings(self):
+        if self._mappings_loaded_at is None:
+            with self._refresh_lock:
+                if self._mappings_loaded_at is None:
+                    self._load_or_refresh_mappings()
+        elif self._mappings_expired():
+            self._refresh_expired_mappings()
+
+    def _mappings_expired(self):
+        if self.mappings_ttl is None:
+            return False
+        return time.monotonic() - self._mappings_loaded_at >= self.mappings_ttl
+
+    def _refresh_expired_mappings(self):
+        # expired mappings are still valid to use, so only one refresh runs at a time and others keep going
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        if self.background_refresh:
+            thread = threading.Thread(target=self._refresh_and_release, daemon=True)
+            thread.start()
         else:
-            query = {
-                "exists": {
-                    "field": field_name
-                }
-            }
-
-        aggregations = {
-            "values": {
-                "terms": {"field": field_name}
-            }}
-        return query, aggregations
+            self._refresh_and_release()
+
+    def _load_or_refresh_mappings(self):
+        """
+            load mappings from a fresh compiled snapshot of another process or fetch them from elasticsearch
+        """
+        if self.compiled_snapshot_path:
+            try:
+                if self.load_compiled_snapshot(self.compiled_snapshot_path, max_age=self.mappings_ttl):
+                    return
+            except SchemaError as exception:
+                logger.warning("loading compiled snapshot of %s failed: %s", self.index, exception)
+        self.refresh_mappings()
+
+    def _refresh_and_release(self):
+        try:
+            self._load_or_refresh_mappings()
+        except SchemaError as exception:
+            logger.warning("refreshing mappings of %s failed: %s", self.index, exception)
+            # don't retry on every request while elasticsearch is unavailable
+            self._mappings_loaded_at = time.monotonic()
+        finally:
+            self._refresh_lock.release()
+
+    @staticmethod
+    def _get_mapping_version(mappings):
+        return get_mapping_version(mappings)
 
     def validate(self, ast):
         pass
@@ -176,3 +559,8 @@ def get_schema_instance(index):
     schema_factory, schema_cls = SchemaHandler().initiate()
     schema_instance = schema_factory.get_schema_instance(schema_cls, index)
     return schema_instance
+
+
+def warm_up_schemas(indices=(), snapshot_path=None):
+    schema_factory, schema_cls = SchemaHandler().initiate()
+    return schema_factory.warm_up(schema_cls, indices=indices, snapshot_path=snapshot_path)
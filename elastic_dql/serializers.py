@@ -1,9 +1,58 @@
+import base64
+import binascii
+import json
+
+from .exceptions import SchemaError
+
+
 def serialize_suggestions_values_response(result):
     try:
         field_values = result["aggregations"]["values"]["buckets"]
     except KeyError:
         field_values = []
-    return field_values
+    # composite aggregation keys are dicts of sources
+    return [{"key": bucket["key"]["value"], "doc_count": bucket["doc_count"]} if isinstance(bucket["key"], dict)
+            else bucket for bucket in field_values]
+
+
+def serialize_aggregations_response(result):
+    aggregations = {}
+    for name, aggregation in result.get("aggregations", {}).items():
+        if "buckets" in aggregation:
+            aggregations[name] = [serialize_bucket(bucket) for bucket in aggregation["buckets"]]
+        else:
+            aggregations[name] = aggregation
+    # total is not returned with track_total_hits=false
+    total = result["hits"].get("total")
+    return {
+        "total": total["value"] if isinstance(total, dict) else total,
+        "aggregations": aggregations,
+        "hits": result["hits"]["hits"],
+    }
+
+
+def serialize_bucket(bucket):
+    # dates have their formatted value in key_as_string, their key is epoch millis
+    return {"key": bucket.get("key_as_string", bucket["key"]), "doc_count": bucket["doc_count"]}
+
+
+def serialize_suggestions(values, after=None):
+    return {"values": values, "after": encode_cursor(after)}
+
+
+def encode_cursor(after):
+    if after is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(after).encode()).decode()
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError):
+        raise SchemaError("invalid cursor: %s" % cursor)
 
 
 def serialize_mappings(mappings):
@@ -11,3 +60,22 @@ def serialize_mappings(mappings):
     for field in mappings:
         result.append({"name": field.name, "type": field.elastic_field_type})
     return result
+
+
+def serialize_msearch_body(index, results, **search_params):
+    """
+        build _msearch ndjson body of successful results, responses are in order of [r for r in results if r.ok]
+    :param index:
+    :param results: list of QueryResult
+    :param search_params: extra search body params like size, _source, ...
+    :return:
+    """
+    lines = []
+    header = json.dumps({"index": index})
+    for result in results:
+        if not result.ok:
+            continue
+        body = dict(result.query, **search_params)
+        lines.append(header)
+        lines.append(json.dumps(body))
+    return "".join(line + "\n" for line in lines)
@@ -0,0 +1,118 @@
+import json
+import marshal
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+from . import __version__
+from .exceptions import SchemaError
+
+SNAPSHOT_VERSION = 1
+
+COMPILED_SNAPSHOT_MAGIC = b"EDQL"
+COMPILED_SNAPSHOT_VERSION = 1
+# magic, format version, header length
+compiled_snapshot_prefix = struct.Struct(">4sHI")
+
+
+def write_atomically(path, content):
+    """
+        readers of path see the old or the new content, never a part of it
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    file_descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "wb") as snapshot_file:
+            snapshot_file.write(content)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def save_mappings_snapshot(path, index_results):
+    """
+        write get_mapping results of indices to a json file, file is replaced atomically
+    :param path:
+    :param index_results: {index: get_mapping result of index}
+    """
+    snapshot = {"version": SNAPSHOT_VERSION, "created_at": time.time(), "indices": index_results}
+    write_atomically(path, json.dumps(snapshot).encode())
+
+
+def load_mappings_snapshot(path):
+    """
+    :return: {index: get_mapping result of index}
+    """
+    try:
+        with open(path) as snapshot_file:
+            snapshot = json.load(snapshot_file)
+    except (OSError, ValueError) as exception:
+        raise SchemaError("can't load mappings snapshot %s: %s" % (path, exception))
+    if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+        raise SchemaError("unsupported mappings snapshot %s" % path)
+    return snapshot["indices"]
+
+
+def save_compiled_snapshot(path, field_registry, mapping_version, options=None):
+    """
+        write compiled fields of a schema to a binary file: a fixed prefix, a json header and marshaled field records.
+        marshal format depends on python version, so its version is part of the header too
+    :param options: schema options which change compiled fields, snapshot is only loaded with the same options
+    """
+    header = json.dumps({
+        "library_version": __version__,
+        "marshal_version": marshal.version,
+        "mapping_version": mapping_version,
+        "created_at": time.time(),
+        "options": options,
+    }).encode()
+    prefix = compiled_snapshot_prefix.pack(COMPILED_SNAPSHOT_MAGIC, COMPILED_SNAPSHOT_VERSION, len(header))
+    write_atomically(path, prefix + header + marshal.dumps(field_registry.to_records()))
+
+
+def read_compiled_snapshot_header(snapshot):
+    if len(snapshot) < compiled_snapshot_prefix.size:
+        raise SchemaError("invalid compiled snapshot")
+    magic, format_version, header_length = compiled_snapshot_prefix.unpack_from(snapshot)
+    if magic != COMPILED_SNAPSHOT_MAGIC or format_version != COMPILED_SNAPSHOT_VERSION:
+        raise SchemaError("unsupported compiled snapshot")
+    header_end = compiled_snapshot_prefix.size + header_length
+    try:
+        header = json.loads(bytes(snapshot[compiled_snapshot_prefix.size:header_end]))
+    except ValueError:
+        raise SchemaError("invalid compiled snapshot header")
+    return header, header_end
+
+
+def load_compiled_snapshot(path, header_filter=None):
+    """
+        read a compiled snapshot with mmap, field records are only unmarshaled if header passes header_filter
+    :param header_filter: callable of header
+    :return: (header, (field class paths, field records)) or None if snapshot doesn't exist or is filtered out
+    """
+    try:
+        snapshot_file = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    except OSError as exception:
+        raise SchemaError("can't load compiled snapshot %s: %s" % (path, exception))
+    with snapshot_file:
+        try:
+            snapshot = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise SchemaError("invalid compiled snapshot")
+        with snapshot:
+            header, header_end = read_compiled_snapshot_header(snapshot)
+            if header.get("library_version") != __version__ or header.get("marshal_version") != marshal.version:
+                return None
+            if header_filter is not None and not header_filter(header):
+                return None
+            with memoryview(snapshot) as snapshot_view:
+                try:
+                    records = marshal.loads(snapshot_view[header_end:])
+                except (EOFError, ValueError, TypeError):
+                    raise SchemaError("invalid compiled snapshot")
+    return header, records
@@ -0,0 +1,96 @@
+import re
+
+from djangoql.exceptions import DjangoQLParserError
+
+from .exceptions import SchemaError
+from .field import KeywordField, TextType
+from .projection import has_doc_values
+
+ORDER_BY_PATTERN = re.compile(r"\border\s+by\b")
+LIMIT_PATTERN = re.compile(r"\blimit\s+(?P<limit>\d+)\s*$")
+SORT_FIELD_PATTERN = re.compile(r"^(?P<name>[\w.]+)(?:\s+(?P<order>asc|desc))?$")
+
+
+def mask_strings(search):
+    """
+        search with contents of string literals replaced by spaces, so keywords in values are not matched
+    """
+    characters = list(search)
+    in_string = escaped = False
+    for position, character in enumerate(characters):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif character == "\\":
+                escaped = True
+            elif character == '"':
+                in_string = False
+                continue
+            characters[position] = " "
+        elif character == '"':
+            in_string = True
+    return "".join(characters)
+
+
+def split_search(search):
+    """
+        split ``order by`` and ``limit`` clauses from end of a DQL search,
+        e.g. 'age > 10 order by age desc, name limit 20'
+    :return: (filter search, [(field name, "asc" or "desc")], limit or None)
+    """
+    if "order" not in search and "limit" not in search:
+        return search, [], None
+    masked_search = mask_strings(search)
+    limit = None
+    limit_match = LIMIT_PATTERN.search(masked_search)
+    if limit_match:
+        limit = int(limit_match.group("limit"))
+        masked_search = masked_search[:limit_match.start()]
+    sort_fields = []
+    order_by_matches = list(ORDER_BY_PATTERN.finditer(masked_search))
+    if order_by_matches:
+        order_by_match = order_by_matches[-1]
+        sort_fields = [parse_sort_field(part) for part in masked_search[order_by_match.end():].split(",")]
+        masked_search = masked_search[:order_by_match.start()]
+    return search[:len(masked_search)].strip(), sort_fields, limit
+
+
+def parse_sort_field(sort_field):
+    match = SORT_FIELD_PATTERN.match(sort_field.strip())
+    if not match:
+        raise DjangoQLParserError("invalid order by field: %s" % sort_field.strip())
+    return match.group("name"), match.group("order") or "asc"
+
+
+def get_sort_field(schema_instance, field_name):
+    """
+        field which sorts (or aggregates) values of field_name: the field itself or keyword subfield of a text field,
+        sorting on text fields needs fielddata which is disabled by default and costs a lot of heap
+    """
+    field = schema_instance.resolve_name(field_name)
+    if isinstance(field, TextType):
+        for subfield in field.subfields:
+            if isinstance(subfield, KeywordField) and has_doc_values(subfield):
+                return subfield
+        raise SchemaError("text field %s can't be sorted or aggregated, it has no keyword subfield" % field_name)
+    if not has_doc_values(field):
+        raise SchemaError("field %s can't be sorted or aggregated, it has no doc values" % field_name)
+    return field
+
+
+def build_sort(schema_instance, sort_fields, tiebreaker=None):
+    """
+    :param sort_fields: [(field name, order)]
+    :param tiebreaker: field with unique values which is sorted last, so search_after can page through same values
+    :return: sort parameter of search request
+    """
+    sort = []
+    sorted_names = set()
+    for field_name, order in sort_fields:
+        field = get_sort_field(schema_instance, field_name)
+        if field.name not in sorted_names:
+            sorted_names.add(field.name)
+            sort.append({field.name: {"order": order}})
+    if tiebreaker and tiebreaker not in sorted_names:
+        sort.append({get_sort_field(schema_instance, tiebreaker).name: {"order": "asc"}})
+    return sort
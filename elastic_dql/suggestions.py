@@ -0,0 +1,199 @@
+from .cache import contains
+from .exceptions import SchemaError
+from .query_generator import get_related_fields
+from .serializers import serialize_suggestions_values_response
+
+DEFAULT_SUGGESTIONS_SIZE = 10
+
+
+def starts_with(value, search):
+    return str(value).startswith(search)
+
+
+def get_related_field(field, elastic_field_type):
+    for related_field in get_related_fields(field):
+        if related_field.elastic_field_type == elastic_field_type:
+            return related_field
+    return None
+
+
+class AbstractSuggestionStrategy(object):
+    """
+        a way of getting suggestion values of a field.
+        strategies only build elasticsearch requests and read responses, so they work with sync and async clients
+    """
+    name = None
+    # used to filter values of a longer search from cached values of a shorter one, None disables it
+    matches = None
+    # values are ordered by key and the next page starts after the last key
+    paginated = True
+
+    def is_available(self, field, search):
+        return field.can_suggest_values()
+
+    def get_request(self, field, search, size, after=None):
+        """
+        :param after: key of the last value of previous page
+        :return: (client method name, method params without index)
+        """
+        raise NotImplementedError
+
+    def parse_response(self, result, size, search=None):
+        """
+        :return: (values, after), after is None on the last page
+        """
+        raise NotImplementedError
+
+
+class CompositeSuggestionStrategy(AbstractSuggestionStrategy):
+    """
+        composite aggregation of field values in documents matching get_query, a page of values costs the same
+        however many distinct values the field has
+    """
+
+    def get_query(self, field, search):
+        return None
+
+    def get_request(self, field, search, size, after=None):
+        composite = {"size": size, "sources": [{"value": {"terms": {"field": field.name}}}]}
+        if after is not None:
+            composite["after"] = {"value": after}
+        params = {"size": 0, "aggregations": {"values": {"composite": composite}}}
+        query = self.get_query(field, search)
+        if query is not None:
+            params["query"] = query
+        return "search", params
+
+    def parse_response(self, result, size, search=None):
+        values = serialize_suggestions_values_response(result)
+        after = values[-1]["key"] if len(values) >= size else None
+        if search and self.matches is not None:
+            # query matches documents, other values of multi valued fields are in their buckets too.
+            # next page starts after the last bucket, so a page can have less than size values
+            values = [value for value in values if self.matches(value["key"], search)]
+        return values, after
+
+
+class TermsSuggestionStrategy(CompositeSuggestionStrategy):
+    """
+        values starting with search, prefix query seeks the terms dictionary instead of scanning it and values of
+        matching documents which don't start with search are filtered from buckets
+    """
+    name = "terms"
+    matches = staticmethod(starts_with)
+
+    def get_query(self, field, search):
+        if not search:
+            return None
+        return {"prefix": {field.name: {"value": search}}}
+
+
+class WildcardSuggestionStrategy(CompositeSuggestionStrategy):
+    """
+        values of documents containing search, leading wildcard scans whole terms dictionary
+    """
+    name = "wildcard"
+    matches = staticmethod(contains)
+
+    def get_query(self, field, search):
+        if not search:
+            return None
+        return {"wildcard": {field.name: {"value": "*" + search + "*"}}}
+
+
+class TermsEnumSuggestionStrategy(AbstractSuggestionStrategy):
+    """
+        terms enum api, the cheapest way to get values starting with search but without document counts
+    """
+    name = "terms_enum"
+    matches = staticmethod(starts_with)
+
+    def get_request(self, field, search, size, after=None):
+        params = {"field": field.name, "size": size}
+        if search:
+            params["string"] = search
+        if after is not None:
+            params["search_after"] = after
+        return "terms_enum", params
+
+    def parse_response(self, result, size, search=None):
+        terms = result.get("terms", [])
+        after = terms[-1] if len(terms) >= size else None
+        return [{"key": term} for term in terms], after
+
+
+class CompletionSuggestionStrategy(AbstractSuggestionStrategy):
+    """
+        completion suggester on a completion subfield, values have no document counts
+    """
+    name = "completion"
+    paginated = False
+
+    def is_available(self, field, search):
+        return bool(search) and get_related_field(field, "completion") is not None
+
+    def get_request(self, field, search, size, after=None):
+        completion_field = get_related_field(field, "completion")
+        suggest = {"values": {
+            "prefix": search,
+            "completion": {"field": completion_field.name, "size": size, "skip_duplicates": True},
+        }}
+        return "search", {"size": 0, "source": False, "suggest": suggest}
+
+    def parse_response(self, result, size, search=None):
+        try:
+            options = result["suggest"]["values"][0]["options"]
+        except (KeyError, IndexError):
+            options = []
+        return [{"key": option["text"]} for option in options], None
+
+
+class SearchAsYouTypeSuggestionStrategy(CompositeSuggestionStrategy):
+    """
+        values of documents matching search on a search_as_you_type subfield
+    """
+    name = "search_as_you_type"
+    # search is analyzed, so values can't be filtered locally
+    matches = None
+
+    def is_available(self, field, search):
+        return field.can_suggest_values() and bool(search) and \
+            get_related_field(field, "search_as_you_type") is not None
+
+    def get_query(self, field, search):
+        search_field = get_related_field(field, "search_as_you_type").name
+        return {"multi_match": {
+            "query": search,
+            "type": "bool_prefix",
+            "fields": [search_field, search_field + "._2gram", search_field + "._3gram"],
+        }}
+
+
+suggestion_strategies = {}
+
+
+def register_suggestion_strategy(strategy):
+    suggestion_strategies[strategy.name] = strategy
+
+
+def get_suggestion_strategy(name):
+    try:
+        return suggestion_strategies[name]
+    except KeyError:
+        raise SchemaError("invalid suggestion strategy: %s" % name)
+
+
+for default_strategy in (TermsSuggestionStrategy(), WildcardSuggestionStrategy(), TermsEnumSuggestionStrategy(),
+                         CompletionSuggestionStrategy(), SearchAsYouTypeSuggestionStrategy()):
+    register_suggestion_strategy(default_strategy)
+
+
+def choose_suggestion_strategy(field, search, strategy_names):
+    """
+        first available strategy of strategy_names, they should be ordered from the cheapest one
+    """
+    for strategy_name in strategy_names:
+        strategy = get_suggestion_strategy(strategy_name)
+        if strategy.is_available(field, search):
+            return strategy
+    raise SchemaError("no suggestion strategy is available for field %s" % field.name)
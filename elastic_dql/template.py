@@ -0,0 +1,198 @@
+import re
+
+from djangoql.ast import Logical
+
+from .exceptions import FieldError, TemplateError
+from .parser import parse
+from .optimizer import optimize_query
+from .query import build_query, build_logical_query, build_lookup_query, finalize_query
+from .schema import get_schema_instance
+from .utils import copy_query
+
+PARAMETER_PREFIX = "\x00"
+# a parameter of a whole in/not in list, e.g. status in $statuses
+LIST_PARAMETER_PREFIX = "\x01"
+
+# strings are matched too, so a $name inside a string value is not taken as a parameter
+parameter_pattern = re.compile(r'"(?:\\.|[^"\\])*"|\$([_A-Za-z][_0-9A-Za-z]*)')
+in_operator_pattern = re.compile(r'(?<![_0-9A-Za-z])in\s*$')
+
+
+def replace_parameters(search):
+    """
+        replace $name parameters with placeholder strings which can be parsed by DjangoQL parser,
+        parameters right after in/not in are replaced with a one item list of a whole list placeholder,
+        parameters inside a list e.g. status in ($first, $second) are parameters of one item
+    :param search:
+    :return: search
+    """
+
+    def replace(match):
+        name = match.group(1)
+        if name is None:
+            return match.group(0)
+        if in_operator_pattern.search(search, 0, match.start()):
+            return '("%s%s")' % (LIST_PARAMETER_PREFIX, name)
+        return '"%s%s"' % (PARAMETER_PREFIX, name)
+
+    return parameter_pattern.sub(replace, search)
+
+
+def get_parameter_name(value, prefix=PARAMETER_PREFIX):
+    if isinstance(value, str) and value.startswith(prefix):
+        return value[len(prefix):]
+    return None
+
+
+def get_list_parameter_name(value):
+    if isinstance(value, list) and len(value) == 1:
+        return get_parameter_name(value[0], LIST_PARAMETER_PREFIX)
+    return None
+
+
+def has_parameter(expr):
+    if isinstance(expr.operator, Logical):
+        return has_parameter(expr.left) or has_parameter(expr.right)
+    value = expr.right.value
+    if isinstance(value, list):
+        return get_list_parameter_name(value) is not None or \
+            any(get_parameter_name(item) is not None for item in value)
+    return get_parameter_name(value) is not None
+
+
+class StaticNode(object):
+    def __init__(self, query, inverted):
+        self.query = query
+        self.inverted = inverted
+
+    def render(self, values):
+        return copy_query(self.query), self.inverted
+
+
+class LogicalNode(object):
+    def __init__(self, operator, left, right):
+        self.operator = operator
+        self.left = left
+        self.right = right
+
+    def render(self, values):
+        left, left_invert = self.left.render(values)
+        right, right_invert = self.right.render(values)
+        return build_logical_query(self.operator, left, right), False
+
+
+class ParameterNode(object):
+    def __init__(self, field, path, operator, name):
+        self.field = field
+        self.path = path
+        self.operator = operator
+        self.name = name
+
+    def render(self, values):
+        value = self.validate(values[self.name])
+        query, inverted = self.field.get_lookup(path=self.path, operator=self.operator, value=value)
+        return build_lookup_query(query, inverted), inverted
+
+    def validate(self, value):
+        """
+        :return: value which is passed to lookups, tuples of in/not in are converted to lists
+        """
+        if self.operator in ('in', 'not in'):
+            if not isinstance(value, (list, tuple)):
+                raise TemplateError("parameter %s must be a list" % self.name)
+            value = list(value)
+            for item in value:
+                self.field.validate(item)
+        else:
+            self.field.validate(value)
+        return value
+
+
+class ListItemsNode(object):
+    """
+        in/not in list of parameters and literal values, items are (name, None) of parameters and
+        (None, value) of literals
+    """
+
+    def __init__(self, field, path, operator, items):
+        self.field = field
+        self.path = path
+        self.operator = operator
+        self.items = items
+
+    def render(self, values):
+        value = []
+        for name, item in self.items:
+            if name is not None:
+                item = values[name]
+                self.field.validate(item)
+            value.append(item)
+        query, inverted = self.field.get_lookup(path=self.path, operator=self.operator, value=value)
+        return build_lookup_query(query, inverted), inverted
+
+
+class QueryTemplate(object):
+    """
+        DQL query with $name parameters which is parsed and resolved once and can be rendered with many values.
+
+        template = compile_query("index", 'user_id = $user_id and status in $statuses')
+        query = template.render(user_id=123, statuses=["active", "pending"])
+    """
+
+    def __init__(self, search, schema_instance):
+        self.search = search
+        self.schema_instance = schema_instance
+        self.parameters = []
+        self.mapping_version = None
+        self._root = None
+        self.compile()
+
+    def compile(self):
+        ast = parse(replace_parameters(self.search))
+        self.schema_instance.validate(ast)
+        self.mapping_version = self.schema_instance.get_mapping_version()
+        self.parameters = []
+        self._root = self._compile_expression(ast)
+
+    def render(self, **values):
+        missing_parameters = [name for name in self.parameters if name not in values]
+        if missing_parameters:
+            raise TemplateError("missing parameters: %s" % ", ".join(missing_parameters))
+        if self.schema_instance.get_mapping_version() != self.mapping_version:
+            self.compile()
+        query, inverted = self._root.render(values)
+        query = optimize_query(query, self.schema_instance)
+        return finalize_query(query, inverted)
+
+    def _compile_expression(self, expr):
+        if not has_parameter(expr):
+            query, inverted = build_query(expr, self.schema_instance)
+            return StaticNode(query, inverted)
+        if isinstance(expr.operator, Logical):
+            left = self._compile_expression(expr.left)
+            right = self._compile_expression(expr.right)
+            return LogicalNode(expr.operator.operator, left, right)
+        field = self.schema_instance.resolve_name(expr.left)
+        operator = expr.operator.operator
+        if operator not in field.valid_operators:
+            raise FieldError("operator %s is not valid for this type" % operator)
+        value = expr.right.value
+        if isinstance(value, list) and get_list_parameter_name(value) is None:
+            items = []
+            for item in value:
+                name = get_parameter_name(item)
+                self._add_parameter(name)
+                items.append((name, None) if name is not None else (None, item))
+            return ListItemsNode(field, expr.left.parts[:-1], operator, items)
+        name = get_list_parameter_name(value) if isinstance(value, list) else get_parameter_name(value)
+        self._add_parameter(name)
+        return ParameterNode(field, expr.left.parts[:-1], operator, name)
+
+    def _add_parameter(self, name):
+        if name is not None and name not in self.parameters:
+            self.parameters.append(name)
+
+
+def compile_query(index, search):
+    schema_instance = get_schema_instance(index)
+    return QueryTemplate(search, schema_instance)
@@ -1,12 +1,27 @@
 from django.urls import path
 
-from .views import MappingsAPIView, SuggestionsAPIView
+from .async_views import AsyncMappingsAPIView, AsyncSuggestionsAPIView
+from .views import AggregationsAPIView, MappingsAPIView, SearchAPIView, SuggestionsAPIView
 
 urlpatterns = [
     path('mappings', MappingsAPIView.as_view(), name='mappings_api'),
     path('suggestions/<str:field>', SuggestionsAPIView.as_view(), name='suggestions_api'),
+    path('search', SearchAPIView.as_view(), name='search_api'),
+    path('aggregations', AggregationsAPIView.as_view(), name='aggregations_api'),
+]
+
+async_urlpatterns = [
+    path('mappings', AsyncMappingsAPIView.as_view(), name='mappings_api'),
+    path('suggestions/<str:field>', AsyncSuggestionsAPIView.as_view(), name='suggestions_api'),
 ]
 
 
 def get_urls():
     return urlpatterns
+
+
+def get_async_urls():
+    """
+        urls of async views for ASGI deployments
+    """
+    return async_urlpatterns
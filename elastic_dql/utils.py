@@ -1,3 +1,7 @@
+from functools import lru_cache
+from urllib.parse import quote
+
+
 def dot_join(first: str, secound: str) -> str:
     if not (isinstance(first, str) and isinstance(secound, str)):
         raise TypeError("both first and second args should have the str type")
@@ -8,6 +12,47 @@ def build_field_name_from_parts(parts):
     return '.'.join(parts)
 
 
+def get_snapshot_file_name(index):
+    """
+        file name of index snapshot, index can be a pattern or a list of indices
+    """
+    return quote(index, safe="") + ".edql"
+
+
+@lru_cache(maxsize=1024)
+def patterns_overlap(first, second):
+    """
+        whether an index name can match both index patterns, patterns only have * wildcards same as elasticsearch,
+        e.g. "secret-*" and "*-1" overlap on "secret-1", "secrets" and "*-1" don't overlap
+    """
+
+    @lru_cache(maxsize=None)
+    def overlap(i, j):
+        if i == len(first) and j == len(second):
+            return True
+        if i < len(first) and first[i] == "*":
+            # star matches nothing more, or it matches the next character of the other pattern
+            return overlap(i + 1, j) or (j < len(second) and overlap(i, j + 1))
+        if j < len(second) and second[j] == "*":
+            return overlap(i, j + 1) or (i < len(first) and overlap(i + 1, j))
+        return i < len(first) and j < len(second) and first[i] == second[j] and overlap(i + 1, j + 1)
+
+    return overlap(0, 0)
+
+
+def copy_query(query):
+    """
+        copy generated query, it only contains dicts, lists and scalar values so it is a lot faster than deepcopy
+    :param query:
+    :return:
+    """
+    if isinstance(query, dict):
+        return {key: copy_query(value) for key, value in query.items()}
+    if isinstance(query, list):
+        return [copy_query(value) for value in query]
+    return query
+
+
 def get_fields(fields_dict, base_name):
     """
         this method is not used yet
@@ -1,10 +1,14 @@
 import json
 
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.views.generic.base import View
+from djangoql.exceptions import DjangoQLError
 
+from .aggregations import execute_aggregations
 from .config import get_dql_config
-from .exceptions import IndexNotSpecified, SchemaError
+from .exceptions import IndexNotSpecified, SchemaError, InvalidParameter
+from .execution import execute_query, iter_ndjson
+from .instrumentation import stage
 from .schema import get_schema_instance
 from .serializers import serialize_mappings
 
@@ -18,6 +22,24 @@ class BaseAPIView(View):
             raise IndexNotSpecified("index not specified")
         return index
 
+    def _get_size(self, request, default_size=None, max_size=None):
+        """
+            size parameter, default_size and max_size are suggestions_size and suggestions_max_size by default
+        """
+        dql_config = get_dql_config()
+        default_size = default_size or dql_config.suggestions_size
+        max_size = max_size or dql_config.suggestions_max_size
+        size = request.GET.get("size")
+        if not size:
+            return default_size
+        try:
+            size = int(size)
+        except ValueError:
+            raise InvalidParameter("size must be an integer")
+        if not 0 < size <= max_size:
+            raise InvalidParameter("size must be between 1 and %s" % max_size)
+        return size
+
     def _error(self, message, status_code=400):
         return HttpResponse(
             content=json.dumps({"error": message}, indent=2),
@@ -34,11 +56,12 @@ class MappingsAPIView(BaseAPIView):
             index = self._get_index(request)
             schema_instance = get_schema_instance(index)
             mappings = schema_instance.get_mappings()
-            serialized_mappings = serialize_mappings(mappings)
         except (SchemaError, IndexNotSpecified) as exception:
             return self._error(str(exception))
+        with stage("serialize", {"response": "mappings"}):
+            content = json.dumps(serialize_mappings(mappings), indent=2)
         return HttpResponse(
-            content=json.dumps(serialized_mappings, indent=2),
+            content=content,
             content_type='application/json; charset=utf-8',
         )
 
@@ -47,15 +70,101 @@ class SuggestionsAPIView(BaseAPIView):
     http_method_names = ['get']
 
     def get(self, request, field, *args, **kwargs):
-        # TODO: add pagination
         try:
             index = self._get_index(request)
             schema_instance = get_schema_instance(index)
             search = request.GET.get("search")
-            suggestions = schema_instance.suggestions(field, search=search)
-        except (SchemaError, IndexNotSpecified) as exception:
+            size = self._get_size(request)
+            after = request.GET.get("after")
+            suggestions = schema_instance.suggestions(field, search=search, size=size, after=after)
+        except (SchemaError, IndexNotSpecified, InvalidParameter) as exception:
+            return self._error(message=str(exception))
+        with stage("serialize", {"response": "suggestions"}):
+            content = json.dumps(suggestions, indent=2)
+        return HttpResponse(
+            content=content,
+            content_type='application/json; charset=utf-8',
+        )
+
+
+class SearchAPIView(BaseAPIView):
+    """
+        runs a DQL search and streams all of its hits as newline delimited json, pages are fetched with point in time
+        and search_after so memory and time of a page don't grow with the export
+    """
+    http_method_names = ['get']
+
+    def get(self, request, *args, **kwargs):
+        dql_config = get_dql_config()
+        try:
+            index = self._get_index(request)
+            size = self._get_size(request, default_size=dql_config.execution_page_size,
+                                  max_size=dql_config.execution_max_page_size)
+            fields = self._get_fields(request, "source")
+            # source=false returns hits without _source
+            source = False if fields == ["false"] else None
+            search = execute_query(index, request.GET.get("search"), page_size=size, slices=self._get_slices(request),
+                                   source=source, fields=fields if source is None else None,
+                                   exclude_fields=self._get_fields(request, "exclude"),
+                                   projection=request.GET.get("projection") or "source").open()
+        # TypeError is raised by values which can't be converted to type of their field, e.g. age = None
+        except (DjangoQLError, ValueError, TypeError) as exception:
+            return self._error(message=str(exception))
+        return StreamingHttpResponse(iter_ndjson(search.pages()), content_type='application/x-ndjson')
+
+    @staticmethod
+    def _get_slices(request):
+        """
+            number of slices which are fetched concurrently, hits of sliced searches are not in order
+        """
+        dql_config = get_dql_config()
+        slices = request.GET.get("slices")
+        if not slices:
+            return None
+        try:
+            slices = int(slices)
+        except ValueError:
+            raise InvalidParameter("slices must be an integer")
+        if not 0 < slices <= dql_config.execution_max_slices:
+            raise InvalidParameter("slices must be between 1 and %s" % dql_config.execution_max_slices)
+        return slices
+
+    @staticmethod
+    def _get_fields(request, param):
+        """
+            comma separated field names
+        """
+        value = request.GET.get(param)
+        if not value:
+            return None
+        return [field_name.strip() for field_name in value.split(",") if field_name.strip()]
+
+
+class AggregationsAPIView(BaseAPIView):
+    """
+        facets, histograms and stats of a DQL search in one search request, e.g.
+        aggs=terms:status:20,histogram:age:10,date_histogram:created:week,stats:price
+    """
+    http_method_names = ['get']
+
+    def get(self, request, *args, **kwargs):
+        dql_config = get_dql_config()
+        try:
+            index = self._get_index(request)
+            specs = SearchAPIView._get_fields(request, "aggs")
+            if not specs:
+                raise InvalidParameter("aggs not specified")
+            # hits are not returned unless size is set
+            size = 0
+            if request.GET.get("size", "0") != "0":
+                size = self._get_size(request, max_size=dql_config.execution_max_page_size)
+            result = execute_aggregations(index, request.GET.get("search"), specs, size=size)
+        # TypeError is raised by values which can't be converted to type of their field, e.g. age = None
+        except (DjangoQLError, ValueError, TypeError) as exception:
             return self._error(message=str(exception))
+        with stage("serialize", {"response": "aggregations"}):
+            content = json.dumps(result, indent=2)
         return HttpResponse(
-            content=json.dumps(suggestions, indent=2),
+            content=content,
             content_type='application/json; charset=utf-8',
         )
@@ -7,13 +7,18 @@ import elastic_dql
 this_directory = Path(__file__).parent
 long_description = (this_directory / "README.md").read_text()
 
-packages = ['elastic_dql']
+packages = ['elastic_dql', 'elastic_dql.management', 'elastic_dql.management.commands']
 requires = ["djangoql==0.17.1", "elasticsearch==8.1.0"]
 
 setup(
     name='elastic-dql',
     packages=packages,
     install_requires=requires,
+    extras_require={
+        "async": ["elasticsearch[async]==8.1.0"],
+        "prometheus": ["prometheus_client"],
+        "opentelemetry": ["opentelemetry-api"],
+    },
     version=elastic_dql.__version__,
     description='Elastic query language library - convering readable queries to elasticsearch query',
     long_description_content_type='text/markdown',
@@ -0,0 +1,126 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from elastic_dql.aggregations import (build_aggregations, execute_aggregations, get_aggregations_query,
+                                      parse_aggregation_spec)
+from elastic_dql.exceptions import ExecutionError, InvalidParameter, SchemaError
+from elastic_dql.serializers import serialize_aggregations_response
+from .utils import get_schema_instance
+
+
+PROPERTIES = {
+    "title": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+    "body": {"type": "text"},
+    "status": {"type": "keyword"},
+    "age": {"type": "long"},
+    "price": {"type": "float"},
+    "created": {"type": "date"},
+    "tag": {"type": "keyword", "doc_values": False},
+}
+
+
+class BuildAggregationsTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.schema_instance = get_schema_instance(PROPERTIES)
+
+    def test_parse_spec(self):
+        self.assertDictEqual(parse_aggregation_spec("terms:status:20"),
+                             {"name": "terms_status", "type": "terms", "field": "status", "param": "20"})
+        self.assertDictEqual(parse_aggregation_spec({"type": "stats", "field": "age", "name": "ages"}),
+                             {"name": "ages", "type": "stats", "field": "age", "param": None})
+        self.assertRaises(InvalidParameter, parse_aggregation_spec, "terms")
+        self.assertRaises(InvalidParameter, parse_aggregation_spec, "avg:age")
+
+    def test_aggregations(self):
+        aggregations = build_aggregations(self.schema_instance, [
+            "terms:status:20", "terms:title", "histogram:age:10", "histogram:price:0.5", "date_histogram:created:week",
+            "stats:price"])
+        self.assertDictEqual(aggregations, {
+            "terms_status": {"terms": {"field": "status", "size": 20}},
+            # text fields are counted by keyword subfield
+            "terms_title": {"terms": {"field": "title.keyword", "size": 10}},
+            "histogram_age": {"histogram": {"field": "age", "interval": 10}},
+            "histogram_price": {"histogram": {"field": "price", "interval": 0.5}},
+            "date_histogram_created": {"date_histogram": {"field": "created", "calendar_interval": "week"}},
+            "stats_price": {"stats": {"field": "price"}},
+        })
+        self.assertDictEqual(build_aggregations(self.schema_instance, ["date_histogram:created:12h"]),
+                             {"date_histogram_created": {"date_histogram": {"field": "created",
+                                                                            "fixed_interval": "12h"}}})
+
+    def test_invalid_aggregations(self):
+        self.assertRaises(SchemaError, build_aggregations, self.schema_instance, ["terms:body"])
+        self.assertRaises(SchemaError, build_aggregations, self.schema_instance, ["terms:tag"])
+        self.assertRaises(SchemaError, build_aggregations, self.schema_instance, ["terms:unknown"])
+        self.assertRaises(SchemaError, build_aggregations, self.schema_instance, ["histogram:status:10"])
+        self.assertRaises(SchemaError, build_aggregations, self.schema_instance, ["date_histogram:age"])
+        self.assertRaises(InvalidParameter, build_aggregations, self.schema_instance, ["histogram:age"])
+        self.assertRaises(InvalidParameter, build_aggregations, self.schema_instance, ["terms:status:0"])
+        self.assertRaises(InvalidParameter, build_aggregations, self.schema_instance, ["terms:status:x"])
+        self.assertRaises(InvalidParameter, build_aggregations, self.schema_instance,
+                          ["terms:status", "terms:status:5"])
+
+
+class AggregationsQueryTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.schema_instance = get_schema_instance(PROPERTIES)
+        self.schema_patcher = patch("elastic_dql.aggregations.get_schema_instance", return_value=self.schema_instance)
+        self.schema_patcher.start()
+
+    def tearDown(self) -> None:
+        self.schema_patcher.stop()
+
+    @patch("elastic_dql.aggregations.get_query")
+    def test_one_request_for_all_aggregations(self, get_query):
+        get_query.return_value = {"query": {"bool": {"filter": [{"range": {"age": {"gt": 10}}}]}},
+                                  "sort": [{"age": {"order": "asc"}}], "size": 5}
+        query = get_aggregations_query("index", "age > 10 order by age limit 5", ["terms:status", "stats:age"])
+        get_query.assert_called_once_with("index", "age > 10 order by age limit 5", track_total_hits=None)
+        self.assertDictEqual(query, {
+            "query": {"bool": {"filter": [{"range": {"age": {"gt": 10}}}]}}, "size": 0,
+            "aggs": {"terms_status": {"terms": {"field": "status", "size": 10}},
+                     "stats_age": {"stats": {"field": "age"}}},
+        })
+
+    def test_empty_search(self):
+        query = get_aggregations_query("index", "", ["terms:status"], size=20, track_total_hits=True)
+        self.assertDictEqual(query["query"], {"match_all": {}})
+        self.assertEqual(query["size"], 20)
+        self.assertIs(query["track_total_hits"], True)
+
+    def test_execute_aggregations(self):
+        self.schema_instance.client.search.return_value = {
+            "hits": {"total": {"value": 3, "relation": "eq"}, "hits": []},
+            "aggregations": {
+                "terms_status": {"buckets": [{"key": "a", "doc_count": 2}, {"key": "b", "doc_count": 1}]},
+                "date_histogram_created": {"buckets": [
+                    {"key_as_string": "2024-01-01T00:00:00.000Z", "key": 1704067200000, "doc_count": 3}]},
+                "stats_age": {"count": 3, "min": 10.0, "max": 30.0, "avg": 20.0, "sum": 60.0},
+            }
+        }
+        result = execute_aggregations("index", "", ["terms:status", "date_histogram:created", "stats:age"])
+        self.schema_instance.client.search.assert_called_once()
+        self.assertEqual(self.schema_instance.client.search.call_args.kwargs["size"], 0)
+        self.assertDictEqual(result, {
+            "total": 3,
+            "aggregations": {
+                "terms_status": [{"key": "a", "doc_count": 2}, {"key": "b", "doc_count": 1}],
+                "date_histogram_created": [{"key": "2024-01-01T00:00:00.000Z", "doc_count": 3}],
+                "stats_age": {"count": 3, "min": 10.0, "max": 30.0, "avg": 20.0, "sum": 60.0},
+            },
+            "hits": [],
+        })
+
+    def test_execute_error(self):
+        self.schema_instance.client.search.side_effect = Exception("timeout")
+        self.assertRaises(ExecutionError, execute_aggregations, "index", "", ["terms:status"])
+
+    def test_serialize_without_aggregations(self):
+        self.assertDictEqual(serialize_aggregations_response({"hits": {"total": 7, "hits": []}}),
+                             {"total": 7, "aggregations": {}, "hits": []})
+
+    def test_serialize_without_total(self):
+        self.assertDictEqual(serialize_aggregations_response({"hits": {"hits": []}}),
+                             {"total": None, "aggregations": {}, "hits": []})
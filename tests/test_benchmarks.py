@@ -0,0 +1,47 @@
+from unittest import TestCase
+
+from benchmarks.generators import generate_deep_search, generate_mappings, generate_wide_search
+from benchmarks.harness import compare_results, percentile
+from benchmarks.stub import StubElasticsearch
+from elastic_dql.query import generate_query
+from elastic_dql.schema import ElasticDjangoQlSchema
+
+
+class GeneratorsTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.mappings, self.fields = generate_mappings(field_count=60, depth=3)
+        self.schema_instance = ElasticDjangoQlSchema(StubElasticsearch(self.mappings), "bench")
+
+    def test_mappings_fields(self):
+        self.assertEqual(len(self.fields), 60)
+        for name, field_type in self.fields:
+            self.assertEqual(self.schema_instance.resolve_name(name).elastic_field_type, field_type)
+
+    def test_generated_searches_are_valid(self):
+        generate_query(generate_wide_search(self.fields, clauses=50), self.schema_instance)
+        generate_query(generate_deep_search(self.fields, depth=30), self.schema_instance)
+
+    def test_generators_are_deterministic(self):
+        self.assertEqual(generate_mappings(field_count=10, seed=1), generate_mappings(field_count=10, seed=1))
+        self.assertEqual(generate_wide_search(self.fields, seed=1), generate_wide_search(self.fields, seed=1))
+
+
+class HarnessTestCase(TestCase):
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 90), 7)
+
+    def test_compare_results(self):
+        baseline = [{"name": "parse.wide", "p50_us": 100.0, "ops_per_sec": 1000.0},
+                    {"name": "removed", "p50_us": 1.0, "ops_per_sec": 1.0}]
+        results = [{"name": "parse.wide", "p50_us": 150.0, "ops_per_sec": 700.0},
+                   {"name": "added", "p50_us": 1.0, "ops_per_sec": 1.0}]
+        (name, p50_change, ops_change, regressed), = compare_results(baseline, results, threshold=10)
+        self.assertEqual(name, "parse.wide")
+        self.assertAlmostEqual(p50_change, 50.0)
+        self.assertAlmostEqual(ops_change, -30.0)
+        self.assertTrue(regressed)
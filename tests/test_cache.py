@@ -0,0 +1,141 @@
+from unittest import TestCase
+from unittest.mock import PropertyMock, patch
+
+from django.core.cache.backends.locmem import LocMemCache
+
+from elastic_dql.cache import DjangoSuggestionCache, LRUCache, LocMemSuggestionCache
+
+
+class LRUCacheTestCase(TestCase):
+
+    def test_get_missing_key(self):
+        cache = LRUCache(2)
+        self.assertIsNone(cache.get("key"))
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_set_and_get(self):
+        cache = LRUCache(2)
+        cache.set("key", "value")
+        self.assertEqual(cache.get("key"), "value")
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = LRUCache(2)
+        cache.set("key1", 1)
+        cache.set("key2", 2)
+        cache.get("key1")
+        cache.set("key3", 3)
+        self.assertIsNone(cache.get("key2"))
+        self.assertEqual(cache.get("key1"), 1)
+        self.assertEqual(cache.get("key3"), 3)
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertEqual(len(cache), 2)
+
+    def test_clear(self):
+        cache = LRUCache(2)
+        cache.set("key", "value")
+        cache.get("key")
+        cache.clear()
+        self.assertEqual(cache.stats(), {"size": 0, "max_size": 2, "hits": 0, "misses": 0, "evictions": 0})
+
+
+class LocMemSuggestionCacheTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.buckets = [{"key": "abc", "doc_count": 2}, {"key": "xabx", "doc_count": 1}]
+
+    def test_get_missing_value(self):
+        cache = LocMemSuggestionCache()
+        self.assertIsNone(cache.get("index", "field", "ab"))
+
+    def test_get(self):
+        cache = LocMemSuggestionCache()
+        cache.set("index", "field", "ab", self.buckets, False)
+        self.assertEqual(cache.get("index", "field", "ab"), (self.buckets, False))
+        self.assertIsNone(cache.get("other_index", "field", "ab"))
+        self.assertIsNone(cache.get("index", "other_field", "ab"))
+
+    def test_without_search(self):
+        cache = LocMemSuggestionCache()
+        cache.set("index", "field", None, self.buckets, True)
+        self.assertEqual(cache.get("index", "field", None), (self.buckets, True))
+        self.assertEqual(cache.get("index", "field", "x"), ([{"key": "xabx", "doc_count": 1}], True))
+
+    def test_complete_prefix_is_filtered(self):
+        cache = LocMemSuggestionCache()
+        cache.set("index", "field", "a", self.buckets, True)
+        self.assertEqual(cache.get("index", "field", "abc"), ([{"key": "abc", "doc_count": 2}], True))
+
+    def test_custom_matches(self):
+        cache = LocMemSuggestionCache()
+        cache.set("index", "field", "a", self.buckets, True)
+        self.assertEqual(cache.get("index", "field", "ab", matches=lambda key, search: key.startswith(search)),
+                         ([{"key": "abc", "doc_count": 2}], True))
+
+    def test_prefix_is_not_used_without_matches(self):
+        cache = LocMemSuggestionCache()
+        cache.set("index", "field", "a", self.buckets, True)
+        self.assertIsNone(cache.get("index", "field", "abc", matches=None))
+
+    def test_incomplete_prefix_is_not_used(self):
+        cache = LocMemSuggestionCache()
+        cache.set("index", "field", "a", self.buckets, False)
+        self.assertIsNone(cache.get("index", "field", "abc"))
+
+    @patch("elastic_dql.cache.time.monotonic")
+    def test_expired_value(self, monotonic):
+        monotonic.return_value = 0
+        cache = LocMemSuggestionCache(ttl=10)
+        cache.set("index", "field", "ab", self.buckets, True)
+        monotonic.return_value = 11
+        self.assertIsNone(cache.get("index", "field", "ab"))
+
+    def test_cached_values_are_copies(self):
+        cache = LocMemSuggestionCache()
+        cache.set("index", "field", "ab", self.buckets, True)
+        self.buckets[0]["key"] = "changed"
+        values, complete = cache.get("index", "field", "ab")
+        self.assertEqual(values[0]["key"], "abc")
+        values[0]["key"] = "changed"
+        values.pop()
+        self.assertEqual(cache.get("index", "field", "ab"),
+                         ([{"key": "abc", "doc_count": 2}, {"key": "xabx", "doc_count": 1}], True))
+
+
+class DjangoSuggestionCacheTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.django_cache = LocMemCache("elastic-dql-tests", {})
+        self.cache_patcher = patch.object(DjangoSuggestionCache, "cache", new_callable=PropertyMock,
+                                          return_value=self.django_cache)
+        self.cache_patcher.start()
+        self.buckets = [{"key": "abc", "doc_count": 2}]
+
+    def tearDown(self) -> None:
+        self.cache_patcher.stop()
+        self.django_cache.clear()
+
+    def test_get(self):
+        cache = DjangoSuggestionCache()
+        cache.set("index", "field", "a", self.buckets, True)
+        self.assertEqual(cache.get("index", "field", "a"), (self.buckets, True))
+        self.assertEqual(cache.get("index", "field", "ab"), (self.buckets, True))
+
+    def test_clear_keeps_other_keys_of_cache(self):
+        self.django_cache.set("session", "value")
+        cache = DjangoSuggestionCache()
+        cache.set("index", "field", "a", self.buckets, True)
+        cache.clear()
+        self.assertIsNone(cache.get("index", "field", "a"))
+        self.assertEqual(self.django_cache.get("session"), "value")
+        cache.set("index", "field", "a", self.buckets, True)
+        self.assertEqual(cache.get("index", "field", "a"), (self.buckets, True))
+
+    def test_evicted_version_does_not_restore_cleared_values(self):
+        cache = DjangoSuggestionCache()
+        cache.set("index", "field", "a", self.buckets, True)
+        version = cache.get_version()
+        cache.clear()
+        self.django_cache.delete(cache.version_key)
+        self.assertGreater(cache.get_version(), version)
+        self.assertIsNone(cache.get("index", "field", "a"))
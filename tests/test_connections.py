@@ -0,0 +1,66 @@
+import asyncio
+from unittest import TestCase
+from unittest.mock import AsyncMock, Mock
+
+from elastic_dql.connections import AsyncConnection, AsyncConnectionRegistry, ConnectionRegistry
+
+
+class ConnectionRegistryTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.client_cls = Mock(side_effect=lambda **kwargs: Mock())
+        self.registry = ConnectionRegistry(self.client_cls)
+
+    def test_same_params_share_connection(self):
+        first = self.registry.get_connection({"hosts": ["http://localhost"]})
+        second = self.registry.get_connection({"hosts": ["http://localhost"]})
+        self.assertIs(first, second)
+        self.assertEqual(self.client_cls.call_count, 1)
+
+    def test_different_params(self):
+        first = self.registry.get_connection({"hosts": ["http://localhost"]})
+        second = self.registry.get_connection({"hosts": ["http://otherhost"]})
+        self.assertIsNot(first, second)
+
+    def test_clear_closes_connections(self):
+        connection = self.registry.get_connection({"hosts": ["http://localhost"]})
+        self.registry.clear()
+        connection.close.assert_called_once()
+        self.assertIsNot(connection, self.registry.get_connection({"hosts": ["http://localhost"]}))
+
+
+class AsyncConnectionRegistryTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.client_cls = Mock(side_effect=lambda **kwargs: Mock(close=AsyncMock()))
+        self.registry = AsyncConnectionRegistry(self.client_cls)
+        self.params = {"hosts": ["http://localhost"]}
+
+    async def get_connections(self):
+        return self.registry.get_connection(self.params), self.registry.get_connection(self.params)
+
+    def test_connection_per_event_loop(self):
+        first, second = asyncio.run(self.get_connections())
+        self.assertIs(first, second)
+        # async_to_sync runs every async view of a WSGI server in a new loop
+        third, _ = asyncio.run(self.get_connections())
+        self.assertIsNot(first, third)
+        # connections of closed loops are dropped
+        self.assertEqual(len(self.registry._connections), 1)
+
+    def test_async_connection_uses_running_loop(self):
+        connection = AsyncConnection(self.registry, self.params)
+
+        async def get_search():
+            return connection.search
+        self.assertIsNot(asyncio.run(get_search()), asyncio.run(get_search()))
+        self.assertEqual(self.client_cls.call_count, 2)
+
+    def test_clear(self):
+        async def clear():
+            connection = self.registry.get_connection(self.params)
+            await self.registry.clear()
+            return connection
+        connection = asyncio.run(clear())
+        connection.close.assert_awaited_once()
+        self.assertDictEqual(self.registry._connections, {})
@@ -0,0 +1,162 @@
+import io
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from elastic_dql.config import ElasticDqlConfig, DEFAULTS
+from elastic_dql.exceptions import ExecutionError
+from elastic_dql.execution import PointInTimeSearch, SlicedSearch, execute_query, iter_ndjson, write_ndjson
+
+
+def get_hits(start, count):
+    return [{"_id": str(number), "_source": {"age": number}, "sort": [number]} for number in range(start, start + count)]
+
+
+def get_search_response(hits, pit_id="pit"):
+    return {"pit_id": pit_id, "hits": {"hits": hits}}
+
+
+class PointInTimeSearchTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.client = Mock()
+        self.client.open_point_in_time.return_value = {"id": "pit"}
+        self.query = {"query": {"range": {"age": {"gte": 10}}}}
+
+    def test_pages(self):
+        self.client.search.side_effect = [get_search_response(get_hits(0, 2)),
+                                          get_search_response(get_hits(2, 2), pit_id="pit-2"),
+                                          get_search_response(get_hits(4, 1), pit_id="pit-3")]
+        search = PointInTimeSearch(self.client, "index", self.query, page_size=2, source=["age"])
+        self.assertListEqual([hit["_id"] for hit in search], ["0", "1", "2", "3", "4"])
+        self.client.open_point_in_time.assert_called_once_with(index="index", keep_alive="1m")
+        first_request, second_request, third_request = [call.kwargs for call in self.client.search.call_args_list]
+        self.assertDictEqual(first_request, {
+            "query": {"range": {"age": {"gte": 10}}}, "source": ["age"], "size": 2, "sort": [{"_shard_doc": "asc"}],
+            "track_total_hits": False, "pit": {"id": "pit", "keep_alive": "1m"}})
+        self.assertListEqual(second_request["search_after"], [1])
+        self.assertDictEqual(third_request["pit"], {"id": "pit-2", "keep_alive": "1m"})
+        self.client.close_point_in_time.assert_called_once_with(id="pit-3")
+
+    def test_full_last_page(self):
+        self.client.search.side_effect = [get_search_response(get_hits(0, 2)), get_search_response([])]
+        pages = list(PointInTimeSearch(self.client, "index", self.query, page_size=2).pages())
+        self.assertEqual(len(pages), 1)
+        self.assertEqual(self.client.search.call_count, 2)
+
+    def test_max_hits(self):
+        self.client.search.side_effect = [get_search_response(get_hits(0, 2)), get_search_response(get_hits(2, 1))]
+        search = PointInTimeSearch(self.client, "index", self.query, page_size=2, max_hits=3)
+        self.assertEqual(len(list(search)), 3)
+        self.assertEqual(self.client.search.call_args.kwargs["size"], 1)
+
+    def test_stopped_iteration_closes_point_in_time(self):
+        self.client.search.return_value = get_search_response(get_hits(0, 2))
+        hits = iter(PointInTimeSearch(self.client, "index", self.query, page_size=2))
+        next(hits)
+        hits.close()
+        self.client.close_point_in_time.assert_called_once_with(id="pit")
+
+    def test_errors(self):
+        self.client.open_point_in_time.side_effect = Exception("index not found")
+        self.assertRaises(ExecutionError, PointInTimeSearch(self.client, "index", self.query).open)
+        self.client.open_point_in_time.side_effect = None
+        self.client.search.side_effect = Exception("timeout")
+        self.assertRaises(ExecutionError, list, PointInTimeSearch(self.client, "index", self.query))
+        self.client.close_point_in_time.assert_called_once_with(id="pit")
+
+
+class ExecuteQueryTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.schema_instance = Mock()
+        self.config_patcher = patch("elastic_dql.execution.get_dql_config",
+                                    return_value=ElasticDqlConfig({}, DEFAULTS))
+        self.config_patcher.start()
+        self.schema_patcher = patch("elastic_dql.execution.get_schema_instance", return_value=self.schema_instance)
+        self.schema_patcher.start()
+
+    def tearDown(self) -> None:
+        self.config_patcher.stop()
+        self.schema_patcher.stop()
+
+    @patch("elastic_dql.execution.get_query", return_value={"query": {"term": {"status": "a"}}})
+    def test_execute_query(self, get_query):
+        search = execute_query("index", 'status = "a"', source=False)
+        get_query.assert_called_once_with("index", 'status = "a"')
+        self.assertIs(search.client, self.schema_instance.client)
+        self.assertDictEqual(search.request, {"query": {"term": {"status": "a"}}, "_source": False})
+        self.assertEqual(search.page_size, 1000)
+
+    @patch("elastic_dql.execution.get_query", return_value={"query": {"term": {"status": "a"}}})
+    def test_sliced_execute_query(self, get_query):
+        search = execute_query("index", 'status = "a"', slices=4)
+        self.assertIsInstance(search, SlicedSearch)
+        self.assertEqual(search.slices, 4)
+
+    @patch("elastic_dql.execution.get_query", return_value={"query": {"match_all": {}}, "sort": [{"age": "asc"}]})
+    def test_sorted_search_is_not_sliced(self, get_query):
+        self.assertIsInstance(execute_query("index", "order by age", slices=4), PointInTimeSearch)
+
+    def test_empty_search(self):
+        self.assertDictEqual(execute_query("index", "").request, {"query": {"match_all": {}}})
+
+    def test_ndjson(self):
+        def pages():
+            yield get_hits(0, 2)
+            raise ExecutionError("timeout")
+        lines = "".join(iter_ndjson(pages())).splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[2], '{"error": "timeout"}')
+
+
+class SlicedSearchTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.client = Mock()
+        self.client.open_point_in_time.return_value = {"id": "pit"}
+        self.query = {"query": {"match_all": {}}}
+
+        def search(slice, search_after=None, **kwargs):
+            # slice n has hits n*10 ... n*10+4 in pages of 2
+            start = slice["id"] * 10 + (search_after[0] - slice["id"] * 10 + 1 if search_after else 0)
+            end = min(start + kwargs["size"], slice["id"] * 10 + 5)
+            return get_search_response(get_hits(start, end - start))
+        self.client.search.side_effect = search
+
+    def test_slices_are_merged(self):
+        search = SlicedSearch(self.client, "index", self.query, slices=3, page_size=2, _source=False)
+        hits = [int(hit["_id"]) for hit in search]
+        self.assertListEqual(sorted(hits), [number + offset for number in (0, 10, 20) for offset in range(5)])
+        slices = {call.kwargs["slice"]["max"] for call in self.client.search.call_args_list}
+        self.assertSetEqual(slices, {3})
+        self.assertTrue(all(call.kwargs["pit"]["id"] == "pit" and call.kwargs["_source"] is False
+                            for call in self.client.search.call_args_list))
+        self.client.open_point_in_time.assert_called_once()
+        self.client.close_point_in_time.assert_called_once_with(id="pit")
+
+    def test_back_pressure(self):
+        search = SlicedSearch(self.client, "index", self.query, slices=2, page_size=1, max_pending_pages=1)
+        pages = search.pages()
+        next(pages)
+        pages.close()
+        # slices stop when consumer stops, only pages which fit in queue are fetched
+        self.assertLess(self.client.search.call_count, 10)
+        self.client.close_point_in_time.assert_called_once_with(id="pit")
+
+    def test_slice_error(self):
+        self.client.search.side_effect = Exception("timeout")
+        search = SlicedSearch(self.client, "index", self.query, slices=2)
+        self.assertRaises(ExecutionError, list, search)
+        self.client.close_point_in_time.assert_called_once_with(id="pit")
+
+    def test_one_slice(self):
+        self.client.search.side_effect = None
+        self.client.search.return_value = get_search_response(get_hits(0, 1))
+        self.assertEqual(len(list(SlicedSearch(self.client, "index", self.query, slices=1, page_size=2))), 1)
+        self.assertNotIn("slice", self.client.search.call_args.kwargs)
+
+    def test_write_ndjson(self):
+        output = io.StringIO()
+        search = SlicedSearch(self.client, "index", self.query, slices=2, page_size=2)
+        self.assertEqual(write_ndjson(search.pages(), output), 10)
+        self.assertEqual(len(output.getvalue().splitlines()), 10)
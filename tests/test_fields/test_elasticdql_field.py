@@ -26,3 +26,20 @@ class FieldTestCase(TestCase):
         field_type = int
         field = ElasticDjangoQlField(field_name, field_type=field_type)
         self.assertRaises(ValueError, field.format_value, "asdasdasd")
+
+    def test_field_type_class_attribute(self):
+        with self.assertWarns(DeprecationWarning):
+            class OldStyleField(ElasticDjangoQlField):
+                field_type = str
+
+        with self.assertWarns(DeprecationWarning):
+            class OldStyleSlotsField(ElasticDjangoQlField):
+                __slots__ = ()
+                field_type = str
+
+        for field_cls in (OldStyleField, OldStyleSlotsField):
+            field = field_cls(generate_random_string())
+            self.assertIs(field.field_type, str)
+            self.assertEqual(field.format_value(1), "1")
+            self.assertEqual(field.get_lookup([], "=", 1), ({"match": {field.name: "1"}}, False))
+            self.assertIs(field_cls(generate_random_string(), field_type=int).field_type, int)
@@ -0,0 +1,48 @@
+import sys
+from unittest import TestCase
+
+from elastic_dql.field import FieldMapper, KeywordField, TextType, LongField, FieldRegistry
+
+
+class FieldMapperTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.mapper = FieldMapper()
+
+    def test_fields_order(self):
+        fields = self.mapper.get_properties({"properties": {
+            "name": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+            "user": {"properties": {"age": {"type": "long"}, "id": {"type": "keyword"}}},
+            "status": {"type": "keyword"},
+        }})
+        self.assertListEqual([field.name for field in fields], ["name", "name.keyword", "user.age", "user.id", "status"])
+        self.assertListEqual([type(field) for field in fields], [TextType, KeywordField, LongField, KeywordField,
+                                                                 KeywordField])
+        self.assertIs(fields[1].parent, fields[0])
+        self.assertEqual(fields[0].subfields, (fields[1],))
+
+    def test_deep_mapping(self):
+        mapping = {"type": "keyword"}
+        for _ in range(2000):
+            mapping = {"properties": {"a": mapping}}
+        fields = self.mapper.get_properties(mapping)
+        self.assertEqual(fields[0].name, ".".join(["a"] * 2000))
+
+    def test_names_are_interned(self):
+        fields = self.mapper.get_properties({"properties": {"status": {"type": "keyword"}}})
+        self.assertIs(fields[0].name, sys.intern("".join(["sta", "tus"])))
+
+    def test_fields_have_no_dict(self):
+        fields = self.mapper.get_properties({"properties": {"status": {"type": "keyword"}, "name": {"type": "text"}}})
+        for field in fields:
+            self.assertFalse(hasattr(field, "__dict__"))
+
+
+class FieldRegistryTestCase(TestCase):
+
+    def test_get(self):
+        field = KeywordField("status")
+        registry = FieldRegistry([field])
+        self.assertIs(registry.get("status"), field)
+        self.assertIsNone(registry.get("invalid"))
+        self.assertEqual(len(registry), 1)
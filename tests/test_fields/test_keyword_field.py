@@ -0,0 +1,17 @@
+from unittest import TestCase
+
+from elastic_dql.field import KeywordField
+
+
+class KeywordFieldTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.field = KeywordField("status")
+
+    def test_equals_lookup(self):
+        self.assertEqual(self.field.get_lookup([], "=", "active"), ({"term": {"status": "active"}}, False))
+        self.assertEqual(self.field.get_lookup([], "!=", "active"), ({"term": {"status": "active"}}, True))
+
+    def test_in_lookup(self):
+        self.assertEqual(self.field.get_lookup([], "in", ["a", "b"]), ({"terms": {"status": ["a", "b"]}}, False))
+        self.assertEqual(self.field.get_lookup([], "not in", ["a"]), ({"terms": {"status": ["a"]}}, True))
@@ -0,0 +1,18 @@
+from unittest import TestCase
+
+from elastic_dql.field import LongField
+
+
+class LongFieldTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.field = LongField("age")
+
+    def test_equals_lookup(self):
+        self.assertEqual(self.field.get_lookup([], "=", 10), ({"term": {"age": 10}}, False))
+
+    def test_in_lookup(self):
+        self.assertEqual(self.field.get_lookup([], "in", [1, 2.0]), ({"terms": {"age": [1, 2]}}, False))
+
+    def test_range_lookup(self):
+        self.assertEqual(self.field.get_lookup([], ">", 10), ({"range": {"age": {"gt": 10}}}, False))
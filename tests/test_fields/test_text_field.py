@@ -0,0 +1,16 @@
+from unittest import TestCase
+
+from elastic_dql.field import TextType
+
+
+class TextFieldTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.field = TextType("name")
+
+    def test_equals_lookup(self):
+        self.assertEqual(self.field.get_lookup([], "=", "x"), ({"match": {"name": "x"}}, False))
+
+    def test_in_lookup(self):
+        query, inverted = self.field.get_lookup([], "in", ["a b"])
+        self.assertDictEqual(query, {"bool": {"minimum_should_match": 1, "should": [{"match_phrase": {"name": "a b"}}]}})
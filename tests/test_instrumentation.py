@@ -0,0 +1,132 @@
+import sys
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from elastic_dql.cache import LRUCache
+from elastic_dql.exceptions import ConfigError
+from elastic_dql.instrumentation import (CallbackSink, LoggingSink, NULL_STAGE, OpenTelemetrySink, PrometheusSink,
+                                         Sink, configure_instrumentation, create_sink, instrumentation)
+from elastic_dql.query import generate_query, get_cached_query
+from .utils import get_schema_instance
+
+
+PROPERTIES = {
+    "age": {"type": "long"},
+    "status": {"type": "keyword"},
+    "instrumented": {"type": "boolean"},
+}
+
+
+class InstrumentationTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.events = []
+        self.sink = CallbackSink(lambda kind, name, value, tags: self.events.append((kind, name, tags)))
+        instrumentation.add_sink(self.sink)
+
+    def tearDown(self) -> None:
+        instrumentation.set_sinks(())
+
+    def test_disabled_stage(self):
+        instrumentation.set_sinks(())
+        self.assertIs(instrumentation.stage("parse"), NULL_STAGE)
+        self.assertFalse(instrumentation.enabled)
+
+    def test_query_stages(self):
+        schema_instance = get_schema_instance(PROPERTIES)
+        generate_query("age > 10 and status = \"a\"", schema_instance)
+        stages = [name for kind, name, tags in self.events if kind == "stage"]
+        self.assertListEqual(stages, ["parse", "get_mapping", "compile_mappings", "resolve_name", "resolve_name",
+                                      "build_query", "optimize_query"])
+        self.assertIn(("stage", "get_mapping", {"index": "index"}), self.events)
+
+    def test_query_cache_counters(self):
+        schema_instance = get_schema_instance(PROPERTIES)
+        query_cache = LRUCache(10)
+        get_cached_query("index", "age > 10", schema_instance, query_cache)
+        get_cached_query("index", "age > 10", schema_instance, query_cache)
+        counters = [name for kind, name, tags in self.events if kind == "count"]
+        self.assertListEqual([name for name in counters if name.startswith("query_cache")],
+                             ["query_cache.miss", "query_cache.hit"])
+
+    def test_failed_stage(self):
+        sink = Mock(spec=Sink)
+        instrumentation.set_sinks([sink])
+        with self.assertRaises(ValueError):
+            with instrumentation.stage("parse"):
+                raise ValueError("invalid")
+        name, duration, tags, state, error = sink.stage_finished.call_args.args
+        self.assertEqual(name, "parse")
+        self.assertIsInstance(error, ValueError)
+
+    def test_broken_sink(self):
+        sink = Mock(spec=Sink)
+        sink.stage_finished.side_effect = Exception("broken")
+        instrumentation.add_sink(sink)
+        with self.assertLogs("elastic_dql.instrumentation", "ERROR"):
+            with instrumentation.stage("parse"):
+                pass
+        self.assertEqual(self.events, [("stage", "parse", None)])
+
+    def test_logging_sink(self):
+        instrumentation.set_sinks([LoggingSink(level="INFO")])
+        with self.assertLogs("elastic_dql.instrumentation", "INFO") as logs:
+            with instrumentation.stage("get_mapping", {"index": "index"}):
+                pass
+            instrumentation.count("query_cache.hit")
+        self.assertIn("get_mapping took", logs.output[0])
+        self.assertIn("query_cache.hit +1", logs.output[1])
+
+
+class ConfigureInstrumentationTestCase(TestCase):
+
+    def tearDown(self) -> None:
+        instrumentation.set_sinks(())
+
+    def test_configure(self):
+        configure_instrumentation(["elastic_dql.instrumentation.LoggingSink",
+                                   {"backend": "elastic_dql.instrumentation.LoggingSink", "level": "INFO"}])
+        self.assertEqual(len(instrumentation.sinks), 2)
+        self.assertEqual(instrumentation.sinks[1].level, 20)
+        configure_instrumentation([])
+        self.assertFalse(instrumentation.enabled)
+
+    def test_invalid_sink(self):
+        self.assertRaises(ConfigError, create_sink, "elastic_dql.instrumentation.MissingSink")
+        self.assertRaises(ConfigError, create_sink, {"level": "INFO"})
+
+    def test_missing_optional_dependency(self):
+        with patch.dict(sys.modules, {"prometheus_client": None, "opentelemetry": None}):
+            self.assertRaises(ConfigError, PrometheusSink)
+            self.assertRaises(ConfigError, OpenTelemetrySink)
+
+
+class PrometheusSinkTestCase(TestCase):
+
+    def test_metrics(self):
+        prometheus_client = Mock()
+        with patch.dict(sys.modules, {"prometheus_client": prometheus_client}):
+            sink = PrometheusSink(prefix="app")
+        histogram_name = prometheus_client.Histogram.call_args.args[0]
+        self.assertEqual(histogram_name, "app_stage_duration_seconds")
+        sink.stage_finished("parse", 0.5, None, None)
+        sink.durations.labels.assert_called_once_with("parse")
+        sink.durations.labels.return_value.observe.assert_called_once_with(0.5)
+        sink.count("query_cache.hit", 1, None)
+        sink.counters.labels.assert_called_with("query_cache.hit")
+
+
+class OpenTelemetrySinkTestCase(TestCase):
+
+    def test_spans(self):
+        opentelemetry = Mock()
+        with patch.dict(sys.modules, {"opentelemetry": opentelemetry}):
+            tracer = Mock()
+            sink = OpenTelemetrySink(tracer=tracer)
+        state = sink.stage_started("get_mapping", {"index": "index"})
+        tracer.start_span.assert_called_once_with("get_mapping", attributes={"index": "index"})
+        span = tracer.start_span.return_value
+        sink.stage_finished("get_mapping", 0.1, {"index": "index"}, state, ValueError("failed"))
+        opentelemetry.context.detach.assert_called_once_with(opentelemetry.context.attach.return_value)
+        span.record_exception.assert_called_once()
+        span.end.assert_called_once_with()
@@ -0,0 +1,67 @@
+from unittest import TestCase
+
+from elastic_dql.mappings import merge_mappings, get_merged_mappings, merged_mappings_cache
+
+
+def get_mappings(properties):
+    return {"properties": properties}
+
+
+class MergeMappingsTestCase(TestCase):
+
+    def test_fields_are_merged(self):
+        merged, conflicts = merge_mappings([
+            get_mappings({"name": {"type": "text", "fields": {"keyword": {"type": "keyword"}}}}),
+            get_mappings({"name": {"type": "text", "fields": {"raw": {"type": "keyword"}}},
+                          "user": {"properties": {"id": {"type": "long"}}}}),
+        ])
+        self.assertDictEqual(merged, get_mappings({
+            "name": {"type": "text", "fields": {"keyword": {"type": "keyword"}, "raw": {"type": "keyword"}}},
+            "user": {"properties": {"id": {"type": "long"}}},
+        }))
+        self.assertDictEqual(conflicts, {})
+
+    def test_conflicts_are_removed(self):
+        merged, conflicts = merge_mappings([
+            get_mappings({"age": {"type": "long"}, "user": {"properties": {"id": {"type": "long"}}}}),
+            get_mappings({"age": {"type": "keyword"}, "user": {"properties": {"id": {"type": "keyword"}}}}),
+            get_mappings({"age": {"type": "text"}, "status": {"type": "keyword"}}),
+        ])
+        self.assertDictEqual(merged, get_mappings({"user": {"properties": {}}, "status": {"type": "keyword"}}))
+        self.assertDictEqual(conflicts, {"age": ["keyword", "long", "text"], "user.id": ["keyword", "long"]})
+
+    def test_object_and_field_conflict(self):
+        merged, conflicts = merge_mappings([
+            get_mappings({"user": {"properties": {"id": {"type": "long"}}}}),
+            get_mappings({"user": {"type": "keyword"}}),
+        ])
+        self.assertDictEqual(conflicts, {"user": ["keyword", "object"]})
+
+    def test_input_is_not_changed(self):
+        first = get_mappings({"name": {"type": "text"}})
+        merge_mappings([first, get_mappings({"age": {"type": "long"}})])
+        self.assertDictEqual(first, get_mappings({"name": {"type": "text"}}))
+
+
+class GetMergedMappingsTestCase(TestCase):
+
+    def setUp(self) -> None:
+        merged_mappings_cache.clear()
+
+    def test_single_index(self):
+        mappings = get_mappings({"name": {"type": "text"}})
+        self.assertEqual(get_merged_mappings({"index": {"mappings": mappings}}), (mappings, {}))
+
+    def test_same_backing_mappings(self):
+        result = {"logs-%s" % day: {"mappings": get_mappings({"name": {"type": "text"}})} for day in range(30)}
+        self.assertEqual(get_merged_mappings(result), (get_mappings({"name": {"type": "text"}}), {}))
+        self.assertEqual(len(merged_mappings_cache), 0)
+
+    def test_merged_mappings_are_cached(self):
+        result = {"logs-1": {"mappings": get_mappings({"name": {"type": "text"}})},
+                  "logs-2": {"mappings": get_mappings({"age": {"type": "long"}})},
+                  "logs-3": {"mappings": get_mappings({"age": {"type": "long"}})}}
+        merged = get_merged_mappings(result)
+        self.assertIs(get_merged_mappings(result), merged)
+        self.assertEqual(merged_mappings_cache.stats()["hits"], 1)
+        self.assertSetEqual(set(merged[0]["properties"]), {"name", "age"})
@@ -0,0 +1,43 @@
+import threading
+from unittest import TestCase
+from unittest.mock import patch
+
+from djangoql.ast import Expression
+from djangoql.exceptions import DjangoQLParserError
+from djangoql.parser import DjangoQLParser
+
+from elastic_dql.parser import ParserProvider
+
+
+class ParserProviderTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.parser_provider = ParserProvider()
+
+    def test_parse(self):
+        ast = self.parser_provider.parse('name = "value" and age > 10')
+        self.assertIsInstance(ast, Expression)
+        self.assertEqual(ast.operator.operator, "and")
+
+    def test_syntax_error(self):
+        self.assertRaises(DjangoQLParserError, self.parser_provider.parse, 'name = ')
+        self.assertIsInstance(self.parser_provider.parse('name = "value"'), Expression)
+
+    def test_parser_is_reused_in_thread(self):
+        self.assertIs(self.parser_provider.get_parser(), self.parser_provider.get_parser())
+
+    def test_parser_per_thread(self):
+        parsers = []
+        thread = threading.Thread(target=lambda: parsers.append(self.parser_provider.get_parser()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(parsers[0], self.parser_provider.get_parser())
+        self.assertIsNot(parsers[0].default_lexer, self.parser_provider.get_parser().default_lexer)
+
+    def test_tables_are_built_once(self):
+        with patch.object(self.parser_provider, "parser_cls", wraps=DjangoQLParser) as parser_cls:
+            self.parser_provider.warm_up()
+            thread = threading.Thread(target=self.parser_provider.parse, args=('name = "value"',))
+            thread.start()
+            thread.join()
+        self.assertEqual(parser_cls.call_count, 1)
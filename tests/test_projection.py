@@ -0,0 +1,57 @@
+from unittest import TestCase
+from unittest.mock import Mock
+
+from elastic_dql.exceptions import SchemaError
+from elastic_dql.projection import build_projection
+from elastic_dql.schema import ElasticDjangoQlSchema
+
+
+class ProjectionTestCase(TestCase):
+
+    def setUp(self) -> None:
+        client = Mock()
+        client.indices.get_mapping.return_value = {"index": {"mappings": {"properties": {
+            "title": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+            "views": {"type": "long", "store": True},
+            "status": {"type": "keyword", "doc_values": False},
+            "published_at": {"type": "date"},
+            "author": {"properties": {"name": {"type": "keyword"}, "email": {"type": "keyword"}}},
+        }}}}
+        self.schema_instance = ElasticDjangoQlSchema(client, "index")
+
+    def test_source(self):
+        self.assertDictEqual(build_projection(self.schema_instance, ["title", "author.name"]),
+                             {"_source": {"includes": ["title", "author.name"]}})
+
+    def test_subfield_source(self):
+        self.assertDictEqual(build_projection(self.schema_instance, ["title.keyword", "title"]),
+                             {"_source": {"includes": ["title"]}})
+
+    def test_object_source(self):
+        self.assertDictEqual(build_projection(self.schema_instance, ["author"], exclude=["author.email"]),
+                             {"_source": {"includes": ["author"], "excludes": ["author.email"]}})
+
+    def test_invalid_fields(self):
+        self.assertRaises(SchemaError, build_projection, self.schema_instance, ["missing"])
+        self.assertRaises(SchemaError, build_projection, self.schema_instance, ["auth"])
+        self.assertRaises(SchemaError, build_projection, self.schema_instance, exclude=["title.keyword"])
+        self.assertRaises(SchemaError, build_projection, self.schema_instance, ["title"], mode="invalid")
+
+    def test_docvalues(self):
+        self.assertDictEqual(build_projection(self.schema_instance, ["views", "title.keyword"], mode="docvalues"),
+                             {"_source": False, "docvalue_fields": ["views", "title.keyword"]})
+        self.assertRaises(SchemaError, build_projection, self.schema_instance, ["title"], mode="docvalues")
+        self.assertRaises(SchemaError, build_projection, self.schema_instance, ["status"], mode="docvalues")
+        self.assertRaises(SchemaError, build_projection, self.schema_instance, ["views"], exclude=["title"],
+                          mode="docvalues")
+
+    def test_stored(self):
+        self.assertDictEqual(build_projection(self.schema_instance, ["views"], mode="stored"),
+                             {"_source": False, "stored_fields": ["views"]})
+        self.assertRaises(SchemaError, build_projection, self.schema_instance, ["published_at"], mode="stored")
+
+    def test_auto(self):
+        self.assertDictEqual(build_projection(self.schema_instance, ["views", "published_at"], mode="auto"),
+                             {"_source": False, "docvalue_fields": ["views", "published_at"]})
+        self.assertDictEqual(build_projection(self.schema_instance, ["views", "title"], mode="auto"),
+                             {"_source": {"includes": ["views", "title"]}})
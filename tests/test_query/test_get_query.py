@@ -0,0 +1,103 @@
+from unittest import TestCase
+from unittest.mock import patch, Mock
+
+from elastic_dql.cache import LRUCache
+from elastic_dql.field import LongField
+from elastic_dql.query import get_query, get_queries
+
+
+class GetQueryTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.schema_instance = Mock()
+        self.schema_instance.resolve_name.return_value = LongField("age")
+        self.schema_instance.get_mapping_version.return_value = "version"
+        self.schema_patcher = patch("elastic_dql.query.get_schema_instance", return_value=self.schema_instance)
+        self.schema_patcher.start()
+        self.query_cache = LRUCache(10)
+        self.cache_patcher = patch("elastic_dql.query.get_query_cache", return_value=self.query_cache)
+        self.cache_patcher.start()
+
+    def tearDown(self) -> None:
+        self.schema_patcher.stop()
+        self.cache_patcher.stop()
+
+    def test_cached_query_is_same(self):
+        query = get_query("index", "age = 10")
+        self.assertEqual(get_query("index", "age = 10"), query)
+        self.assertEqual(self.query_cache.stats()["hits"], 1)
+        self.assertEqual(self.schema_instance.resolve_name.call_count, 1)
+
+    def test_cached_query_can_not_be_changed(self):
+        query = get_query("index", "age = 10")
+        query["query"]["bool"]["filter"].append({"match_all": {}})
+        self.assertNotEqual(get_query("index", "age = 10"), query)
+
+    def test_mapping_version_is_part_of_key(self):
+        get_query("index", "age = 10")
+        self.schema_instance.get_mapping_version.return_value = "new_version"
+        get_query("index", "age = 10")
+        self.assertEqual(self.query_cache.stats()["misses"], 2)
+
+    def test_projection(self):
+        query = get_query("index", "age = 10", fields=["age"])
+        self.assertDictEqual(query["_source"], {"includes": ["age"]})
+        self.assertNotIn("_source", get_query("index", "age = 10"))
+
+    def test_track_total_hits(self):
+        self.assertFalse(get_query("index", "age = 10", track_total_hits=False)["track_total_hits"])
+        self.assertNotIn("track_total_hits", get_query("index", "age = 10"))
+
+    def test_disabled_cache(self):
+        with patch("elastic_dql.query.get_query_cache", return_value=None):
+            get_query("index", "age = 10")
+            get_query("index", "age = 10")
+        self.assertEqual(self.schema_instance.resolve_name.call_count, 2)
+
+
+class GetQueriesTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.schema_instance = Mock()
+        self.schema_instance.resolve_name.return_value = LongField("age")
+        self.schema_instance.get_mapping_version.return_value = "version"
+        self.schema_patcher = patch("elastic_dql.query.get_schema_instance", return_value=self.schema_instance)
+        self.get_schema_instance = self.schema_patcher.start()
+        self.cache_patcher = patch("elastic_dql.query.get_query_cache", return_value=LRUCache(10))
+        self.cache_patcher.start()
+
+    def tearDown(self) -> None:
+        self.schema_patcher.stop()
+        self.cache_patcher.stop()
+
+    def test_results_are_in_order(self):
+        results = get_queries("index", ["age = 1", "age = 2"])
+        self.assertListEqual([result.search for result in results], ["age = 1", "age = 2"])
+        self.assertListEqual([result.query for result in results],
+                             [get_query("index", "age = 1"), get_query("index", "age = 2")])
+        self.assertEqual(self.get_schema_instance.call_count, 3)
+
+    def test_duplicate_searches_are_generated_once(self):
+        results = get_queries("index", ["age = 1", "age = 1"])
+        self.assertEqual(self.schema_instance.resolve_name.call_count, 1)
+        self.assertEqual(results[0].query, results[1].query)
+        self.assertIsNot(results[0].query, results[1].query)
+
+    def test_errors_are_reported_per_item(self):
+        results = get_queries("index", ["age = ", "age = 1"])
+        self.assertFalse(results[0].ok)
+        self.assertIsNone(results[0].query)
+        self.assertTrue(results[1].ok)
+
+    def test_none_value_is_reported_per_item(self):
+        results = get_queries("index", ["age = 1", "age = None"])
+        self.assertTrue(results[0].ok)
+        self.assertFalse(results[1].ok)
+        self.assertIsInstance(results[1].error, TypeError)
+
+    def test_without_cache(self):
+        with patch("elastic_dql.query.get_query_cache", return_value=None):
+            results = get_queries("index", ["age = 1", "age = 1", "age ~ 1"])
+        self.assertTrue(results[0].ok)
+        self.assertEqual(results[0].query, results[1].query)
+        self.assertFalse(results[2].ok)
@@ -0,0 +1,138 @@
+from unittest import TestCase
+
+from elastic_dql.optimizer import optimize_query
+from elastic_dql.query import generate_query, finalize_query
+from ..utils import get_schema_instance
+
+
+PROPERTIES = {
+    "age": {"type": "long"},
+    "status": {"type": "keyword"},
+    "name": {"type": "text"},
+    "code": {"type": "keyword", "normalizer": "lowercase"},
+}
+
+
+def filter_bool(*clauses):
+    return {"bool": {"filter": list(clauses)}}
+
+
+def should_bool(*clauses):
+    return {"bool": {"minimum_should_match": 1, "should": list(clauses)}}
+
+
+def must_not_bool(*clauses):
+    return {"bool": {"must_not": list(clauses)}}
+
+
+class OptimizeQueryTestCase(TestCase):
+
+    def test_single_clause_is_unwrapped(self):
+        self.assertDictEqual(optimize_query(filter_bool({"match": {"name": "x"}})), {"match": {"name": "x"}})
+
+    def test_and_is_flattened(self):
+        query = filter_bool(filter_bool({"match": {"name": "x"}}),
+                            filter_bool(filter_bool({"exists": {"field": "a"}}), must_not_bool({"match": {"name": "y"}})))
+        self.assertDictEqual(optimize_query(query), {"bool": {
+            "filter": [{"match": {"name": "x"}}, {"exists": {"field": "a"}}],
+            "must_not": [{"match": {"name": "y"}}],
+        }})
+
+    def test_or_is_flattened(self):
+        query = should_bool(should_bool({"match": {"name": "x"}}, {"match": {"name": "y"}}), {"match": {"name": "z"}})
+        self.assertDictEqual(optimize_query(query), should_bool(
+            {"match": {"name": "x"}}, {"match": {"name": "y"}}, {"match": {"name": "z"}}))
+
+    def test_or_inside_and_is_kept(self):
+        query = filter_bool({"exists": {"field": "a"}}, should_bool({"match": {"name": "x"}}, {"exists": {"field": "b"}}))
+        self.assertDictEqual(optimize_query(query), query)
+
+    def test_not_or_is_flattened(self):
+        query = must_not_bool(should_bool({"match": {"name": "x"}}, {"exists": {"field": "a"}}))
+        self.assertDictEqual(optimize_query(query), must_not_bool({"match": {"name": "x"}}, {"exists": {"field": "a"}}))
+
+    def test_ranges_of_single_valued_fields_are_merged(self):
+        query = filter_bool(filter_bool({"range": {"age": {"gte": 10}}}), filter_bool({"range": {"age": {"lt": 20}}}))
+        self.assertDictEqual(optimize_query(query, get_schema_instance(PROPERTIES, single_valued_fields=["age"])),
+                             {"range": {"age": {"gte": 10, "lt": 20}}})
+
+    def test_ranges_of_multi_valued_fields_are_not_merged(self):
+        # one range of age > 10 and age < 20 wouldn't match age [5, 25]
+        query = filter_bool({"range": {"age": {"gt": 10}}}, {"range": {"age": {"lt": 20}}})
+        self.assertDictEqual(optimize_query(query), query)
+        self.assertDictEqual(optimize_query(query, get_schema_instance(PROPERTIES)), query)
+
+    def test_same_bound_ranges_are_not_merged(self):
+        query = filter_bool({"range": {"age": {"gt": 10}}}, {"range": {"age": {"gte": 20}}})
+        schema_instance = get_schema_instance(PROPERTIES, single_valued_fields=["age"])
+        self.assertDictEqual(optimize_query(query, schema_instance), query)
+
+    def test_or_ranges_are_not_merged(self):
+        query = should_bool({"range": {"age": {"gt": 10}}}, {"range": {"age": {"lt": 5}}})
+        self.assertDictEqual(optimize_query(query), query)
+
+    def test_input_is_not_changed(self):
+        query = filter_bool({"range": {"age": {"gte": 10}}}, {"range": {"age": {"lt": 20}}})
+        optimize_query(query, get_schema_instance(PROPERTIES, single_valued_fields=["age"]))
+        self.assertDictEqual(query, filter_bool({"range": {"age": {"gte": 10}}}, {"range": {"age": {"lt": 20}}}))
+
+    def test_or_terms_are_merged(self):
+        query = should_bool({"term": {"age": 1}}, {"term": {"age": {"value": 2}}}, {"terms": {"age": [2, 3]}})
+        self.assertDictEqual(optimize_query(query), {"terms": {"age": [1, 2, 3]}})
+
+    def test_not_terms_are_merged(self):
+        query = filter_bool(must_not_bool({"term": {"age": 1}}), must_not_bool({"term": {"age": 2}}))
+        self.assertDictEqual(optimize_query(query), must_not_bool({"terms": {"age": [1, 2]}}))
+
+    def test_and_terms_are_not_merged(self):
+        query = filter_bool({"term": {"age": 1}}, {"term": {"age": 2}})
+        self.assertDictEqual(optimize_query(query), query)
+
+    def test_duplicates_are_removed(self):
+        query = filter_bool({"match": {"name": "x"}}, filter_bool({"match": {"name": "x"}}))
+        self.assertDictEqual(optimize_query(query), {"match": {"name": "x"}})
+
+    def test_nested_bools_are_not_deduped(self):
+        clause = should_bool({"match": {"name": "x"}}, {"match": {"name": "y"}})
+        query = filter_bool(clause, clause, {"match": {"status": "a"}}, {"match": {"status": "a"}})
+        self.assertDictEqual(optimize_query(query), filter_bool(clause, clause, {"match": {"status": "a"}}))
+
+    def test_bool_with_options_is_kept(self):
+        query = filter_bool({"bool": {"filter": [{"match": {"name": "x"}}], "boost": 2}})
+        self.assertDictEqual(optimize_query(query), {"bool": {"filter": [{"match": {"name": "x"}}], "boost": 2}})
+
+
+class OptimizeGeneratedQueryTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.schema_instance = get_schema_instance(PROPERTIES)
+
+    def test_keyword_terms_are_merged(self):
+        query = generate_query('status = "a" or status = "b" or status in ("c", "a")', self.schema_instance)
+        self.assertDictEqual(query, {"query": {"bool": {"filter": [{"terms": {"status": ["a", "b", "c"]}}]}}})
+
+    def test_text_matches_are_not_merged(self):
+        query = generate_query('name = "a" or name = "b"', self.schema_instance)
+        self.assertDictEqual(query, {"query": {"bool": {"filter": [should_bool(
+            {"match": {"name": "a"}}, {"match": {"name": "b"}})]}}})
+
+    def test_keyword_matches_with_normalizer_are_not_merged(self):
+        query = should_bool({"match": {"code": "A"}}, {"match": {"code": "b"}})
+        self.assertDictEqual(optimize_query(query, self.schema_instance), query)
+        query = should_bool({"match": {"status": "a"}}, {"match": {"status": "b"}})
+        self.assertDictEqual(optimize_query(query, self.schema_instance), {"terms": {"status": ["a", "b"]}})
+
+    def test_flat_query(self):
+        query = generate_query('age >= 10 and age < 20 and name != "x" and status = "a"',
+                               get_schema_instance(PROPERTIES, single_valued_fields=["age"]))
+        self.assertDictEqual(query, {"query": {"bool": {
+            "filter": [{"range": {"age": {"gte": 10, "lt": 20}}}, {"term": {"status": "a"}}],
+            "must_not": [{"match": {"name": "x"}}],
+        }}})
+        query = generate_query('age >= 10 and age < 20', self.schema_instance)
+        self.assertDictEqual(query, {"query": {"bool": {
+            "filter": [{"range": {"age": {"gte": 10}}}, {"range": {"age": {"lt": 20}}}]}}})
+
+    def test_finalize_not_query(self):
+        self.assertDictEqual(finalize_query(must_not_bool({"match": {"name": "x"}}), True),
+                             {"query": must_not_bool({"match": {"name": "x"}})})
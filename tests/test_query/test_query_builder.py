@@ -0,0 +1,166 @@
+from unittest import TestCase
+from unittest.mock import Mock
+
+from elastic_dql.exceptions import FieldError
+from elastic_dql.field import KeywordField, LongField, TextType, FloatField, BoolField, DateField
+from elastic_dql.query_generator import QueryBuilderRegistry, EqualsQuery, InQuery, TermQuery, TermsQuery, \
+    NotTermsQuery, GtQuery, StartsWithQuery, MatchPhrasePrefixQuery, NgramContainsQuery, NotNgramContainsQuery, \
+    query_builder_registry
+from elastic_dql.schema import ElasticDjangoQlSchema
+
+
+class QueryBuilderRegistryTestCase(TestCase):
+
+    def test_default_builder(self):
+        self.assertIsInstance(query_builder_registry.get_query_builder(TextType("name"), "="), EqualsQuery)
+        self.assertIsInstance(query_builder_registry.get_query_builder(TextType("name"), "in"), InQuery)
+        self.assertIsInstance(query_builder_registry.get_query_builder(LongField("age"), ">"), GtQuery)
+
+    def test_exact_field_builder(self):
+        for field_cls in (KeywordField, LongField, FloatField, BoolField, DateField):
+            field = field_cls("field")
+            self.assertIsInstance(query_builder_registry.get_query_builder(field, "="), TermQuery)
+            self.assertIsInstance(query_builder_registry.get_query_builder(field, "in"), TermsQuery)
+            self.assertIsInstance(query_builder_registry.get_query_builder(field, "not in"), NotTermsQuery)
+
+    def test_builders_are_shared(self):
+        self.assertIs(KeywordField("a").get_query_builder("="), LongField("b").get_query_builder("="))
+
+    def test_nearest_class_builder(self):
+        registry = QueryBuilderRegistry()
+        registry.register(object, "startswith", StartsWithQuery())
+        registry.register(TextType, "startswith", MatchPhrasePrefixQuery())
+        self.assertIsInstance(registry.get_query_builder(TextType("name"), "startswith"), MatchPhrasePrefixQuery)
+        self.assertIsInstance(registry.get_query_builder(KeywordField("name"), "startswith"), StartsWithQuery)
+        self.assertIsNone(registry.get_query_builder(KeywordField("name"), "="))
+
+    def test_conditional_builder(self):
+        registry = QueryBuilderRegistry()
+        registry.register(object, "startswith", StartsWithQuery())
+        registry.register(TextType, "startswith", MatchPhrasePrefixQuery(),
+                          condition=lambda field: "index_prefixes" not in field.mapping)
+        field = TextType("name", mapping={"type": "text", "index_prefixes": {}})
+        self.assertIsInstance(registry.get_query_builder(field, "startswith"), StartsWithQuery)
+        self.assertIsInstance(registry.get_query_builder(TextType("name"), "startswith"), MatchPhrasePrefixQuery)
+
+
+class IndexQueryBuildersTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.client = Mock()
+        self.client.indices.get_mapping.return_value = {"index": {"mappings": {"properties": {
+            "name": {"type": "text"},
+            "title": {"type": "text"},
+        }}}}
+
+    def test_field_class_override(self):
+        schema = ElasticDjangoQlSchema(self.client, "index", query_builders={
+            TextType: {"startswith": MatchPhrasePrefixQuery()}})
+        self.assertEqual(schema.resolve_name("name").get_lookup([], "startswith", "ab"),
+                         ({"match_phrase_prefix": {"name": "ab"}}, False))
+
+    def test_field_name_override(self):
+        schema = ElasticDjangoQlSchema(self.client, "index", query_builders={
+            "title": {"startswith": MatchPhrasePrefixQuery()}})
+        self.assertEqual(schema.resolve_name("title").get_lookup([], "startswith", "ab"),
+                         ({"match_phrase_prefix": {"title": "ab"}}, False))
+        self.assertEqual(schema.resolve_name("name").get_lookup([], "startswith", "ab"),
+                         ({"prefix": {"name": {"value": "ab"}}}, False))
+
+
+class TermQueryTestCase(TestCase):
+
+    def test_term(self):
+        self.assertEqual(TermQuery().generate("status", "active"), ({"term": {"status": "active"}}, False))
+
+    def test_terms(self):
+        ids = list(range(5000))
+        query, inverted = TermsQuery().generate("id", ids + [1, 2])
+        self.assertDictEqual(query, {"terms": {"id": ids}})
+        self.assertFalse(inverted)
+
+    def test_not_terms(self):
+        self.assertEqual(NotTermsQuery().generate("id", [1]), ({"terms": {"id": [1]}}, True))
+
+
+class MappingRewritesTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.client = Mock()
+        self.client.indices.get_mapping.return_value = {"index": {"mappings": {"properties": {
+            "code": {"type": "wildcard"},
+            "name": {"type": "keyword"},
+            "title": {"type": "text", "fields": {
+                "keyword": {"type": "keyword"},
+                "ngram": {"type": "text", "analyzer": "ngram_analyzer"},
+                "prefix": {"type": "text", "analyzer": "edge_ngram_analyzer"},
+                "reverse": {"type": "text", "analyzer": "reverse_analyzer"},
+            }},
+            "body": {"type": "text", "fields": {
+                "keyword": {"type": "keyword"},
+                "ngram": {"type": "text", "analyzer": "ngram_analyzer", "search_analyzer": "standard"},
+            }},
+        }}}}
+        self.ngram_builders = {"title.keyword": {"~": NgramContainsQuery(2, 4), "!~": NotNgramContainsQuery(2, 4)},
+                               "body.keyword": {"~": NgramContainsQuery(2, 4)}}
+
+    def get_lookup(self, field_name, operator, value, expensive_queries=None, query_builders=None):
+        schema = ElasticDjangoQlSchema(self.client, "index", expensive_queries=expensive_queries,
+                                       query_builders=query_builders)
+        return schema.resolve_name(field_name).get_lookup([], operator, value)
+
+    def test_wildcard_field(self):
+        self.assertEqual(self.get_lookup("code", "~", "ab", expensive_queries="deny"),
+                         ({"wildcard": {"code": {"value": "*ab*"}}}, False))
+        self.assertEqual(self.get_lookup("code", "not endswith", "ab", expensive_queries="deny"),
+                         ({"wildcard": {"code": {"value": "*ab"}}}, True))
+
+    def test_ngram_subfield(self):
+        expected_query = {"match": {"title.ngram": {"query": "abc", "operator": "and"}}}
+        self.assertEqual(self.get_lookup("title.keyword", "~", "abc", expensive_queries="deny",
+                                         query_builders=self.ngram_builders), (expected_query, False))
+        self.assertEqual(self.get_lookup("title.keyword", "!~", "abc", query_builders=self.ngram_builders),
+                         (expected_query, True))
+
+    def test_ngram_is_not_used_by_default(self):
+        self.assertEqual(self.get_lookup("title.keyword", "~", "abc"),
+                         ({"wildcard": {"title.keyword": {"value": "*abc*"}}}, False))
+
+    def test_values_out_of_ngram_bounds_fall_back_to_wildcard(self):
+        # a value shorter than min_gram has no ngrams, match of it would find nothing
+        self.assertEqual(self.get_lookup("title.keyword", "~", "a", query_builders=self.ngram_builders),
+                         ({"wildcard": {"title.keyword": {"value": "*a*"}}}, False))
+        self.assertEqual(self.get_lookup("title.keyword", "!~", "a", query_builders=self.ngram_builders),
+                         ({"wildcard": {"title.keyword": {"value": "*a*"}}}, True))
+        self.assertEqual(self.get_lookup("title.keyword", "~", "abcde", query_builders=self.ngram_builders),
+                         ({"wildcard": {"title.keyword": {"value": "*abcde*"}}}, False))
+        self.assertRaises(FieldError, self.get_lookup, "title.keyword", "~", "a", expensive_queries="deny",
+                          query_builders=self.ngram_builders)
+
+    def test_mixed_case_and_whitespace_values_fall_back_to_wildcard(self):
+        self.assertEqual(self.get_lookup("title.keyword", "~", "aBc", query_builders=self.ngram_builders),
+                         ({"wildcard": {"title.keyword": {"value": "*aBc*"}}}, False))
+        self.assertEqual(self.get_lookup("title.keyword", "~", "a b", query_builders=self.ngram_builders),
+                         ({"wildcard": {"title.keyword": {"value": "*a b*"}}}, False))
+
+    def test_ngram_field_with_other_search_analyzer_is_not_used(self):
+        self.assertEqual(self.get_lookup("body.keyword", "~", "abc", query_builders=self.ngram_builders),
+                         ({"wildcard": {"body.keyword": {"value": "*abc*"}}}, False))
+
+    def test_endswith_is_not_rewritten(self):
+        # reversed values on an analyzed field don't match mixed case or multi word values
+        self.assertEqual(self.get_lookup("title.keyword", "endswith", "Abc"),
+                         ({"wildcard": {"title.keyword": {"value": "*Abc"}}}, False))
+        self.assertRaises(FieldError, self.get_lookup, "title.keyword", "not endswith", "abc",
+                          expensive_queries="deny")
+
+    def test_full_scan_is_allowed(self):
+        self.assertEqual(self.get_lookup("name", "~", "ab"), ({"wildcard": {"name": {"value": "*ab*"}}}, False))
+
+    def test_full_scan_warning(self):
+        with self.assertLogs("elastic_dql.field", level="WARNING"):
+            self.get_lookup("name", "endswith", "ab", expensive_queries="warn")
+
+    def test_full_scan_is_denied(self):
+        self.assertRaises(FieldError, self.get_lookup, "name", "~", "ab", expensive_queries="deny")
+        self.assertRaises(FieldError, self.get_lookup, "name", "not endswith", "ab", expensive_queries="deny")
@@ -0,0 +1,73 @@
+from unittest import TestCase
+from unittest.mock import Mock
+
+from djangoql.exceptions import DjangoQLParserError
+
+from elastic_dql.exceptions import SchemaError
+from elastic_dql.execution import PointInTimeSearch
+from elastic_dql.query import generate_query
+from elastic_dql.sorting import split_search
+from ..utils import get_schema_instance
+
+
+PROPERTIES = {
+    "title": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+    "body": {"type": "text"},
+    "age": {"type": "long"},
+    "id": {"type": "keyword"},
+    "tag": {"type": "keyword", "doc_values": False},
+}
+
+
+class SplitSearchTestCase(TestCase):
+
+    def test_without_clauses(self):
+        self.assertTupleEqual(split_search('age > 10'), ('age > 10', [], None))
+
+    def test_order_by_and_limit(self):
+        self.assertTupleEqual(split_search('age > 10 order by age desc, title limit 20'),
+                              ('age > 10', [("age", "desc"), ("title", "asc")], 20))
+        self.assertTupleEqual(split_search('age > 10 limit 5'), ('age > 10', [], 5))
+        self.assertTupleEqual(split_search('order by age'), ('', [("age", "asc")], None))
+
+    def test_keywords_in_strings(self):
+        search = 'title = "order by age limit 5"'
+        self.assertTupleEqual(split_search(search), (search, [], None))
+        self.assertTupleEqual(split_search('title = "a \\" order by x" order by age'),
+                              ('title = "a \\" order by x"', [("age", "asc")], None))
+
+    def test_invalid_order_by(self):
+        self.assertRaises(DjangoQLParserError, split_search, 'age > 10 order by age sideways')
+        self.assertRaises(DjangoQLParserError, split_search, 'age > 10 order by limit 5')
+
+
+class SortQueryTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.schema_instance = get_schema_instance(PROPERTIES)
+
+    def test_sort_and_size(self):
+        query = generate_query('age > 10 order by age desc limit 20', self.schema_instance)
+        self.assertDictEqual(query, {"query": {"bool": {"filter": [{"range": {"age": {"gt": 10}}}]}},
+                                     "sort": [{"age": {"order": "desc"}}], "size": 20})
+
+    def test_text_field_is_sorted_by_keyword_subfield(self):
+        query = generate_query('order by title, title.keyword desc', self.schema_instance)
+        self.assertDictEqual(query, {"query": {"match_all": {}}, "sort": [{"title.keyword": {"order": "asc"}}]})
+
+    def test_unsortable_fields(self):
+        self.assertRaises(SchemaError, generate_query, 'order by body', self.schema_instance)
+        self.assertRaises(SchemaError, generate_query, 'order by tag', self.schema_instance)
+        self.assertRaises(SchemaError, generate_query, 'order by missing', self.schema_instance)
+
+    def test_tiebreaker(self):
+        schema_instance = get_schema_instance(PROPERTIES, sort_tiebreaker="id")
+        query = generate_query('age > 10 order by age', schema_instance)
+        self.assertListEqual(query["sort"], [{"age": {"order": "asc"}}, {"id": {"order": "asc"}}])
+
+    def test_point_in_time_sort(self):
+        query = generate_query('age > 10 order by age desc limit 5', self.schema_instance)
+        search = PointInTimeSearch(Mock(), "index", query)
+        self.assertListEqual(search.sort, [{"age": {"order": "desc"}}, {"_shard_doc": "asc"}])
+        self.assertEqual(search.max_hits, 5)
+        self.assertNotIn("size", search.request)
@@ -0,0 +1,98 @@
+from unittest import TestCase
+from unittest.mock import Mock
+
+from elastic_dql.exceptions import TemplateError, FieldError
+from elastic_dql.query import generate_query
+from elastic_dql.template import QueryTemplate, replace_parameters
+from ..utils import get_schema_instance
+
+
+PROPERTIES = {
+    "user_id": {"type": "long"},
+    "status": {"type": "keyword"},
+    "name": {"type": "text"},
+}
+
+
+class ReplaceParametersTestCase(TestCase):
+
+    def test_replace_parameter(self):
+        self.assertEqual(replace_parameters("user_id = $user_id"), 'user_id = "\x00user_id"')
+
+    def test_replace_in_parameter(self):
+        self.assertEqual(replace_parameters("status not in $statuses"), 'status not in ("\x01statuses")')
+
+    def test_replace_parameters_in_list(self):
+        self.assertEqual(replace_parameters("status in ($first, $second)"),
+                         'status in ("\x00first", "\x00second")')
+
+    def test_parameter_in_string_is_not_replaced(self):
+        self.assertEqual(replace_parameters('name = "$name"'), 'name = "$name"')
+
+
+class QueryTemplateTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.schema_instance = get_schema_instance(PROPERTIES)
+
+    def test_render_equals_get_query(self):
+        template = QueryTemplate('user_id = $user_id and (status in $statuses or name ~ "x")', self.schema_instance)
+        query = template.render(user_id=123, statuses=["active", "pending"])
+        expected_query = generate_query('user_id = 123 and (status in ("active", "pending") or name ~ "x")',
+                                        self.schema_instance)
+        self.assertDictEqual(query, expected_query)
+
+    def test_render_many_values(self):
+        template = QueryTemplate('user_id = $user_id', self.schema_instance)
+        self.assertDictEqual(template.render(user_id=1), generate_query('user_id = 1', self.schema_instance))
+        self.assertDictEqual(template.render(user_id=2), generate_query('user_id = 2', self.schema_instance))
+
+    def test_template_is_parsed_once(self):
+        template = QueryTemplate('user_id = $user_id and name = "x"', self.schema_instance)
+        self.schema_instance.resolve_name = Mock()
+        template.render(user_id=1)
+        self.schema_instance.resolve_name.assert_not_called()
+
+    def test_rendered_queries_are_not_shared(self):
+        template = QueryTemplate('user_id = $user_id and name = "x"', self.schema_instance)
+        query = template.render(user_id=1)
+        query["query"]["bool"]["filter"].clear()
+        self.assertDictEqual(template.render(user_id=1), generate_query('user_id = 1 and name = "x"',
+                                                                        self.schema_instance))
+
+    def test_parameters(self):
+        template = QueryTemplate('user_id = $user_id or user_id > $user_id or status = $status', self.schema_instance)
+        self.assertListEqual(template.parameters, ["user_id", "status"])
+
+    def test_missing_parameter(self):
+        template = QueryTemplate('user_id = $user_id', self.schema_instance)
+        self.assertRaises(TemplateError, template.render)
+
+    def test_invalid_value(self):
+        template = QueryTemplate('user_id = $user_id', self.schema_instance)
+        self.assertRaises(FieldError, template.render, user_id="abc")
+
+    def test_in_parameter_must_be_list(self):
+        template = QueryTemplate('status in $statuses', self.schema_instance)
+        self.assertRaises(TemplateError, template.render, statuses="active")
+
+    def test_in_parameter_tuple(self):
+        template = QueryTemplate('user_id in $ids', self.schema_instance)
+        self.assertDictEqual(template.render(ids=(1, 2)), generate_query('user_id in (1, 2)', self.schema_instance))
+
+    def test_parameters_in_list(self):
+        template = QueryTemplate('status in ($first, $second)', self.schema_instance)
+        self.assertListEqual(template.parameters, ["first", "second"])
+        self.assertDictEqual(template.render(first="active", second="pending"),
+                             generate_query('status in ("active", "pending")', self.schema_instance))
+
+    def test_parameters_and_values_in_list(self):
+        template = QueryTemplate('user_id not in (1, $user_id)', self.schema_instance)
+        self.assertListEqual(template.parameters, ["user_id"])
+        self.assertDictEqual(template.render(user_id=2), generate_query('user_id not in (1, 2)', self.schema_instance))
+        self.assertRaises(FieldError, template.render, user_id="abc")
+
+    def test_parameter_in_one_item_list(self):
+        template = QueryTemplate('status in ($status)', self.schema_instance)
+        self.assertDictEqual(template.render(status="active"),
+                             generate_query('status in ("active")', self.schema_instance))
@@ -0,0 +1,114 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch, AsyncMock, Mock
+
+from elastic_dql.async_schema import (AsyncElasticDjangoQlSchema, AsyncSchemaFactory, AsyncSchemaHandler,
+                                      get_async_schema_factory_class)
+from elastic_dql.config import ElasticDqlConfig, DEFAULTS
+from elastic_dql.exceptions import SchemaError
+from elastic_dql.schema import SchemaFactory
+
+
+class AsyncSchemaTestCase(IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.index = "index"
+        self.client = Mock()
+        self.client.indices.get_mapping = AsyncMock(return_value={self.index: {"mappings": {"properties": {
+            "name": {"type": "keyword"},
+            "age": {"type": "long"},
+        }}}})
+        self.client.search = AsyncMock(return_value={"aggregations": {"values": {"buckets": [
+            {"key": {"value": "value"}, "doc_count": 1}]}}})
+
+    async def test_get_mappings(self):
+        schema = AsyncElasticDjangoQlSchema(self.client, self.index)
+        fields = await schema.get_mappings()
+        self.assertListEqual([field.name for field in fields], ["name", "age"])
+        await schema.get_mappings()
+        self.assertEqual(self.client.indices.get_mapping.await_count, 1)
+
+    async def test_resolve_name_before_loading_mappings(self):
+        schema = AsyncElasticDjangoQlSchema(self.client, self.index)
+        self.assertRaises(SchemaError, schema.resolve_name, "name")
+        await schema.ensure_mappings()
+        self.assertEqual(schema.resolve_name("name").name, "name")
+
+    @patch("elastic_dql.schema.get_suggestion_cache", return_value=None)
+    async def test_suggestions(self, get_suggestion_cache):
+        schema = AsyncElasticDjangoQlSchema(self.client, self.index)
+        suggestions = await schema.suggestions("name", search="val")
+        self.assertDictEqual(suggestions, {"values": [{"key": "value", "doc_count": 1}], "after": None})
+
+    async def test_suggestions_of_invalid_field(self):
+        schema = AsyncElasticDjangoQlSchema(self.client, self.index)
+        with self.assertRaises(SchemaError):
+            await schema.suggestions("age")
+
+    @patch("elastic_dql.schema.time.monotonic")
+    async def test_expired_mappings_are_refreshed(self, monotonic):
+        monotonic.return_value = 0
+        schema = AsyncElasticDjangoQlSchema(self.client, self.index, mappings_ttl=10)
+        await schema.ensure_mappings()
+        monotonic.return_value = 11
+        await schema.ensure_mappings()
+        self.assertEqual(self.client.indices.get_mapping.await_count, 2)
+
+    @patch("elastic_dql.schema.time.monotonic")
+    async def test_schema_is_used_in_many_event_loops(self, monotonic):
+        monotonic.return_value = 0
+        schema = AsyncElasticDjangoQlSchema(self.client, self.index, mappings_ttl=10)
+        await schema.ensure_mappings()
+        monotonic.return_value = 11
+
+        async def refresh():
+            await schema.ensure_mappings()
+            return schema._get_async_refresh_lock()
+
+        def refresh_in_new_loop():
+            return asyncio.run(refresh())
+        # async views under WSGI run in a new loop per request, locks of a loop can't be awaited in another one
+        lock = await asyncio.get_running_loop().run_in_executor(None, refresh_in_new_loop)
+        self.assertIsNot(lock, schema._get_async_refresh_lock())
+        self.assertEqual(self.client.indices.get_mapping.await_count, 2)
+        # locks of closed loops are dropped
+        await asyncio.get_running_loop().run_in_executor(None, refresh_in_new_loop)
+        self.assertEqual(len(schema._async_refresh_locks), 2)
+
+
+class AsyncSchemaFactoryTestCase(IsolatedAsyncioTestCase):
+
+    def test_instance_is_not_shared_with_parent(self):
+        self.assertIsInstance(SchemaFactory.get_instance(), SchemaFactory)
+        self.assertIsInstance(AsyncSchemaFactory.get_instance(), AsyncSchemaFactory)
+
+    @patch("elastic_dql.async_schema.get_async_connection")
+    async def test_async_connection(self, get_async_connection):
+        with patch("elastic_dql.schema.get_dql_config", return_value=ElasticDqlConfig({}, DEFAULTS)), \
+                patch("elastic_dql.async_schema.get_dql_config", return_value=ElasticDqlConfig({}, DEFAULTS)):
+            schema_instance = AsyncSchemaFactory().get_schema_instance(AsyncElasticDjangoQlSchema, "index")
+        self.assertIs(schema_instance.client, get_async_connection.return_value)
+
+    def test_factory_of_configured_schema_factory(self):
+        self.assertIs(get_async_schema_factory_class(SchemaFactory), AsyncSchemaFactory)
+        factory_cls = get_async_schema_factory_class(LimitedSchemaFactory)
+        self.assertIs(get_async_schema_factory_class(LimitedSchemaFactory), factory_cls)
+        self.assertTrue(issubclass(factory_cls, LimitedSchemaFactory))
+        dql_config = ElasticDqlConfig({"schema_factory": "%s.LimitedSchemaFactory" % __name__}, DEFAULTS)
+        with patch("elastic_dql.async_schema.get_dql_config", return_value=dql_config), \
+                patch.multiple(AsyncSchemaHandler, initiated=False, schema_factory=None, schema_cls=None):
+            schema_factory, schema_cls = AsyncSchemaHandler.initiate()
+        self.assertIsInstance(schema_factory, factory_cls)
+        self.assertDictEqual(schema_factory.index_field_limits, {"index": ["name"]})
+
+    def test_configured_async_schema_factory(self):
+        dql_config = ElasticDqlConfig({"schema_factory": "%s.LimitedSchemaFactory" % __name__,
+                                       "async_schema_factory": "elastic_dql.async_schema.AsyncSchemaFactory"}, DEFAULTS)
+        with patch("elastic_dql.async_schema.get_dql_config", return_value=dql_config), \
+                patch.multiple(AsyncSchemaHandler, initiated=False, schema_factory=None, schema_cls=None):
+            schema_factory, schema_cls = AsyncSchemaHandler.initiate()
+        self.assertIsInstance(schema_factory, AsyncSchemaFactory)
+
+
+class LimitedSchemaFactory(SchemaFactory):
+    index_field_limits = {"index": ["name"]}
@@ -0,0 +1,115 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from elastic_dql.exceptions import SchemaError
+from elastic_dql.field import FieldRegistry, KeywordField, TextType
+from elastic_dql.query_generator import find_related_field, is_ngram_field
+from elastic_dql.schema import ElasticDjangoQlSchema, field_registries
+from elastic_dql.snapshot import load_compiled_snapshot, read_compiled_snapshot_header, save_compiled_snapshot
+
+
+def get_mapping_response(index):
+    return {index: {"mappings": {"properties": {
+        "name": {"type": "text", "fields": {"keyword": {"type": "keyword"}, "ngram": {
+            "type": "text", "analyzer": "ngram_analyzer"}}},
+        "user": {"properties": {"age": {"type": "long"}}},
+    }}}}
+
+
+class CompiledSnapshotTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "index.edql")
+        self.client = Mock()
+        self.client.indices.get_mapping.return_value = get_mapping_response("index")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def get_schema(self, **kwargs):
+        return ElasticDjangoQlSchema(self.client, "index", compiled_snapshot_path=self.path, mappings_ttl=300,
+                                     **kwargs)
+
+    def test_snapshot_is_saved_on_refresh(self):
+        schema = self.get_schema()
+        schema.get_mappings()
+        header, (field_classes, records) = load_compiled_snapshot(self.path)
+        self.assertEqual(header["mapping_version"], schema.mapping_version)
+        self.assertEqual(len(records), 4)
+
+    def test_other_process_loads_snapshot(self):
+        schema = self.get_schema()
+        fields = schema.get_mappings()
+        self.client.indices.get_mapping.reset_mock()
+        field_registries.clear()
+        other_schema = self.get_schema()
+        other_fields = other_schema.get_mappings()
+        self.client.indices.get_mapping.assert_not_called()
+        self.assertEqual(other_schema.mapping_version, schema.mapping_version)
+        self.assertListEqual([(type(field), field.name, field.elastic_field_type) for field in other_fields],
+                             [(type(field), field.name, field.elastic_field_type) for field in fields])
+        name = other_schema.resolve_name("name")
+        self.assertIsInstance(name, TextType)
+        self.assertListEqual([field.name for field in name.subfields], ["name.keyword", "name.ngram"])
+        self.assertIs(other_schema.resolve_name("name.keyword").parent, name)
+        self.assertIsInstance(name.subfields[0], KeywordField)
+        # analyzers of mappings are kept for query builders
+        self.assertIs(find_related_field(other_schema.resolve_name("name.keyword"), is_ngram_field),
+                      other_schema.resolve_name("name.ngram"))
+
+    @patch("elastic_dql.snapshot.time.time")
+    def test_old_snapshot_is_not_loaded(self, now):
+        now.return_value = 1000
+        self.get_schema().get_mappings()
+        now.return_value = 1400
+        self.client.indices.get_mapping.reset_mock()
+        with patch("elastic_dql.schema.time.time", return_value=1400):
+            self.get_schema().get_mappings()
+        self.client.indices.get_mapping.assert_called_once()
+
+    def test_snapshot_with_other_options_is_not_loaded(self):
+        self.get_schema().get_mappings()
+        self.client.indices.get_mapping.reset_mock()
+        schema = self.get_schema(fields_limit=["user.age"])
+        self.assertRaises(SchemaError, schema.resolve_name, "user.age")
+        self.client.indices.get_mapping.assert_called_once()
+
+    def test_invalid_snapshot_is_ignored(self):
+        with open(self.path, "wb") as snapshot_file:
+            snapshot_file.write(b"invalid")
+        self.assertEqual(self.get_schema().resolve_name("user.age").name, "user.age")
+
+    def test_snapshot_with_other_classes_is_ignored(self):
+        self.assertRaises(SchemaError, FieldRegistry.from_records, ["os.system"], [])
+        self.assertRaises(SchemaError, FieldRegistry.from_records, ["elastic_dql.schema.SchemaFactory"], [])
+        self.assertRaises(SchemaError, FieldRegistry.from_records, ["elastic_dql.missing.Field"], [])
+        registry = Mock()
+        registry.to_records.return_value = (["os.system"], [(0, "name", "keyword", -1, True, {})])
+        save_compiled_snapshot(self.path, registry, "version", options={"fields_limit": []})
+        schema = self.get_schema()
+        self.assertRaises(SchemaError, schema.load_compiled_snapshot, self.path)
+        self.assertEqual(schema.resolve_name("user.age").name, "user.age")
+        self.client.indices.get_mapping.assert_called_once()
+
+    def test_marshal_version_mismatch(self):
+        schema = self.get_schema()
+        schema.get_mappings()
+        with patch("elastic_dql.snapshot.marshal.version", -1):
+            save_compiled_snapshot(self.path, schema.field_registry, schema.mapping_version)
+        with open(self.path, "rb") as snapshot_file:
+            header, header_end = read_compiled_snapshot_header(snapshot_file.read())
+        self.assertEqual(header["marshal_version"], -1)
+        self.assertIsNone(load_compiled_snapshot(self.path))
+
+    def test_library_version_mismatch(self):
+        schema = self.get_schema()
+        schema.get_mappings()
+        with patch("elastic_dql.snapshot.__version__", "0.0.0"):
+            save_compiled_snapshot(self.path, schema.field_registry, schema.mapping_version)
+        self.assertIsNone(load_compiled_snapshot(self.path))
+
+    def test_missing_snapshot(self):
+        self.assertIsNone(load_compiled_snapshot(os.path.join(self.directory.name, "missing.edql")))
@@ -1,5 +1,243 @@
 from unittest import TestCase
+from unittest.mock import patch, Mock
+
+from elastic_dql.cache import LocMemSuggestionCache
+from elastic_dql.exceptions import SchemaError
+from elastic_dql.schema import ElasticDjangoQlSchema
+from elastic_dql.serializers import decode_cursor
+
+
+def get_mapping_response(index, properties):
+    return {index: {"mappings": {"properties": properties}}}
 
 
 class SchemaTestCase(TestCase):
-    pass
+
+    def setUp(self) -> None:
+        self.index = "index"
+        self.client = Mock()
+        self.client.indices.get_mapping.return_value = get_mapping_response(self.index, {
+            "name": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+            "age": {"type": "long"},
+        })
+
+    def test_get_mappings(self):
+        schema = ElasticDjangoQlSchema(self.client, self.index)
+        fields = schema.get_mappings()
+        self.assertListEqual([field.name for field in fields], ["name", "name.keyword", "age"])
+
+    def test_fields_limit(self):
+        schema = ElasticDjangoQlSchema(self.client, self.index, fields_limit=["age"])
+        fields = schema.get_mappings()
+        self.assertListEqual([field.name for field in fields], ["name", "name.keyword"])
+        self.assertRaises(SchemaError, schema.resolve_name, "age")
+
+    def test_resolve_name(self):
+        schema = ElasticDjangoQlSchema(self.client, self.index)
+        self.assertEqual(schema.resolve_name("name.keyword").name, "name.keyword")
+        self.assertRaises(SchemaError, schema.resolve_name, "invalid")
+
+    def test_mappings_are_cached(self):
+        schema = ElasticDjangoQlSchema(self.client, self.index)
+        schema.get_mappings()
+        schema.get_mappings()
+        schema.resolve_name("age")
+        self.assertEqual(self.client.indices.get_mapping.call_count, 1)
+
+    def test_get_mappings_error(self):
+        self.client.indices.get_mapping.side_effect = Exception("connection error")
+        schema = ElasticDjangoQlSchema(self.client, self.index)
+        self.assertRaises(SchemaError, schema.get_mappings)
+
+    @patch("elastic_dql.schema.time.monotonic")
+    def test_expired_mappings_are_refreshed(self, monotonic):
+        monotonic.return_value = 0
+        schema = ElasticDjangoQlSchema(self.client, self.index, mappings_ttl=10)
+        schema.get_mappings()
+        monotonic.return_value = 5
+        schema.get_mappings()
+        self.assertEqual(self.client.indices.get_mapping.call_count, 1)
+        monotonic.return_value = 11
+        schema.get_mappings()
+        self.assertEqual(self.client.indices.get_mapping.call_count, 2)
+
+    @patch("elastic_dql.schema.time.monotonic")
+    def test_unchanged_mapping_is_not_rebuilt(self, monotonic):
+        monotonic.return_value = 0
+        schema = ElasticDjangoQlSchema(self.client, self.index, mappings_ttl=10)
+        field = schema.resolve_name("age")
+        version = schema.mapping_version
+        monotonic.return_value = 11
+        self.assertIs(schema.resolve_name("age"), field)
+        self.assertEqual(schema.mapping_version, version)
+
+    @patch("elastic_dql.schema.time.monotonic")
+    def test_changed_mapping_is_rebuilt(self, monotonic):
+        monotonic.return_value = 0
+        schema = ElasticDjangoQlSchema(self.client, self.index, mappings_ttl=10)
+        schema.get_mappings()
+        version = schema.mapping_version
+        self.client.indices.get_mapping.return_value = get_mapping_response(self.index, {"title": {"type": "text"}})
+        monotonic.return_value = 11
+        self.assertEqual(schema.resolve_name("title").name, "title")
+        self.assertNotEqual(schema.mapping_version, version)
+        self.assertRaises(SchemaError, schema.resolve_name, "age")
+
+    @patch("elastic_dql.schema.time.monotonic")
+    def test_failed_refresh_keeps_mappings(self, monotonic):
+        monotonic.return_value = 0
+        schema = ElasticDjangoQlSchema(self.client, self.index, mappings_ttl=10)
+        schema.get_mappings()
+        self.client.indices.get_mapping.side_effect = Exception("connection error")
+        monotonic.return_value = 11
+        self.assertEqual(schema.resolve_name("age").name, "age")
+
+    @patch("elastic_dql.schema.threading.Thread")
+    @patch("elastic_dql.schema.time.monotonic")
+    def test_background_refresh(self, monotonic, thread_cls):
+        monotonic.return_value = 0
+        schema = ElasticDjangoQlSchema(self.client, self.index, mappings_ttl=10, background_refresh=True)
+        schema.get_mappings()
+        monotonic.return_value = 11
+        schema.get_mappings()
+        self.assertEqual(self.client.indices.get_mapping.call_count, 1)
+        thread_cls.assert_called_once()
+        thread_cls.return_value.start.assert_called_once()
+
+
+class PatternSchemaTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.client = Mock()
+        self.client.indices.get_mapping.return_value = {
+            "logs-1": {"mappings": {"properties": {"message": {"type": "text"}, "code": {"type": "long"}}}},
+            "logs-2": {"mappings": {"properties": {"message": {"type": "text"}, "code": {"type": "keyword"},
+                                                   "host": {"type": "keyword"}}}},
+        }
+
+    def test_merged_fields(self):
+        schema = ElasticDjangoQlSchema(self.client, "logs-*")
+        self.assertListEqual(sorted(field.name for field in schema.get_mappings()), ["host", "message"])
+        self.client.indices.get_mapping.assert_called_once_with(index="logs-*")
+
+    def test_conflicts(self):
+        schema = ElasticDjangoQlSchema(self.client, "logs")
+        self.assertRaises(SchemaError, schema.resolve_name, "code")
+        self.assertDictEqual(schema.mapping_conflicts, {"code": ["keyword", "long"]})
+
+    def test_missing_mappings(self):
+        self.client.indices.get_mapping.return_value = {}
+        schema = ElasticDjangoQlSchema(self.client, "logs-*")
+        self.assertRaises(SchemaError, schema.get_mappings)
+
+
+class FieldRegistryTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.client = Mock()
+        self.client.indices.get_mapping.side_effect = lambda index: get_mapping_response(index, {
+            "name": {"type": "keyword"},
+            "age": {"type": "long"},
+        })
+
+    def test_same_mappings_share_registry(self):
+        schemas = [ElasticDjangoQlSchema(self.client, "logs-%s" % day) for day in range(10)]
+        registries = {id(schema.get_mappings()) for schema in schemas}
+        self.assertEqual(len(registries), 1)
+        self.assertIs(schemas[0].resolve_name("age"), schemas[9].resolve_name("age"))
+
+    def test_different_options_dont_share_registry(self):
+        schema = ElasticDjangoQlSchema(self.client, "logs-1")
+        limited_schema = ElasticDjangoQlSchema(self.client, "logs-2", fields_limit=["age"])
+        deny_schema = ElasticDjangoQlSchema(self.client, "logs-3", expensive_queries="deny")
+        self.assertIsNot(schema.get_mappings(), limited_schema.get_mappings())
+        self.assertIsNot(schema.resolve_name("name"), deny_schema.resolve_name("name"))
+        self.assertEqual(deny_schema.resolve_name("name").expensive_queries, "deny")
+
+    def test_different_mappings_dont_share_registry(self):
+        schema = ElasticDjangoQlSchema(self.client, "logs-1")
+        schema.get_mappings()
+        self.client.indices.get_mapping.side_effect = None
+        self.client.indices.get_mapping.return_value = get_mapping_response("logs-2", {"name": {"type": "text"}})
+        other_schema = ElasticDjangoQlSchema(self.client, "logs-2")
+        self.assertIsNot(schema.resolve_name("name"), other_schema.resolve_name("name"))
+
+
+class SuggestionsTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.index = "index"
+        self.client = Mock()
+        self.client.indices.get_mapping.return_value = get_mapping_response(self.index, {
+            "name": {"type": "keyword"},
+            "age": {"type": "long"},
+        })
+        self.values = [{"key": "abc", "doc_count": 2}, {"key": "abd", "doc_count": 1}]
+        self.client.search.return_value = {"aggregations": {"values": {
+            "after_key": {"value": "abd"},
+            "buckets": [{"key": {"value": "abc"}, "doc_count": 2}, {"key": {"value": "abd"}, "doc_count": 1}]}}}
+        self.suggestion_cache = LocMemSuggestionCache()
+        self.cache_patcher = patch("elastic_dql.schema.get_suggestion_cache", return_value=self.suggestion_cache)
+        self.cache_patcher.start()
+        self.schema = ElasticDjangoQlSchema(self.client, self.index)
+
+    def tearDown(self) -> None:
+        self.cache_patcher.stop()
+
+    def test_suggestions(self):
+        self.assertDictEqual(self.schema.suggestions("name", search="ab"), {"values": self.values, "after": None})
+
+    def test_suggestions_request(self):
+        self.schema.suggestions("name", search="ab", size=5)
+        self.client.search.assert_called_once_with(index=self.index, size=0, query={"prefix": {"name": {
+            "value": "ab"}}}, aggregations={"values": {"composite": {
+                "size": 5, "sources": [{"value": {"terms": {"field": "name"}}}]}}})
+
+    def test_next_page(self):
+        page = self.schema.suggestions("name", search="ab", size=2)
+        self.assertEqual(decode_cursor(page["after"]), "abd")
+        self.schema.suggestions("name", search="ab", size=2, after=page["after"])
+        composite = self.client.search.call_args.kwargs["aggregations"]["values"]["composite"]
+        self.assertDictEqual(composite["after"], {"value": "abd"})
+
+    def test_invalid_cursor(self):
+        self.assertRaises(SchemaError, self.schema.suggestions, "name", after="invalid")
+
+    def test_field_suggestion_strategy(self):
+        self.client.terms_enum.return_value = {"terms": ["abc"]}
+        schema = ElasticDjangoQlSchema(self.client, self.index, suggestion_strategies={"name": "terms_enum"})
+        self.assertDictEqual(schema.suggestions("name", search="ab"), {"values": [{"key": "abc"}], "after": None})
+        self.client.search.assert_not_called()
+
+    def test_invalid_field(self):
+        self.assertRaises(SchemaError, self.schema.suggestions, "age")
+        self.assertRaises(SchemaError, self.schema.suggestions, "invalid")
+
+    def test_suggestions_are_cached(self):
+        self.schema.suggestions("name", search="ab")
+        self.schema.suggestions("name", search="ab")
+        self.assertEqual(self.client.search.call_count, 1)
+
+    def test_smaller_page_from_cache(self):
+        self.schema.suggestions("name", search="ab")
+        page = self.schema.suggestions("name", search="ab", size=1)
+        self.assertListEqual(page["values"], self.values[:1])
+        self.assertEqual(decode_cursor(page["after"]), "abc")
+        self.assertEqual(self.client.search.call_count, 1)
+
+    def test_next_pages_are_not_cached(self):
+        page = self.schema.suggestions("name", search="ab", size=2)
+        self.schema.suggestions("name", search="ab", size=2, after=page["after"])
+        self.schema.suggestions("name", search="ab", size=2, after=page["after"])
+        self.assertEqual(self.client.search.call_count, 3)
+
+    def test_longer_search_is_filtered_from_complete_result(self):
+        self.schema.suggestions("name", search="ab")
+        self.assertDictEqual(self.schema.suggestions("name", search="abc"),
+                             {"values": [{"key": "abc", "doc_count": 2}], "after": None})
+        self.assertEqual(self.client.search.call_count, 1)
+
+    def test_incomplete_result_is_not_filtered(self):
+        self.schema.suggestions("name", search="ab", size=2)
+        self.schema.suggestions("name", search="abc", size=2)
+        self.assertEqual(self.client.search.call_count, 2)
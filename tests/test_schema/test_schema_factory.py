@@ -1,9 +1,11 @@
 import random
 from string import ascii_lowercase
 from unittest import TestCase
+from unittest.mock import patch, Mock
 
+from elastic_dql.config import ElasticDqlConfig, DEFAULTS
 from elastic_dql.exceptions import SchemaError
-from elastic_dql.schema import SchemaFactory
+from elastic_dql.schema import SchemaFactory, ElasticDjangoQlSchema
 
 
 class SchemaFactoryTestCase(TestCase):
@@ -84,3 +86,103 @@ class SchemaFactoryTestCase(TestCase):
         schema_factory = TestingSchemaFactory.get_instance()
         index_name = "index_20"
         self.assertFalse(schema_factory.excluded(index_name))
+
+    def test_included_pattern(self):
+        class TestingSchemaFactory(SchemaFactory):
+            include_indices = ('logs-*', 'users')
+            exclude_indices = ()
+
+        schema_factory = TestingSchemaFactory.get_instance()
+        self.assertFalse(schema_factory.excluded("logs-2024.01.01"))
+        self.assertFalse(schema_factory.excluded("logs-*"))
+        self.assertFalse(schema_factory.excluded("logs-*,users"))
+        self.assertTrue(schema_factory.excluded("*"))
+        self.assertTrue(schema_factory.excluded("logs-*,secrets"))
+
+    def test_excluded_pattern(self):
+        class TestingSchemaFactory(SchemaFactory):
+            include_indices = ()
+            exclude_indices = ('secrets', '.internal-*')
+
+        schema_factory = TestingSchemaFactory.get_instance()
+        self.assertTrue(schema_factory.excluded(".internal-1"))
+        self.assertTrue(schema_factory.excluded("sec*"))
+        self.assertTrue(schema_factory.excluded("logs,secrets"))
+        self.assertFalse(schema_factory.excluded("logs-*"))
+        self.assertFalse(schema_factory.excluded("logs-*,-secrets"))
+
+    def test_overlapping_excluded_pattern(self):
+        class TestingSchemaFactory(SchemaFactory):
+            include_indices = ()
+            exclude_indices = ('secret-*', 'secrets')
+
+        schema_factory = TestingSchemaFactory.get_instance()
+        self.assertTrue(schema_factory.excluded("*-1"))
+        self.assertTrue(schema_factory.excluded("*s"))
+        self.assertFalse(schema_factory.excluded("logs-*"))
+        self.assertFalse(schema_factory.excluded("public-*"))
+
+    def test_fields_limit_of_patterns_and_lists(self):
+        class TestingSchemaFactory(SchemaFactory):
+            index_field_limits = {"users": ["password"], "logs-*": ["token"]}
+
+        schema_factory = TestingSchemaFactory.get_instance()
+        self.assertListEqual(schema_factory.get_fields_limit("users"), ["password"])
+        self.assertListEqual(schema_factory.get_fields_limit("users*"), ["password"])
+        self.assertListEqual(schema_factory.get_fields_limit("users,users"), ["password"])
+        self.assertListEqual(schema_factory.get_fields_limit("orders,logs-app"), ["token"])
+        self.assertListEqual(schema_factory.get_fields_limit("*"), ["password", "token"])
+        self.assertListEqual(schema_factory.get_fields_limit("orders"), [])
+
+
+class SchemaRegistryTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.connection_patcher = patch("elastic_dql.schema.SchemaFactory._create_elastic_connection",
+                                        return_value=Mock())
+        self.connection_patcher.start()
+        self.config_patcher = patch("elastic_dql.schema.get_dql_config", return_value=ElasticDqlConfig({}, DEFAULTS))
+        self.config_patcher.start()
+        self.schema_factory = SchemaFactory()
+
+    def tearDown(self) -> None:
+        self.connection_patcher.stop()
+        self.config_patcher.stop()
+
+    def test_schema_instance_is_reused(self):
+        first = self.schema_factory.get_schema_instance(ElasticDjangoQlSchema, "index_1")
+        second = self.schema_factory.get_schema_instance(ElasticDjangoQlSchema, "index_1")
+        self.assertIs(first, second)
+
+    def test_schema_instance_per_index(self):
+        first = self.schema_factory.get_schema_instance(ElasticDjangoQlSchema, "index_1")
+        second = self.schema_factory.get_schema_instance(ElasticDjangoQlSchema, "index_2")
+        self.assertIsNot(first, second)
+
+    def test_schema_instance_per_schema_cls(self):
+        class CustomSchema(ElasticDjangoQlSchema):
+            pass
+
+        first = self.schema_factory.get_schema_instance(ElasticDjangoQlSchema, "index_1")
+        second = self.schema_factory.get_schema_instance(CustomSchema, "index_1")
+        self.assertIsInstance(second, CustomSchema)
+        self.assertIsNot(first, second)
+
+    def test_fields_limit_of_pattern(self):
+        class TestingSchemaFactory(SchemaFactory):
+            index_field_limits = {"users": ["password"]}
+
+        schema_instance = TestingSchemaFactory().get_schema_instance(ElasticDjangoQlSchema, "users*")
+        self.assertListEqual(schema_instance.fields_limit, ["password"])
+
+    def test_invalidate(self):
+        first = self.schema_factory.get_schema_instance(ElasticDjangoQlSchema, "index_1")
+        other = self.schema_factory.get_schema_instance(ElasticDjangoQlSchema, "index_2")
+        self.schema_factory.invalidate("index_1")
+        self.assertIsNot(first, self.schema_factory.get_schema_instance(ElasticDjangoQlSchema, "index_1"))
+        self.assertIs(other, self.schema_factory.get_schema_instance(ElasticDjangoQlSchema, "index_2"))
+
+    def test_clear(self):
+        first = self.schema_factory.get_schema_instance(ElasticDjangoQlSchema, "index_1")
+        self.schema_factory.clear()
+        self.assertIsNot(first, self.schema_factory.get_schema_instance(ElasticDjangoQlSchema, "index_1"))
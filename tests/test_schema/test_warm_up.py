@@ -0,0 +1,102 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch, Mock
+
+from elastic_dql.config import ElasticDqlConfig, DEFAULTS
+from elastic_dql.exceptions import SchemaError
+from elastic_dql.schema import SchemaFactory, ElasticDjangoQlSchema
+from elastic_dql.snapshot import save_mappings_snapshot, load_mappings_snapshot
+
+
+def get_index_result(index, properties):
+    return {index: {"mappings": {"properties": properties}}}
+
+
+class WarmUpTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.client = Mock()
+        self.client.indices.get_mapping.return_value = {
+            **get_index_result("users", {"name": {"type": "keyword"}}),
+            **get_index_result("logs-1", {"message": {"type": "text"}}),
+            **get_index_result("logs-2", {"message": {"type": "text"}}),
+        }
+        self.connection_patcher = patch("elastic_dql.schema.SchemaFactory._create_elastic_connection",
+                                        return_value=self.client)
+        self.connection_patcher.start()
+        self.config_patcher = patch("elastic_dql.schema.get_dql_config", return_value=ElasticDqlConfig({
+            "default_index": "users", "warm_up_indices": ["logs-*"]}, DEFAULTS))
+        self.config_patcher.start()
+
+        class TestingSchemaFactory(SchemaFactory):
+            include_indices = ("users", "logs-*", "secrets")
+
+        self.schema_factory = TestingSchemaFactory()
+
+    def tearDown(self) -> None:
+        self.connection_patcher.stop()
+        self.config_patcher.stop()
+
+    def test_warm_up_indices(self):
+        self.assertListEqual(self.schema_factory.get_warm_up_indices(["other", "users"]),
+                             ["users", "logs-*", "secrets"])
+
+    def test_mappings_are_fetched_with_one_request(self):
+        self.client.indices.get_mapping.return_value["secrets"] = {"mappings": {}}
+        self.schema_factory.warm_up(ElasticDjangoQlSchema)
+        self.client.indices.get_mapping.assert_called_once_with(index="logs-*,users,secrets", ignore_unavailable=True,
+                                                                allow_no_indices=True)
+        schema = self.schema_factory.get_schema_instance(ElasticDjangoQlSchema, "logs-*")
+        self.assertEqual(schema.resolve_name("message").name, "message")
+        self.assertEqual(self.client.indices.get_mapping.call_count, 1)
+
+    def test_alias_is_fetched_separately(self):
+        self.schema_factory.warm_up(ElasticDjangoQlSchema)
+        self.client.indices.get_mapping.assert_called_with(index="secrets")
+        self.assertEqual(self.client.indices.get_mapping.call_count, 2)
+
+    def test_backing_indices_of_data_stream(self):
+        self.client.indices.get_mapping.return_value = {
+            **get_index_result(".ds-app-2024.01.01-000001", {"message": {"type": "text"}}),
+            **get_index_result(".ds-app-logs-2024.01.01-000001", {"level": {"type": "keyword"}}),
+        }
+        index_results = self.schema_factory.fetch_mappings(["app", "app-logs"])
+        self.assertListEqual(list(index_results["app"]), [".ds-app-2024.01.01-000001"])
+        self.assertListEqual(list(index_results["app-logs"]), [".ds-app-logs-2024.01.01-000001"])
+
+    def test_fetch_error(self):
+        self.client.indices.get_mapping.side_effect = Exception("connection error")
+        self.assertRaises(SchemaError, self.schema_factory.warm_up, ElasticDjangoQlSchema)
+
+    def test_snapshot(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "mappings.json")
+            self.client.indices.get_mapping.return_value["secrets"] = {"mappings": {}}
+            save_mappings_snapshot(path, self.schema_factory.warm_up(ElasticDjangoQlSchema))
+            self.client.indices.get_mapping.reset_mock()
+            schema_factory = type(self.schema_factory)()
+            schema_factory.warm_up(ElasticDjangoQlSchema, snapshot_path=path)
+            self.client.indices.get_mapping.assert_not_called()
+            schema = schema_factory.get_schema_instance(ElasticDjangoQlSchema, "users")
+            self.assertEqual(schema.resolve_name("name").name, "name")
+            self.client.indices.get_mapping.assert_not_called()
+
+
+class SnapshotTestCase(TestCase):
+
+    def test_save_and_load(self):
+        index_results = {"users": get_index_result("users", {"name": {"type": "keyword"}})}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "mappings.json")
+            save_mappings_snapshot(path, index_results)
+            self.assertDictEqual(load_mappings_snapshot(path), index_results)
+            self.assertListEqual(os.listdir(directory), ["mappings.json"])
+
+    def test_invalid_snapshot(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "mappings.json")
+            self.assertRaises(SchemaError, load_mappings_snapshot, path)
+            with open(path, "w") as snapshot_file:
+                snapshot_file.write('{"version": 100}')
+            self.assertRaises(SchemaError, load_mappings_snapshot, path)
@@ -0,0 +1,51 @@
+import json
+from unittest import TestCase
+
+from elastic_dql.field import LongField, KeywordField
+from elastic_dql.query import QueryResult
+from elastic_dql.exceptions import SchemaError
+from elastic_dql.serializers import serialize_suggestions_values_response, serialize_mappings, \
+    serialize_msearch_body, serialize_suggestions, encode_cursor, decode_cursor
+
+
+class SerializerTestCase(TestCase):
+
+    def test_suggestions_values(self):
+        buckets = [{"key": "value", "doc_count": 1}]
+        self.assertListEqual(serialize_suggestions_values_response({"aggregations": {"values": {"buckets": buckets}}}),
+                             buckets)
+
+    def test_composite_suggestions_values(self):
+        result = {"aggregations": {"values": {"buckets": [{"key": {"value": "value"}, "doc_count": 1}]}}}
+        self.assertListEqual(serialize_suggestions_values_response(result), [{"key": "value", "doc_count": 1}])
+
+    def test_suggestions(self):
+        values = [{"key": "value", "doc_count": 1}]
+        self.assertDictEqual(serialize_suggestions(values), {"values": values, "after": None})
+        self.assertEqual(decode_cursor(serialize_suggestions(values, "value")["after"]), "value")
+
+    def test_cursor(self):
+        self.assertEqual(decode_cursor(encode_cursor(["a", 1])), ["a", 1])
+        self.assertIsNone(encode_cursor(None))
+        self.assertIsNone(decode_cursor(None))
+        self.assertRaises(SchemaError, decode_cursor, "invalid")
+
+    def test_suggestions_without_aggregations(self):
+        self.assertListEqual(serialize_suggestions_values_response({}), [])
+
+    def test_mappings(self):
+        mappings = [LongField("age", elastic_field_type="long"), KeywordField("name", elastic_field_type="keyword")]
+        self.assertListEqual(serialize_mappings(mappings), [{"name": "age", "type": "long"},
+                                                            {"name": "name", "type": "keyword"}])
+
+    def test_msearch_body(self):
+        results = [QueryResult("age = 1", query={"query": {"match_all": {}}}),
+                   QueryResult("age = ", error=Exception()),
+                   QueryResult("age = 2", query={"query": {"match_none": {}}})]
+        body = serialize_msearch_body("index", results, size=0)
+        lines = body.splitlines()
+        self.assertTrue(body.endswith("\n"))
+        self.assertListEqual([json.loads(line) for line in lines], [
+            {"index": "index"}, {"query": {"match_all": {}}, "size": 0},
+            {"index": "index"}, {"query": {"match_none": {}}, "size": 0},
+        ])
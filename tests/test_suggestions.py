@@ -0,0 +1,110 @@
+from unittest import TestCase
+
+from elastic_dql.exceptions import SchemaError
+from elastic_dql.field import FieldMapper
+from elastic_dql.suggestions import choose_suggestion_strategy, get_suggestion_strategy
+
+
+def get_fields(properties):
+    fields = FieldMapper().get_properties({"properties": properties})
+    return {field.name: field for field in fields}
+
+
+class SuggestionStrategiesTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.fields = get_fields({
+            "status": {"type": "keyword"},
+            "title": {"type": "text", "fields": {"keyword": {"type": "keyword"},
+                                                 "suggest": {"type": "completion"}}},
+            "name": {"type": "keyword", "fields": {"sayt": {"type": "search_as_you_type"}}},
+        })
+
+    def test_terms(self):
+        strategy = get_suggestion_strategy("terms")
+        method, params = strategy.get_request(self.fields["status"], "ac", 10, after="ab")
+        self.assertEqual(method, "search")
+        self.assertDictEqual(params, {
+            "size": 0,
+            "query": {"prefix": {"status": {"value": "ac"}}},
+            "aggregations": {"values": {"composite": {
+                "size": 10, "sources": [{"value": {"terms": {"field": "status"}}}], "after": {"value": "ab"}}}},
+        })
+
+    def test_terms_without_search(self):
+        strategy = get_suggestion_strategy("terms")
+        method, params = strategy.get_request(self.fields["status"], None, 10)
+        self.assertNotIn("query", params)
+        self.assertNotIn("after", params["aggregations"]["values"]["composite"])
+
+    def test_terms_response(self):
+        strategy = get_suggestion_strategy("terms")
+        result = {"aggregations": {"values": {"after_key": {"value": "b"}, "buckets": [
+            {"key": {"value": "a"}, "doc_count": 2}, {"key": {"value": "b"}, "doc_count": 1}]}}}
+        values = [{"key": "a", "doc_count": 2}, {"key": "b", "doc_count": 1}]
+        self.assertEqual(strategy.parse_response(result, 2), (values, "b"))
+        self.assertEqual(strategy.parse_response(result, 10), (values, None))
+
+    def test_other_values_of_multi_valued_fields_are_filtered(self):
+        strategy = get_suggestion_strategy("terms")
+        # documents with prefix "ac" have other values too
+        result = {"aggregations": {"values": {"buckets": [
+            {"key": {"value": "active"}, "doc_count": 2}, {"key": {"value": "archived"}, "doc_count": 1}]}}}
+        self.assertEqual(strategy.parse_response(result, 2, search="ac"),
+                         ([{"key": "active", "doc_count": 2}], "archived"))
+        self.assertEqual(strategy.parse_response(result, 10, search="ac"),
+                         ([{"key": "active", "doc_count": 2}], None))
+        wildcard_result = {"aggregations": {"values": {"buckets": [
+            {"key": {"value": "inactive"}, "doc_count": 2}, {"key": {"value": "new"}, "doc_count": 1}]}}}
+        self.assertEqual(get_suggestion_strategy("wildcard").parse_response(wildcard_result, 10, search="ac"),
+                         ([{"key": "inactive", "doc_count": 2}], None))
+
+    def test_wildcard(self):
+        strategy = get_suggestion_strategy("wildcard")
+        method, params = strategy.get_request(self.fields["status"], "ac", 10)
+        self.assertDictEqual(params["query"], {"wildcard": {"status": {"value": "*ac*"}}})
+        self.assertEqual(params["size"], 0)
+
+    def test_terms_enum(self):
+        strategy = get_suggestion_strategy("terms_enum")
+        method, params = strategy.get_request(self.fields["status"], "ac", 2, after="ab")
+        self.assertEqual(method, "terms_enum")
+        self.assertDictEqual(params, {"field": "status", "size": 2, "string": "ac", "search_after": "ab"})
+        self.assertEqual(strategy.parse_response({"terms": ["active"]}, 2), ([{"key": "active"}], None))
+        self.assertEqual(strategy.parse_response({"terms": ["a", "b"]}, 2), ([{"key": "a"}, {"key": "b"}], "b"))
+
+    def test_completion(self):
+        strategy = get_suggestion_strategy("completion")
+        field = self.fields["title.keyword"]
+        self.assertTrue(strategy.is_available(field, "ab"))
+        self.assertFalse(strategy.is_available(field, None))
+        self.assertFalse(strategy.is_available(self.fields["status"], "ab"))
+        method, params = strategy.get_request(field, "ab", 10)
+        self.assertEqual(params["suggest"]["values"]["completion"]["field"], "title.suggest")
+        result = {"suggest": {"values": [{"options": [{"text": "abc"}]}]}}
+        self.assertEqual(strategy.parse_response(result, 1), ([{"key": "abc"}], None))
+
+    def test_search_as_you_type(self):
+        strategy = get_suggestion_strategy("search_as_you_type")
+        field = self.fields["name"]
+        self.assertTrue(strategy.is_available(field, "ab"))
+        method, params = strategy.get_request(field, "ab", 10)
+        self.assertListEqual(params["query"]["multi_match"]["fields"], ["name.sayt", "name.sayt._2gram",
+                                                                        "name.sayt._3gram"])
+        self.assertEqual(params["aggregations"]["values"]["composite"]["sources"], [{"value": {"terms": {
+            "field": "name"}}}])
+
+    def test_choose_cheapest_available(self):
+        strategy_names = ["completion", "search_as_you_type", "terms"]
+        self.assertEqual(choose_suggestion_strategy(self.fields["title.keyword"], "ab", strategy_names).name,
+                         "completion")
+        self.assertEqual(choose_suggestion_strategy(self.fields["name"], "ab", strategy_names).name,
+                         "search_as_you_type")
+        self.assertEqual(choose_suggestion_strategy(self.fields["status"], "ab", strategy_names).name, "terms")
+        self.assertEqual(choose_suggestion_strategy(self.fields["name"], None, strategy_names).name, "terms")
+
+    def test_no_strategy_available(self):
+        self.assertRaises(SchemaError, choose_suggestion_strategy, self.fields["status"], "ab", ["completion"])
+
+    def test_invalid_strategy(self):
+        self.assertRaises(SchemaError, get_suggestion_strategy, "invalid")
@@ -3,7 +3,8 @@ import string
 from unittest import TestCase
 from unittest.mock import patch, Mock
 
-from elastic_dql.utils import dot_join, get_fields, get_properties
+from elastic_dql.utils import (dot_join, get_fields, get_properties, copy_query, get_snapshot_file_name,
+                               patterns_overlap)
 
 
 def mocked_dot_join(*args):
@@ -131,3 +132,39 @@ class TestGetProperties(TestCase):
         properties = get_properties(mappings)
         self.assertListEqual(properties, [{"name": "field_name.nested_field_name", "type": "nested_field_type"},
                                           {"name": "field_name2.nested_field_name", "type": "nested_field_type2"}])
+
+
+class TestCopyQuery(TestCase):
+
+    def test_copy_is_equal(self):
+        query = {"bool": {"filter": [{"match": {"name": "value"}}], "minimum_should_match": 1}}
+        self.assertDictEqual(copy_query(query), query)
+
+    def test_copy_is_not_shared(self):
+        query = {"bool": {"filter": [{"match": {"name": "value"}}]}}
+        copied_query = copy_query(query)
+        copied_query["bool"]["filter"][0]["match"]["name"] = "other"
+        self.assertEqual(query["bool"]["filter"][0]["match"]["name"], "value")
+
+
+class TestGetSnapshotFileName(TestCase):
+
+    def test_file_name(self):
+        self.assertEqual(get_snapshot_file_name("index"), "index.edql")
+        self.assertEqual(get_snapshot_file_name("logs-*,../x"), "logs-%2A%2C..%2Fx.edql")
+
+
+class TestPatternsOverlap(TestCase):
+
+    def test_overlap(self):
+        self.assertTrue(patterns_overlap("logs", "logs"))
+        self.assertTrue(patterns_overlap("secret-*", "*-1"))
+        self.assertTrue(patterns_overlap("*-1", "secret-*"))
+        self.assertTrue(patterns_overlap("a*c", "ab*"))
+        self.assertTrue(patterns_overlap("abc", "a*b*c"))
+
+    def test_no_overlap(self):
+        self.assertFalse(patterns_overlap("secrets", "*-1"))
+        self.assertFalse(patterns_overlap("logs", "logs-*"))
+        self.assertFalse(patterns_overlap("a*", "b*"))
+        self.assertFalse(patterns_overlap("ab", "a*b*c"))
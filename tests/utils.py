@@ -1,5 +1,8 @@
 import string
 import random
+from unittest.mock import Mock
+
+from elastic_dql.schema import ElasticDjangoQlSchema
 
 
 def generate_random_string(length=5, charset=string.ascii_lowercase):
@@ -8,3 +11,12 @@ def generate_random_string(length=5, charset=string.ascii_lowercase):
 
 def generate_random_string_array(count=5, length=5):
     return [generate_random_string(length=length) for _ in range(count)]
+
+
+def get_schema_instance(properties, index="index", **kwargs):
+    """
+        schema of a mocked client which returns mappings of properties, kwargs are passed to schema
+    """
+    client = Mock()
+    client.indices.get_mapping.return_value = {index: {"mappings": {"properties": properties}}}
+    return ElasticDjangoQlSchema(client, index, **kwargs)